@@ -0,0 +1,253 @@
+# Offline benchmark suite for the reasoning strategies against a scripted LLM and a local Wikipedia.
+
+# benchmarks/bench_strategies.py
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from chain_of_thought import ChainOfThought
+from fakes import FakeLLM, FakeWikipedia
+from react import ReAct
+from self_consistency import SelfConsistency
+
+COT_EXEMPLAR = """Q: Roger has 5 tennis balls.
+He buys 2 more cans of tennis balls.
+Each can has 3 tennis balls. How many tennis balls does he have now?
+A: Roger started with 5 balls. 2 cans of 3 tennis balls each is 6 tennis balls. 5 + 6 = 11. The answer is 11.
+Q: """
+COT_QUESTION = """Nomfundo writes legal briefs.
+Each brief has 3 sections, each section takes 4 hours.
+She wrote 3 briefs this week. How long did it take?"""
+COT_RESPONSE = "Each brief takes 3 * 4 = 12 hours. 3 briefs take 3 * 12 = 36 hours. The answer is 36."
+REACT_CONTEXT = "Answer questions with thoughts, actions, and observations."
+REACT_EXEMPLAR = """Example:
+Question: Who was born first, Ronald Reagan or Gerald Ford?
+Thought 1: I need to look up Ronald Reagan and see when he was born.
+Action 1: Ronald Reagan<STOP>
+Observation 1: Ronald Wilson Reagan (February 6, 1911 - June 5, 2004) was an American politician.
+Thought 2: Ronald Reagan was born in 1911. I need to look up Gerald Ford and see when he was born.
+Action 2: Gerald Ford<STOP>
+Observation 2: Gerald Rudolph Ford Jr. (July 14, 1913 - December 26, 2006) was an American politician.
+Thought 3: Gerald Ford was born in 1913. 1911 is before 1913. Answer[Ronald Reagan]"""
+REACT_QUESTION = "Who was born first, Ronald Reagan or Gerald Ford?"
+REACT_STEPS = 3
+# What the model invents after its action when nothing stops it.
+HALLUCINATED_TAIL = "\n".join(f"Observation {i}: Something the model made up about the topic." for i in range(20))
+
+def cot_script(prompt: str, rng) -> str:
+    """
+    Answer every Chain of Thought prompt with the same reasoning.
+    """
+    return COT_RESPONSE
+
+def self_consistency_script(prompt: str, rng) -> str:
+    """
+    Sample a reasoning path whose answer is right most of the time.
+    """
+    answer = rng.choices(["36", "12", "24"], weights=[0.7, 0.2, 0.1])[0]
+    return f"Each brief takes some hours. The answer is {answer}."
+
+def react_script(prompt: str, rng) -> str:
+    """
+    Look up one topic per step and answer on the last step, running on past the action like an unstopped model.
+    """
+    step = int(prompt.rsplit("Thought ", 1)[1].split(":")[0])
+    if step >= REACT_STEPS:
+        return f" I have looked up everything. Answer[Topic 1]\n{HALLUCINATED_TAIL}"
+    return f" I need to look up Topic {step}.\nAction {step}: Topic {step}<STOP>\n{HALLUCINATED_TAIL}"
+
+def langchain_script(prompt: str, rng) -> str:
+    """
+    Drive the Langchain zero-shot ReAct agent through lookups and a final answer.
+    """
+    step = prompt.rsplit("\nQuestion: ", 1)[1].count("\nObservation:") + 1
+    if step >= REACT_STEPS:
+        return " I now know the final answer\nFinal Answer: Topic 1"
+    return f" I need to look up Topic {step}.\nAction: Wikipedia\nAction Input: Topic {step}\n{HALLUCINATED_TAIL}"
+
+def make_langchain_agent(fake_llm: FakeLLM, wiki: FakeWikipedia):
+    """
+    Build a LangchainReActAgent wired to the fakes, or return None if Langchain is missing.
+
+    The agent's constructor always loads Vertex AI and the live Wikipedia tool,
+    so the instance is assembled here instead.
+    """
+    try:
+        from langchain.agents import AgentType, initialize_agent
+        from langchain.llms.base import LLM
+        from langchain.tools import Tool
+        from langchain_agent import LangchainReActAgent
+    except ImportError:
+        return None
+
+    class ScriptedLLM(LLM):
+        fake: Any
+
+        @property
+        def _llm_type(self) -> str:
+            return "scripted"
+
+        def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+            return self.fake.call_llm(prompt, show_activity=False, stop_sequences=stop)
+
+    agent = LangchainReActAgent.__new__(LangchainReActAgent)
+    agent.llm = ScriptedLLM(fake=fake_llm)
+    agent.tools = [Tool(name="Wikipedia", func=wiki.wiki_tool, description="Look up a topic on Wikipedia.")]
+    agent.agent = initialize_agent(agent.tools, agent.llm, agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION)
+    return agent
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Return a percentile by linear interpolation between the closest ranks.
+    """
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def measure(operation: Callable[[], object], fake_llm: FakeLLM, iterations: int, alloc_iterations: int) -> Dict[str, float]:
+    """
+    Time an operation, then trace its allocations in a separate pass.
+
+    Args:
+        operation (Callable[[], object]): One unit of work, such as answering a question.
+        fake_llm (FakeLLM): The LLM the operation calls, for prompt and token counts.
+        iterations (int): Number of timed runs.
+        alloc_iterations (int): Number of runs traced for allocations.
+
+    Returns:
+        Dict[str, float]: Throughput, latency percentiles, peak allocation and
+        prompt and token volume per operation.
+    """
+    fake_llm.reset_stats()
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            operation()
+            latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+        calls, prompt_bytes, tokens = fake_llm.calls, fake_llm.prompt_bytes, fake_llm.generated_tokens
+
+        peaks = []
+        for _ in range(alloc_iterations):
+            tracemalloc.start()
+            operation()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "ops_per_second": iterations / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_alloc_kib": statistics.mean(peaks) / 1024 if peaks else 0.0,
+        "llm_calls_per_op": calls / iterations,
+        "prompt_bytes_per_op": prompt_bytes / iterations,
+        "generated_tokens_per_op": tokens / iterations,
+    }
+
+def build_suites(fake_options: dict, wiki_latency_ms: float, batch_size: int, samples: int) -> Dict[str, tuple]:
+    """
+    Return each benchmark's operation and the fake LLM it uses, by name.
+    """
+    suites = {}
+
+    cot_llm = FakeLLM(cot_script, **fake_options)
+    chain = ChainOfThought(llm=cot_llm, tool=FakeWikipedia(latency_ms=wiki_latency_ms))
+    suites["chain_of_thought"] = (lambda: chain.generate_response(COT_EXEMPLAR, COT_QUESTION), cot_llm)
+    questions = [f"{COT_QUESTION} ({i})" for i in range(batch_size)]
+    suites["chain_of_thought_batch"] = (lambda: chain.generate_batch(COT_EXEMPLAR, questions), cot_llm)
+
+    react_llm = FakeLLM(react_script, **fake_options)
+    react = ReAct(llm=react_llm, tool=FakeWikipedia(latency_ms=wiki_latency_ms))
+    suites["react"] = (lambda: react.react_chain(REACT_CONTEXT, REACT_EXEMPLAR, REACT_QUESTION), react_llm)
+    suites["react_stream"] = (lambda: react.react_chain(REACT_CONTEXT, REACT_EXEMPLAR, REACT_QUESTION, stream=True),
+                              react_llm)
+
+    sc_llm = FakeLLM(self_consistency_script, **fake_options)
+    self_consistency = SelfConsistency(llm=sc_llm, tool=FakeWikipedia(latency_ms=wiki_latency_ms))
+    prompt = f"{COT_EXEMPLAR}{COT_QUESTION}\nA:"
+    suites["self_consistency"] = (lambda: self_consistency.run_multiple_responses(prompt, sc_llm.parameters, runs=samples),
+                                  sc_llm)
+    suites["self_consistency_concurrent"] = (
+        lambda: self_consistency.run_multiple_responses(prompt, sc_llm.parameters, runs=samples, max_concurrency=samples),
+        sc_llm,
+    )
+    suites["self_consistency_adaptive"] = (
+        lambda: self_consistency.run_adaptive_responses(prompt, sc_llm.parameters, max_runs=samples), sc_llm
+    )
+    # Half the samples of uniform allocation over the batch, steered to the split questions.
+    prompts = [f"{COT_EXEMPLAR}{question}\nA:" for question in questions]
+    suites["self_consistency_budgeted"] = (
+        lambda: self_consistency.run_budgeted_responses(prompts, sc_llm.parameters, batch_size * samples // 2,
+                                                        max_runs=samples, max_concurrency=samples),
+        sc_llm,
+    )
+
+    langchain_llm = FakeLLM(langchain_script, **fake_options)
+    agent = make_langchain_agent(langchain_llm, FakeWikipedia(latency_ms=wiki_latency_ms))
+    if agent is not None:
+        # The agent is assembled without __init__, so it has no concurrency cap; call the executor directly.
+        suites["langchain_agent"] = (lambda: agent.agent.run(REACT_QUESTION), langchain_llm)
+    return suites
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Run the selected benchmarks and print a table, optionally writing JSON for CI.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the reasoning strategies offline.")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed runs per benchmark.")
+    parser.add_argument("--alloc-iterations", type=int, default=5, help="Runs traced for allocations.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Median first-token latency of the fake LLM.")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal sigma of the first-token latency.")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Mean generation rate; instant if unset.")
+    parser.add_argument("--tokens-per-second-sigma", type=float, default=0.0, help="Spread of the generation rate.")
+    parser.add_argument("--wiki-latency-ms", type=float, default=0.0, help="Delay of each fake Wikipedia lookup.")
+    parser.add_argument("--batch-size", type=int, default=20, help="Questions per generate_batch call.")
+    parser.add_argument("--samples", type=int, default=10, help="Samples per self-consistency run.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the fake LLM.")
+    parser.add_argument("--only", nargs="*", default=None, help="Names of the benchmarks to run.")
+    parser.add_argument("--json", default=None, help="Path to write the results as JSON.")
+    args = parser.parse_args(argv)
+
+    fake_options = {
+        "latency_ms": args.latency_ms,
+        "latency_sigma": args.latency_sigma,
+        "tokens_per_second": args.tokens_per_second,
+        "tokens_per_second_sigma": args.tokens_per_second_sigma,
+        "seed": args.seed,
+    }
+    suites = build_suites(fake_options, args.wiki_latency_ms, args.batch_size, args.samples)
+    results = {}
+    for name, (operation, fake_llm) in suites.items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = measure(operation, fake_llm, args.iterations, args.alloc_iterations)
+
+    print(f"{'benchmark':<28} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak KiB':>9} "
+          f"{'calls':>6} {'prompt B':>9} {'tokens':>7}")
+    for name, result in results.items():
+        print(f"{name:<28} {result['ops_per_second']:>9.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['peak_alloc_kib']:>9.1f} {result['llm_calls_per_op']:>6.1f} "
+              f"{result['prompt_bytes_per_op']:>9.0f} {result['generated_tokens_per_op']:>7.0f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"options": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
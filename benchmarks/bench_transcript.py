@@ -0,0 +1,62 @@
+# Micro-benchmark for building ReAct prompts: per-step cost versus chain length.
+
+# benchmarks/bench_transcript.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from transcript import ReActTranscript, split_response_lines
+
+OBSERVATION = "x" * 1000
+RESPONSE = "Thought: I need to look something up.\nAction: Something<STOP>\n" + "Observation: made up.\n" * 50
+
+def concatenation_step(next_llm_call: str, step: int) -> str:
+    """
+    One step of the original f-string prompt assembly and response parsing.
+    """
+    first_line = RESPONSE.splitlines()[0]
+    if len(RESPONSE.splitlines()) < 2:
+        return next_llm_call
+    second_line = RESPONSE.splitlines()[1]
+    usable_response = f"{first_line}\n{second_line}"
+    obs = f"Observation {step}: {OBSERVATION}"
+    return f"{next_llm_call} {usable_response}\n{obs}\nThought {step + 1}:"
+
+def transcript_step(transcript: ReActTranscript) -> str:
+    """
+    One step of the incremental transcript assembly and response parsing.
+    """
+    first_line, second_line = split_response_lines(RESPONSE)
+    transcript.add_step(first_line, second_line, OBSERVATION)
+    return transcript.render()
+
+def main(steps: int = 200, repeats: int = 20):
+    """
+    Print the mean per-step cost at several chain lengths for both builders.
+    """
+    checkpoints = {1, 10, 50, 100, steps}
+    old_times = {step: 0.0 for step in checkpoints}
+    new_times = {step: 0.0 for step in checkpoints}
+    for _ in range(repeats):
+        prompt = "Context\n\nExemplar\n\nQuestion: Q\nThought 1:"
+        transcript = ReActTranscript("Context", "Exemplar", "Q")
+        for step in range(1, steps + 1):
+            start = time.perf_counter()
+            prompt = concatenation_step(prompt, step)
+            middle = time.perf_counter()
+            transcript_step(transcript)
+            end = time.perf_counter()
+            if step in checkpoints:
+                old_times[step] += middle - start
+                new_times[step] += end - middle
+        assert prompt == transcript.render()
+
+    print(f"{'step':>6} {'concatenation (us)':>20} {'transcript (us)':>16}")
+    for step in sorted(checkpoints):
+        print(f"{step:>6} {old_times[step] / repeats * 1e6:>20.1f} {new_times[step] / repeats * 1e6:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# Scripted stand-ins for the LLM and Wikipedia, for offline benchmarks.
+
+# benchmarks/fakes.py
+
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Rough size of a token, used to turn response length into generation time.
+CHARS_PER_TOKEN = 4
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text.
+    """
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+def truncate_at_stop(text: str, stop_sequences: Optional[List[str]]) -> str:
+    """
+    Cut a text at the first stop sequence, as the model would.
+    """
+    cuts = [text.find(stop) for stop in stop_sequences or [] if stop in text]
+    return text[:min(cuts)] if cuts else text
+
+class FakeLLM:
+    """
+    Scripted replacement for LLMInterface with simulated latency.
+
+    Each call asks `script(prompt, rng)` for the full response the model would
+    produce, then waits for a first-token latency drawn from a log-normal
+    distribution plus the time needed to generate the returned tokens at a rate
+    drawn from a normal distribution. All draws come from one seeded generator,
+    so a run is repeatable. Prompt bytes and generated tokens are counted.
+    """
+
+    def __init__(self, script: Callable[[str, random.Random], str], latency_ms: float = 0.0, latency_sigma: float = 0.0,
+                 tokens_per_second: Optional[float] = None, tokens_per_second_sigma: float = 0.0, seed: int = 0):
+        """
+        Initialize the fake LLM.
+
+        Args:
+            script (Callable[[str, random.Random], str]): Maps a prompt to the full response.
+            latency_ms (float): Median first-token latency in milliseconds.
+            latency_sigma (float): Sigma of the log-normal first-token latency.
+            tokens_per_second (Optional[float]): Mean generation rate. Generation is
+                instant if None.
+            tokens_per_second_sigma (float): Standard deviation of the generation rate.
+            seed (int): Seed for the script and the latency draws.
+        """
+        self.script = script
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.tokens_per_second_sigma = tokens_per_second_sigma
+        self.parameters = {"temperature": 0, "max_output_tokens": 1024, "top_p": 0.8, "top_k": 40}
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Zero the call, prompt byte and token counters.
+        """
+        self.calls = 0
+        self.prompt_bytes = 0
+        self.generated_tokens = 0
+
+    def _respond(self, prompt: str):
+        """
+        Draw a response and its timing, and count the prompt.
+
+        Returns:
+            Tuple[str, float, float]: The full response, the first-token delay and
+            the delay per generated token, both in seconds.
+        """
+        with self._lock:
+            self.calls += 1
+            self.prompt_bytes += len(prompt.encode("utf-8"))
+            response = self.script(prompt, self.rng)
+            first_token = self.latency_ms / 1000 * self.rng.lognormvariate(0, self.latency_sigma) if self.latency_ms else 0.0
+            per_token = 0.0
+            if self.tokens_per_second:
+                rate = max(1.0, self.rng.gauss(self.tokens_per_second, self.tokens_per_second_sigma))
+                per_token = 1 / rate
+        return response, first_token, per_token
+
+    def _count(self, response: str):
+        """
+        Count the tokens of a returned response.
+        """
+        with self._lock:
+            self.generated_tokens += count_tokens(response)
+
+    def call_llm(self, prompt: str, show_activity: bool = True, sample_index: Optional[int] = None,
+                 stop_sequences: Optional[List[str]] = None) -> str:
+        """
+        Return the scripted response after the simulated generation time.
+        """
+        response, first_token, per_token = self._respond(prompt)
+        response = truncate_at_stop(response, stop_sequences)
+        self._count(response)
+        time.sleep(first_token + per_token * count_tokens(response))
+        return response
+
+    async def call_llm_async(self, prompt: str, show_activity: bool = False, sample_index: Optional[int] = None,
+                             stop_sequences: Optional[List[str]] = None) -> str:
+        """
+        Return the scripted response without blocking the event loop.
+        """
+        response, first_token, per_token = self._respond(prompt)
+        response = truncate_at_stop(response, stop_sequences)
+        self._count(response)
+        await asyncio.sleep(first_token + per_token * count_tokens(response))
+        return response
+
+    def stream_llm(self, prompt: str, show_activity: bool = True, stop_sequences: Optional[List[str]] = None,
+                   stop_condition: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Stream the scripted response one token at a time, ending early like LLMInterface.stream_llm.
+        """
+        full_response, first_token, per_token = self._respond(prompt)
+        time.sleep(first_token)
+        response = ""
+        for start in range(0, len(full_response), CHARS_PER_TOKEN):
+            time.sleep(per_token)
+            response += full_response[start:start + CHARS_PER_TOKEN]
+            cut = truncate_at_stop(response, stop_sequences)
+            if cut != response:
+                response = cut
+                break
+            if stop_condition is not None and stop_condition(response):
+                break
+        self._count(response)
+        return response
+
+class FakeWikipedia:
+    """
+    Local replacement for WikipediaTool serving generated articles.
+
+    Known titles return their text from `articles`; any other query returns a
+    deterministic filler article naming the query.
+    """
+
+    def __init__(self, articles: Optional[Dict[str, str]] = None, return_chars: int = 1000, latency_ms: float = 0.0):
+        """
+        Initialize the fake Wikipedia.
+
+        Args:
+            articles (Optional[Dict[str, str]]): Article text by title.
+            return_chars (int): Number of characters to return from the article.
+            latency_ms (float): Delay of each lookup in milliseconds.
+        """
+        self.articles = articles or {}
+        self.return_chars = return_chars
+        self.latency_ms = latency_ms
+        self.lookups = 0
+
+    def wiki_tool(self, query: str) -> str:
+        """
+        Return the start of the article for a query after the lookup delay.
+        """
+        self.lookups += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        article = self.articles.get(query)
+        if article is None:
+            sentence = f"{query} is the subject of this article. "
+            article = sentence * (self.return_chars // len(sentence) + 1)
+        return article[:self.return_chars]
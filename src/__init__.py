@@ -1 +1,53 @@
+# Reasoning strategies for LLMs. Public classes are imported on first access, so
+# importing the package does not load Vertex AI, Langchain, Wikipedia or matplotlib.
 
+# src/__init__.py
+
+import importlib
+
+# Public name -> module that defines it.
+_LAZY_ATTRIBUTES = {
+    "AllChainDetails": "all_chain_details",
+    "ChainMetrics": "all_chain_details",
+    "AgentPool": "langchain_agent",
+    "ChainOfThought": "chain_of_thought",
+    "FileStateStore": "chain_state",
+    "MemoryStateStore": "chain_state",
+    "ReActState": "chain_state",
+    "ContextBudget": "context_budget",
+    "ExemplarBank": "exemplars",
+    "HedgePolicy": "hedging",
+    "LangchainReActAgent": "langchain_agent",
+    "ResponseCache": "llm_cache",
+    "LLMInterface": "llm_interface",
+    "MetricsCollector": "metrics",
+    "RateLimiter": "rate_limit",
+    "NearDuplicateCache": "near_duplicate",
+    "ReAct": "react",
+    "SelfConsistency": "self_consistency",
+    "WikipediaTool": "tools",
+    "ToolRegistry": "tool_registry",
+    "ReActTranscript": "transcript",
+    "ReplayLLM": "traces",
+    "ReplayWikipediaTool": "traces",
+    "TraceRecorder": "traces",
+    "TraceReplay": "traces",
+    "CorpusWikipediaTool": "wiki_corpus",
+    "WikipediaCorpus": "wiki_corpus",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+def __getattr__(name: str):
+    """
+    Import the module defining a public name on first access.
+    """
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_ATTRIBUTES])
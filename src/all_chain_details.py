@@ -2,7 +2,9 @@
 
 # src/all_chain_details.py
 
+import time
 from langchain.callbacks.base import BaseCallbackHandler
+from .metrics import MetricsCollector, estimate_tokens
 
 class AllChainDetails(BaseCallbackHandler):
     """
@@ -25,3 +27,64 @@ class AllChainDetails(BaseCallbackHandler):
 
     def on_chain_end(self, outputs: dict, **kwargs):
         print("\n\033[1mChain ended.\033[0m")
+
+class ChainMetrics(BaseCallbackHandler):
+    """
+    Callback handler that records chain, LLM and tool timings into a MetricsCollector
+    instead of printing them.
+    """
+
+    def __init__(self, metrics: MetricsCollector):
+        """
+        Initialize the handler.
+
+        Args:
+            metrics (MetricsCollector): The collector to record into.
+        """
+        self.metrics = metrics
+        self._starts = {}
+
+    def _start(self, run_id):
+        self._starts[run_id] = time.perf_counter()
+
+    def _end(self, run_id, name: str):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            self.metrics.observe(name, time.perf_counter() - start)
+
+    def on_llm_start(self, serialized: dict, prompts: list, run_id=None, **kwargs):
+        self._start(run_id)
+        self.metrics.increment("langchain_llm_calls_total")
+        for prompt in prompts:
+            self.metrics.observe("langchain_prompt_chars", len(prompt))
+            self.metrics.increment("langchain_prompt_tokens_total", estimate_tokens(prompt))
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        self.metrics.increment("langchain_streamed_tokens_total")
+
+    def on_llm_end(self, response, run_id=None, **kwargs):
+        self._end(run_id, "langchain_llm_seconds")
+
+    def on_llm_error(self, error: BaseException, run_id=None, **kwargs):
+        self._end(run_id, "langchain_llm_seconds")
+        self.metrics.increment("langchain_llm_errors_total")
+
+    def on_tool_start(self, serialized: dict, input_str: str, run_id=None, **kwargs):
+        self._start(run_id)
+
+    def on_tool_end(self, output: str, run_id=None, **kwargs):
+        self._end(run_id, "langchain_tool_seconds")
+
+    def on_tool_error(self, error: BaseException, run_id=None, **kwargs):
+        self._end(run_id, "langchain_tool_seconds")
+        self.metrics.increment("langchain_tool_errors_total")
+
+    def on_chain_start(self, serialized: dict, inputs: dict, run_id=None, **kwargs):
+        self._start(run_id)
+
+    def on_chain_end(self, outputs: dict, run_id=None, **kwargs):
+        self._end(run_id, "langchain_chain_seconds")
+
+    def on_chain_error(self, error: BaseException, run_id=None, **kwargs):
+        self._end(run_id, "langchain_chain_seconds")
+        self.metrics.increment("langchain_chain_errors_total")
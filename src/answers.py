@@ -0,0 +1,128 @@
+# Extracts, canonicalizes and interns final answers from LLM responses.
+
+# src/answers.py
+
+import re
+from typing import Dict, List, Optional
+
+# Text after the first "The answer is", up to the next period or the next "The answer is".
+# A period between two digits is part of a number, not the end of the answer.
+_ANSWER = re.compile(r"The answer is((?:\d\.(?=\d)|(?!The answer is)[^.])*)")
+# A leading number, with optional sign, currency sign, thousands separators and decimals.
+# The integer part may be left out, as in ".5".
+_NUMBER = re.compile(r"[-+]?[$€£]?(\d{1,3}(?:,\d{3})+|\d+|(?=\.\d))(\.\d+)?")
+# What may follow a number that still reads as a plain quantity: one or two words,
+# such as "units" or "tennis balls", or "%".
+_UNIT = re.compile(r"[^\W\d]+(?:\s+[^\W\d]+)?|%")
+# Words that change the quantity, so "2 million" or "3 and a half" keep them.
+_SCALE_WORDS = frozenset("""
+hundred thousand million billion trillion k m bn dozen dozens score half halves quarter quarters third thirds
+and of times percent
+""".split())
+_LEADING_ARTICLE = re.compile(r"^(?:the|a|an)\s+")
+_EDGE_PUNCTUATION = " \t\n\"'`*.:;,!?()[]{}"
+# Leading punctuation to strip; a '.' before a digit is a decimal point.
+_LEADING_PUNCTUATION = re.compile(r"^(?:[ \t\n\"'`*:;,!?()\[\]{}]|\.(?!\d))+")
+
+MISSING_ANSWER = "NA"
+
+def extract_answer(response: str) -> str:
+    """
+    Extract the final answer from a response in one regex pass.
+
+    Args:
+        response (str): The LLM's response.
+
+    Returns:
+        str: The answer, or "NA" if none was found.
+    """
+    match = _ANSWER.search(response)
+    return match.group(1).strip() if match else MISSING_ANSWER
+
+def canonicalize_answer(answer: str) -> str:
+    """
+    Reduce an answer to a canonical form so equivalent answers compare equal.
+
+    Numbers lose thousands separators, currency signs, trailing decimal zeros
+    and a trailing unit ("1,400", "1400" and "1400 units" all become "1400").
+    A trailing scale word or phrase, such as "2 million" or "3 and a half", is
+    not a unit, so the answer is kept as text.
+    Other answers are case-folded, with whitespace collapsed and surrounding
+    punctuation and a leading article removed.
+
+    Args:
+        answer (str): The extracted answer.
+
+    Returns:
+        str: The canonical answer, or "" if nothing is left.
+    """
+    text = _LEADING_PUNCTUATION.sub("", answer).rstrip(_EDGE_PUNCTUATION)
+    match = _NUMBER.match(text)
+    if match is not None:
+        rest = text[match.end():].strip(_EDGE_PUNCTUATION)
+        if not rest or (_UNIT.fullmatch(rest) and _SCALE_WORDS.isdisjoint(rest.casefold().split())):
+            integer = match.group(1).replace(",", "") or "0"
+            fraction = (match.group(2) or "").rstrip("0").rstrip(".")
+            sign = "-" if text.startswith("-") else ""
+            number = f"{sign}{int(integer)}{fraction}"
+            return "0" if number == "-0" else number
+    text = " ".join(text.casefold().split())
+    return _LEADING_ARTICLE.sub("", text)
+
+class AnswerVocabulary:
+    """
+    Interns canonical answers to dense integer ids.
+
+    Missing answers ("NA" or nothing left after canonicalization) map to -1.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty vocabulary.
+        """
+        self.ids: Dict[str, int] = {}
+        self.answers: List[str] = []
+        # Raw answer -> id, so repeated answers skip canonicalization.
+        self._raw_ids: Dict[str, int] = {MISSING_ANSWER: -1}
+
+    def intern(self, answer: str) -> int:
+        """
+        Return the id of an answer, adding it if it is new.
+
+        Args:
+            answer (str): The extracted answer.
+
+        Returns:
+            int: The answer's id, or -1 for a missing answer.
+        """
+        answer_id = self._raw_ids.get(answer)
+        if answer_id is not None:
+            return answer_id
+        canonical = canonicalize_answer(answer)
+        if not canonical:
+            answer_id = -1
+        else:
+            answer_id = self.ids.get(canonical)
+            if answer_id is None:
+                answer_id = self.ids[canonical] = len(self.answers)
+                self.answers.append(canonical)
+        self._raw_ids[answer] = answer_id
+        return answer_id
+
+    def lookup(self, answer_id: int) -> Optional[str]:
+        """
+        Return the canonical answer for an id.
+
+        Args:
+            answer_id (int): The id returned by `intern`.
+
+        Returns:
+            Optional[str]: The canonical answer, or None for -1.
+        """
+        return None if answer_id < 0 else self.answers[answer_id]
+
+    def __len__(self) -> int:
+        """
+        Return the number of distinct answers.
+        """
+        return len(self.answers)
@@ -2,37 +2,111 @@
 
 # src/chain_of_thought.py
 
-from llm_interface import LLMInterface
-from tools import WikipediaTool
+import asyncio
+from typing import List, Optional, Union
+from .exemplars import ExemplarBank, resolve_exemplar
+from .llm_interface import LLMInterface
+from .near_duplicate import NearDuplicateCache, namespace_for
+from .tools import WikipediaTool
 
 class ChainOfThought:
     """
     Implements Chain of Thought prompting for LLMs.
     """
 
-    def __init__(self, llm: LLMInterface, tool: WikipediaTool):
+    def __init__(self, llm: LLMInterface, tool: WikipediaTool, near_cache: Optional[NearDuplicateCache] = None):
         """
         Initialize the ChainOfThought instance.
 
         Args:
             llm (LLMInterface): An instance of LLMInterface.
             tool (WikipediaTool): An instance of WikipediaTool.
+            near_cache (Optional[NearDuplicateCache]): Serves responses to reworded
+                questions answered before with the same exemplar. Every question
+                goes to the LLM if None.
         """
         self.llm = llm
         self.tool = tool
+        self.near_cache = near_cache
 
-    def generate_response(self, exemplar: str, question: str) -> str:
+    def generate_response(self, exemplar: Union[str, ExemplarBank], question: str) -> str:
         """
         Generate a response using Chain of Thought prompting.
 
         Args:
-            exemplar (str): The exemplar demonstrating reasoning steps.
+            exemplar (Union[str, ExemplarBank]): The exemplar demonstrating reasoning
+                steps, or a bank to pick the exemplars for the question from.
             question (str): The question to be answered.
 
         Returns:
             str: The LLM's response.
         """
+        exemplar = resolve_exemplar(exemplar, question)
+        if self.near_cache is not None:
+            namespace = namespace_for("cot", exemplar)
+            hit = self.near_cache.lookup(question, namespace)
+            if hit is not None:
+                return hit[0]["response"]
         llm_call = f"{exemplar}{question}\nA:"
         response = self.llm.call_llm(llm_call)
+        if self.near_cache is not None:
+            self.near_cache.put(question, {"response": response}, namespace)
         return response
 
+    def generate_batch(self, exemplar: Union[str, ExemplarBank], questions: List[str],
+                       max_concurrency: int = 10) -> List[Union[str, Exception]]:
+        """
+        Generate responses for many questions that share one exemplar.
+
+        Every prompt starts with the exemplar unchanged, so the prompts share
+        a common prefix that a caching backend can reuse; with a bank, questions
+        that pick the same exemplars share the same prefix. Results are
+        returned in input order; a question whose call fails gets its exception
+        in place of a response, and the other questions are unaffected.
+
+        Args:
+            exemplar (Union[str, ExemplarBank]): The exemplar demonstrating reasoning
+                steps, or a bank to pick each question's exemplars from.
+            questions (List[str]): The questions to be answered.
+            max_concurrency (int): Maximum number of calls in flight.
+
+        Returns:
+            List[Union[str, Exception]]: The LLM's response, or the raised
+            exception, for each question.
+        """
+        return asyncio.run(self.generate_batch_async(exemplar, questions, max_concurrency))
+
+    async def generate_batch_async(self, exemplar: Union[str, ExemplarBank], questions: List[str],
+                                   max_concurrency: int = 10) -> List[Union[str, Exception]]:
+        """
+        Generate responses for many questions concurrently.
+
+        Questions are served from `near_cache` as in `generate_response`; reworded
+        questions of one batch that are in flight together both go to the LLM.
+
+        Args:
+            exemplar (Union[str, ExemplarBank]): The exemplar demonstrating reasoning
+                steps, or a bank to pick each question's exemplars from.
+            questions (List[str]): The questions to be answered.
+            max_concurrency (int): Maximum number of calls in flight.
+
+        Returns:
+            List[Union[str, Exception]]: The LLM's response, or the raised
+            exception, for each question.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def generate(question: str) -> str:
+            prompt_exemplar = resolve_exemplar(exemplar, question)
+            if self.near_cache is not None:
+                namespace = namespace_for("cot", prompt_exemplar)
+                hit = self.near_cache.lookup(question, namespace)
+                if hit is not None:
+                    return hit[0]["response"]
+            async with semaphore:
+                response = await self.llm.call_llm_async(f"{prompt_exemplar}{question}\nA:", show_activity=False)
+            if self.near_cache is not None:
+                self.near_cache.put(question, {"response": response}, namespace)
+            return response
+
+        return await asyncio.gather(*(generate(question) for question in questions), return_exceptions=True)
@@ -0,0 +1,214 @@
+# Serializable ReAct chain state and stores that persist it after every step.
+
+# src/chain_state.py
+
+import json
+import os
+import threading
+import uuid
+from typing import Dict, List, Optional
+from .transcript import ReActTranscript
+
+class ReActState:
+    """
+    Everything needed to continue a ReAct chain: the transcript, the step
+    limit and the action whose lookup has not finished yet.
+
+    `pending_action` is set once the LLM has chosen an action and cleared once
+    the observation is in the transcript, so a resumed chain never repeats an
+    LLM call or a lookup that already completed.
+    """
+
+    def __init__(self, transcript: ReActTranscript, max_steps: int = 7, chain_id: Optional[str] = None):
+        """
+        Initialize the chain state.
+
+        Args:
+            transcript (ReActTranscript): The prompt built so far.
+            max_steps (int): Maximum number of ReAct steps.
+            chain_id (Optional[str]): Identifier of the chain. A random one is used if None.
+        """
+        self.chain_id = chain_id or uuid.uuid4().hex
+        self.transcript = transcript
+        self.max_steps = max_steps
+        # {"thought": ..., "action": ..., "query": ...} between the LLM call and the lookup.
+        self.pending_action: Optional[Dict[str, str]] = None
+        self.answer: Optional[str] = None
+        self.done = False
+        # Normalized action -> observation, reused instead of running the action.
+        self.known_observations: Dict[str, str] = {}
+
+    def to_dict(self) -> dict:
+        """
+        Return the state as JSON-serializable data.
+        """
+        return {
+            "chain_id": self.chain_id,
+            "transcript": self.transcript.to_dict(),
+            "max_steps": self.max_steps,
+            "pending_action": self.pending_action,
+            "answer": self.answer,
+            "done": self.done,
+            "known_observations": self.known_observations,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ReActState":
+        """
+        Rebuild a state saved with `to_dict`.
+
+        Args:
+            data (dict): The saved state.
+
+        Returns:
+            ReActState: The restored state.
+        """
+        state = cls(ReActTranscript.from_dict(data["transcript"]), data["max_steps"], data["chain_id"])
+        state.pending_action = data["pending_action"]
+        state.answer = data["answer"]
+        state.done = data["done"]
+        state.known_observations = data.get("known_observations", {})
+        return state
+
+    def to_json(self) -> str:
+        """
+        Serialize the state to a JSON string.
+        """
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text: str) -> "ReActState":
+        """
+        Deserialize a state written by `to_json`.
+        """
+        return cls.from_dict(json.loads(text))
+
+class MemoryStateStore:
+    """
+    Keeps chain states in memory, serialized, for tests and single-process use.
+
+    A store needs `save(state)`, `load(chain_id)`, `delete(chain_id)` and
+    `chain_ids()`; any object with these methods can be passed to ReAct.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty store.
+        """
+        self._states: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def save(self, state: ReActState):
+        """
+        Store a snapshot of a chain state.
+
+        Args:
+            state (ReActState): The state to store.
+        """
+        text = state.to_json()
+        with self._lock:
+            self._states[state.chain_id] = text
+
+    def load(self, chain_id: str) -> Optional[ReActState]:
+        """
+        Load a chain state.
+
+        Args:
+            chain_id (str): Identifier of the chain.
+
+        Returns:
+            Optional[ReActState]: The state, or None if it is not stored.
+        """
+        with self._lock:
+            text = self._states.get(chain_id)
+        return None if text is None else ReActState.from_json(text)
+
+    def delete(self, chain_id: str):
+        """
+        Remove a chain state if it is stored.
+
+        Args:
+            chain_id (str): Identifier of the chain.
+        """
+        with self._lock:
+            self._states.pop(chain_id, None)
+
+    def chain_ids(self) -> List[str]:
+        """
+        Return the identifiers of the stored chains.
+        """
+        with self._lock:
+            return list(self._states)
+
+class FileStateStore:
+    """
+    Keeps each chain state in its own JSON file in a directory.
+
+    Files are replaced atomically, so a crash mid-write leaves the previous
+    step's state intact. A shared directory lets another worker take over a chain.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize the store, creating the directory if needed.
+
+        Args:
+            directory (str): Directory of the state files.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, chain_id: str) -> str:
+        """
+        Return the path of a chain's state file.
+        """
+        return os.path.join(self.directory, f"{chain_id}.json")
+
+    def save(self, state: ReActState):
+        """
+        Write a snapshot of a chain state.
+
+        Args:
+            state (ReActState): The state to write.
+        """
+        path = self._path(state.chain_id)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(state.to_json())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+    def load(self, chain_id: str) -> Optional[ReActState]:
+        """
+        Read a chain state.
+
+        Args:
+            chain_id (str): Identifier of the chain.
+
+        Returns:
+            Optional[ReActState]: The state, or None if there is no file.
+        """
+        try:
+            with open(self._path(chain_id), encoding="utf-8") as f:
+                return ReActState.from_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def delete(self, chain_id: str):
+        """
+        Remove a chain's state file if it exists.
+
+        Args:
+            chain_id (str): Identifier of the chain.
+        """
+        try:
+            os.remove(self._path(chain_id))
+        except FileNotFoundError:
+            pass
+
+    def chain_ids(self) -> List[str]:
+        """
+        Return the identifiers of the stored chains.
+        """
+        return [name[:-len(".json")] for name in os.listdir(self.directory) if name.endswith(".json")]
@@ -0,0 +1,186 @@
+# Keeps ReAct prompts within a token budget by compacting earlier steps.
+
+# src/context_budget.py
+
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+from .metrics import estimate_tokens
+from .transcript import ReActTranscript, Step
+
+class TruncateObservations:
+    """
+    Cuts the observations of all but the last `keep_last` steps to `max_chars` characters.
+    """
+
+    def __init__(self, max_chars: int = 200, keep_last: int = 1):
+        """
+        Initialize the policy.
+
+        Args:
+            max_chars (int): Characters kept from each earlier observation.
+            keep_last (int): Number of most recent observations kept verbatim.
+        """
+        self.max_chars = max_chars
+        self.keep_last = keep_last
+
+    def __call__(self, steps: List[Step]) -> List[Step]:
+        """
+        Compact the steps.
+
+        Args:
+            steps (List[Step]): The completed steps, oldest first.
+
+        Returns:
+            List[Step]: The compacted steps.
+        """
+        cut = max(0, len(steps) - self.keep_last)
+        compacted = [
+            step._replace(observation=f"{step.observation[:self.max_chars].rstrip()} ...")
+            if len(step.observation) > self.max_chars else step
+            for step in steps[:cut]
+        ]
+        return compacted + steps[cut:]
+
+class KeepLastObservations:
+    """
+    Replaces the observations of all but the last `keep_last` steps with a placeholder.
+
+    Thoughts and actions are kept, so the LLM still sees which lookups it made.
+    """
+
+    def __init__(self, keep_last: int = 1, placeholder: str = "(omitted)"):
+        """
+        Initialize the policy.
+
+        Args:
+            keep_last (int): Number of most recent observations kept.
+            placeholder (str): Text that replaces the dropped observations.
+        """
+        self.keep_last = keep_last
+        self.placeholder = placeholder
+
+    def __call__(self, steps: List[Step]) -> List[Step]:
+        """
+        Compact the steps.
+
+        Args:
+            steps (List[Step]): The completed steps, oldest first.
+
+        Returns:
+            List[Step]: The compacted steps.
+        """
+        cut = max(0, len(steps) - self.keep_last)
+        return [step._replace(observation=self.placeholder) for step in steps[:cut]] + steps[cut:]
+
+class SummarizeObservations:
+    """
+    Replaces the observations of all but the last `keep_last` steps with summaries.
+
+    Each observation is summarized once; later steps reuse the summary, so the
+    compacted prefix stays the same from step to step.
+    """
+
+    def __init__(self, summarize: Callable[[str], str], keep_last: int = 1):
+        """
+        Initialize the policy.
+
+        Args:
+            summarize (Callable[[str], str]): Returns a short summary of an
+                observation, for example `llm_summarizer(llm)`.
+            keep_last (int): Number of most recent observations kept verbatim.
+        """
+        self.summarize = summarize
+        self.keep_last = keep_last
+        self._summaries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _summary(self, observation: str) -> str:
+        """
+        Return the memoized summary of an observation.
+        """
+        with self._lock:
+            summary = self._summaries.get(observation)
+        if summary is None:
+            summary = self.summarize(observation).strip()
+            with self._lock:
+                self._summaries[observation] = summary
+        return summary
+
+    def __call__(self, steps: List[Step]) -> List[Step]:
+        """
+        Compact the steps.
+
+        Args:
+            steps (List[Step]): The completed steps, oldest first.
+
+        Returns:
+            List[Step]: The compacted steps.
+        """
+        cut = max(0, len(steps) - self.keep_last)
+        return [step._replace(observation=self._summary(step.observation)) for step in steps[:cut]] + steps[cut:]
+
+def llm_summarizer(llm, max_words: int = 40) -> Callable[[str], str]:
+    """
+    Build a summarizer for SummarizeObservations that asks an LLM.
+
+    Args:
+        llm (LLMInterface): The LLM to ask.
+        max_words (int): Length limit given in the instruction.
+
+    Returns:
+        Callable[[str], str]: Returns the LLM's summary of a text.
+    """
+    def summarize(text: str) -> str:
+        return llm.call_llm(f"Summarize the following text in at most {max_words} words, keeping names, "
+                            f"dates and numbers.\n\nText: {text}\n\nSummary:", show_activity=False)
+    return summarize
+
+class ContextBudget:
+    """
+    Renders ReAct prompts within a token budget.
+
+    When the full transcript is over budget, the policies are applied one
+    after another to the completed steps until the prompt fits. The context,
+    exemplar and question are never changed; if they alone exceed the budget
+    the prompt is as small as the last policy can make it.
+    """
+
+    def __init__(self, max_tokens: int, policies: Optional[Sequence[Callable[[List[Step]], List[Step]]]] = None,
+                 tokenizer: Callable[[str], int] = estimate_tokens):
+        """
+        Initialize the budget.
+
+        Args:
+            max_tokens (int): Maximum prompt size in tokens.
+            policies (Optional[Sequence[Callable]]): Compaction policies, mildest
+                first. Defaults to truncating, then dropping, earlier observations.
+            tokenizer (Callable[[str], int]): Counts the tokens of a prompt.
+                Defaults to a four-characters-per-token estimate.
+        """
+        self.max_tokens = max_tokens
+        self.policies = list(policies) if policies is not None else [
+            TruncateObservations(max_chars=200, keep_last=1),
+            KeepLastObservations(keep_last=1),
+        ]
+        self.tokenizer = tokenizer
+
+    def render(self, transcript: ReActTranscript) -> str:
+        """
+        Return the prompt for the next step, compacted if it is over budget.
+
+        Args:
+            transcript (ReActTranscript): The full transcript, which is not modified.
+
+        Returns:
+            str: The prompt for the next LLM call.
+        """
+        prompt = transcript.render()
+        if self.tokenizer(prompt) <= self.max_tokens:
+            return prompt
+        steps = list(transcript.steps)
+        for policy in self.policies:
+            steps = policy(steps)
+            prompt = transcript.render_steps(steps)
+            if self.tokenizer(prompt) <= self.max_tokens:
+                break
+        return prompt
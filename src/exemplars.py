@@ -0,0 +1,150 @@
+# Picks the exemplars most relevant to each question within a prompt-length budget.
+
+# src/exemplars.py
+
+import json
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+from .metrics import estimate_tokens
+from .passages import PassageIndex, tokenize
+
+class ExemplarBank:
+    """
+    Exemplars indexed by their questions with BM25.
+
+    An ExemplarBank can be passed wherever a strategy takes an exemplar string;
+    each question then gets the top `k` exemplars that fit in `max_tokens`.
+    Chosen exemplars keep their order in the bank, so a set of exemplars always
+    renders to the same prefix, and rendered prefixes are interned and reused.
+    Selection scores the whole bank, O(bank) per question, so the choice is
+    also kept per set of question words, which is all BM25 looks at.
+    """
+
+    def __init__(self, exemplars: Sequence[Tuple[str, str]], k: int = 2, max_tokens: Optional[int] = None,
+                 separator: str = "\n\n", suffix: str = "", tokenizer: Callable[[str], int] = estimate_tokens,
+                 max_prefixes: int = 1024):
+        """
+        Index the exemplars.
+
+        Args:
+            exemplars (Sequence[Tuple[str, str]]): (question, exemplar text) pairs; the
+                question is what a new question is matched against.
+            k (int): Maximum number of exemplars per prompt.
+            max_tokens (Optional[int]): Token budget of the rendered exemplars. No
+                budget if None.
+            separator (str): Text between exemplars.
+            suffix (str): Text after the last exemplar, such as "\\n\\nQ: " for Chain of Thought.
+            tokenizer (Callable[[str], int]): Counts the tokens of an exemplar.
+                Defaults to a four-characters-per-token estimate.
+            max_prefixes (int): Number of rendered prefixes kept, and of selections
+                kept per set of question words.
+        """
+        self.questions = [question for question, _ in exemplars]
+        self.texts = [text for _, text in exemplars]
+        self.k = k
+        self.max_tokens = max_tokens
+        self.separator = separator
+        self.suffix = suffix
+        self.max_prefixes = max_prefixes
+        self.index = PassageIndex(self.questions)
+        self.tokens = [tokenizer(text) for text in self.texts]
+        self._separator_tokens = tokenizer(separator) if separator else 0
+        self._prefixes = OrderedDict()
+        self._selections = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_jsonl(cls, path: str, **kwargs) -> "ExemplarBank":
+        """
+        Load a bank from a JSONL file with a "question" and an "exemplar" per line.
+
+        Args:
+            path (str): Path of the file.
+            **kwargs: Passed to the constructor.
+
+        Returns:
+            ExemplarBank: The bank.
+        """
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return cls([(record["question"], record["exemplar"]) for record in records], **kwargs)
+
+    def select(self, question: str) -> List[int]:
+        """
+        Pick the exemplars for a question.
+
+        Exemplars are taken most relevant first, ties in bank order, skipping
+        any that would exceed the budget.
+
+        Args:
+            question (str): The question.
+
+        Returns:
+            List[int]: Positions of the chosen exemplars in bank order.
+        """
+        scores = self.index.scores(question)
+        ranked = sorted(range(len(self.texts)), key=lambda position: (-scores[position], position))
+        chosen = []
+        used = 0
+        for position in ranked:
+            if len(chosen) == self.k:
+                break
+            cost = self.tokens[position] + (self._separator_tokens if chosen else 0)
+            if self.max_tokens is None or used + cost <= self.max_tokens:
+                chosen.append(position)
+                used += cost
+        return sorted(chosen)
+
+    def render(self, question: str) -> str:
+        """
+        Return the exemplar prefix for a question.
+
+        Args:
+            question (str): The question.
+
+        Returns:
+            str: The chosen exemplars joined by the separator, followed by the suffix.
+        """
+        words = frozenset(tokenize(question))
+        with self._lock:
+            key = self._selections.get(words)
+            if key is not None:
+                self._selections.move_to_end(words)
+        if key is None:
+            key = tuple(self.select(question))
+            with self._lock:
+                self._selections[words] = key
+                while len(self._selections) > self.max_prefixes:
+                    self._selections.popitem(last=False)
+        with self._lock:
+            prefix = self._prefixes.get(key)
+            if prefix is not None:
+                self._prefixes.move_to_end(key)
+                return prefix
+        prefix = sys.intern(self.separator.join(self.texts[position] for position in key) + self.suffix)
+        with self._lock:
+            self._prefixes[key] = prefix
+            while len(self._prefixes) > self.max_prefixes:
+                self._prefixes.popitem(last=False)
+        return prefix
+
+    def __len__(self) -> int:
+        """
+        Return the number of exemplars.
+        """
+        return len(self.texts)
+
+def resolve_exemplar(exemplar, question: str) -> str:
+    """
+    Return the exemplar text for a question.
+
+    Args:
+        exemplar (str or ExemplarBank): A fixed exemplar or a bank to select from.
+        question (str): The question.
+
+    Returns:
+        str: The exemplar text.
+    """
+    return exemplar if isinstance(exemplar, str) else exemplar.render(question)
@@ -0,0 +1,303 @@
+# Sends a duplicate of slow model calls and keeps whichever answer arrives first.
+
+# src/hedging.py
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Awaitable, Callable, Optional
+from .metrics import MetricsCollector
+
+class HedgeAbandoned(Exception):
+    """
+    Raised by a duplicate admitted after its call was already answered.
+    """
+
+class HedgePolicy:
+    """
+    Hedges calls that run past a latency percentile of recent calls.
+
+    The delay before hedging is the `percentile` of the latencies of the last
+    `window` first attempts, measured online. A call still running after that
+    delay gets a duplicate, and the first successful attempt wins; the other is
+    cancelled if it has not started, or left to finish and ignored. Every call
+    adds `budget` to an allowance that each hedge spends in full, so hedges stay
+    under `budget` times the number of calls, plus at most `burst`.
+
+    Attempts can be passed through an `admit` function, such as a rate
+    limiter's, so each attempt holds its own concurrency slot and quota for as
+    long as it runs, a losing attempt included. The delay is counted from the
+    moment the first attempt is admitted and starts, so waiting for a slot or a
+    thread never triggers a hedge.
+
+    Blocking attempts of calls that may be hedged run on a pool of
+    `max_workers` threads, so a caller can return as soon as either attempt
+    answers; when every thread is busy, further attempts wait for one. Calls
+    that cannot be hedged run on the caller's thread.
+    """
+
+    def __init__(self, percentile: float = 0.95, budget: float = 0.05, window: int = 200, min_samples: int = 20,
+                 min_delay: float = 0.05, burst: float = 10.0, max_workers: int = 32,
+                 metrics: Optional[MetricsCollector] = None, clock: Callable[[], float] = time.perf_counter):
+        """
+        Initialize the policy.
+
+        Args:
+            percentile (float): Fraction of recent latencies a call may run before it
+                is hedged, such as 0.95 for the p95.
+            budget (float): Hedges allowed per call, such as 0.05 for at most 5% extra calls.
+            window (int): Number of recent latencies the percentile is taken over.
+            min_samples (int): Latencies needed before any call is hedged.
+            min_delay (float): Shortest delay before hedging, in seconds.
+            burst (float): Largest number of hedges the allowance can save up.
+            max_workers (int): Threads running the blocking attempts of calls that may
+                be hedged; attempts beyond it wait for a thread.
+            metrics (Optional[MetricsCollector]): Records hedges, hedge wins and the
+                hedge delay. Hedging is not measured if None.
+            clock (Callable[[], float]): Monotonic clock in seconds.
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.burst = burst
+        self.max_workers = max_workers
+        self.metrics = metrics
+        self.clock = clock
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies = deque(maxlen=window)
+        self._allowance = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """
+        Add the latency of a successful attempt.
+
+        Args:
+            seconds (float): The attempt's latency.
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def delay(self) -> Optional[float]:
+        """
+        Return how long a call may run before it is hedged.
+
+        Returns:
+            Optional[float]: The delay in seconds, or None while there are fewer
+            than `min_samples` latencies.
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        position = min(len(latencies) - 1, int(self.percentile * len(latencies)))
+        return max(self.min_delay, latencies[position])
+
+    def _start_call(self):
+        """
+        Count a call and add its share to the hedge allowance.
+        """
+        with self._lock:
+            self.calls += 1
+            self._allowance = min(self.burst, self._allowance + self.budget)
+
+    def _can_hedge(self) -> bool:
+        """
+        Check whether the allowance holds a hedge, without spending it.
+        """
+        with self._lock:
+            return self._allowance >= 1
+
+    def _take_hedge(self) -> bool:
+        """
+        Spend a hedge from the allowance if one is left.
+        """
+        with self._lock:
+            allowed = self._allowance >= 1
+            if allowed:
+                self._allowance -= 1
+                self.hedges += 1
+        self._count("llm_hedges_total" if allowed else "llm_hedges_denied_total")
+        return allowed
+
+    def _won(self, hedged: bool):
+        """
+        Count a hedged call that the duplicate answered first.
+        """
+        if hedged:
+            with self._lock:
+                self.hedge_wins += 1
+            self._count("llm_hedge_wins_total")
+
+    def _timed(self, fn: Callable[[], str], started: Optional[threading.Event] = None) -> Callable[[], str]:
+        """
+        Wrap a blocking attempt so its latency is recorded when it succeeds.
+
+        Args:
+            fn (Callable[[], str]): The attempt.
+            started (Optional[threading.Event]): Set when the attempt starts.
+        """
+        def attempt() -> str:
+            if started is not None:
+                started.set()
+            start = self.clock()
+            response = fn()
+            self.record(self.clock() - start)
+            return response
+        return attempt
+
+    @staticmethod
+    def _guarded(fn: Callable, answered: threading.Event) -> Callable:
+        """
+        Wrap a duplicate so it is dropped if its call was answered while it waited for admission.
+        """
+        def attempt():
+            if answered.is_set():
+                raise HedgeAbandoned("The call was answered before the duplicate was admitted.")
+            return fn()
+        return attempt
+
+    def call(self, fn: Callable[[], str], admit: Optional[Callable[[Callable[[], str]], str]] = None) -> str:
+        """
+        Run a blocking call, hedging it if it runs past the delay.
+
+        A call that cannot be hedged, because there are too few latencies or no
+        hedge left in the allowance, runs on the caller's thread. Otherwise both
+        attempts run on the pool and the caller waits for whichever answers first.
+
+        Args:
+            fn (Callable[[], str]): Makes one attempt and returns the response. It
+                must be safe to run twice at once.
+            admit (Optional[Callable[[Callable[[], str]], str]]): Runs an attempt
+                under the caller's limits, such as
+                `lambda attempt: limiter.call(attempt, tokens)`. Attempts run
+                directly if None.
+
+        Returns:
+            str: The first successful response.
+
+        Raises:
+            Exception: The first attempt's error if every attempt failed.
+        """
+        run = admit or (lambda attempt: attempt())
+        self._start_call()
+        delay = self.delay()
+        if delay is None or not self._can_hedge():
+            return run(self._timed(fn))
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="llm-hedge")
+            executor = self._executor
+        started = threading.Event()
+        answered = threading.Event()
+        first = executor.submit(run, self._timed(fn, started))
+        # A first attempt that fails before it starts has nothing to wait for.
+        first.add_done_callback(lambda _: started.set())
+        attempts = [first]
+        try:
+            started.wait()
+            done, _ = wait_futures(attempts, timeout=delay)
+            if not done and self._take_hedge():
+                self._observe(delay)
+                attempts.append(executor.submit(run, self._guarded(fn, answered)))
+            pending = set(attempts)
+            while pending:
+                done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        for other in pending:
+                            other.cancel()
+                        self._won(future is not first)
+                        return future.result()
+            return first.result()
+        finally:
+            answered.set()
+
+    async def call_async(self, fn: Callable[[], Awaitable[str]],
+                         admit: Optional[Callable[[Callable[[], Awaitable[str]]], Awaitable[str]]] = None) -> str:
+        """
+        Run a call on the event loop, hedging it if it runs past the delay.
+
+        The losing attempt is cancelled, including one still waiting for admission.
+
+        Args:
+            fn (Callable[[], Awaitable[str]]): Makes one attempt and returns the response.
+            admit (Optional[Callable[[Callable[[], Awaitable[str]]], Awaitable[str]]]):
+                Runs an attempt under the caller's limits. Attempts run directly if None.
+
+        Returns:
+            str: The first successful response.
+
+        Raises:
+            Exception: The first attempt's error if every attempt failed.
+        """
+        started = asyncio.Event()
+
+        async def attempt() -> str:
+            started.set()
+            start = self.clock()
+            response = await fn()
+            self.record(self.clock() - start)
+            return response
+
+        run = admit or (lambda attempt: attempt())
+        self._start_call()
+        delay = self.delay()
+        if delay is None:
+            return await run(attempt)
+        attempts = [asyncio.ensure_future(run(attempt))]
+        attempts[0].add_done_callback(lambda _: started.set())
+        try:
+            await started.wait()
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done and self._take_hedge():
+                self._observe(delay)
+                attempts.append(asyncio.ensure_future(run(fn)))
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        self._won(task is not attempts[0])
+                        return task.result()
+            return attempts[0].result()
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """
+        Return the number of calls, hedges and hedges that won.
+        """
+        with self._lock:
+            return {"calls": self.calls, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
+
+    def _observe(self, delay: float):
+        """
+        Record the delay a call was hedged after, if metrics are recorded.
+        """
+        if self.metrics is not None:
+            self.metrics.observe("llm_hedge_delay_seconds", delay)
+
+    def _count(self, name: str):
+        """
+        Increment a counter if metrics are recorded.
+        """
+        if self.metrics is not None:
+            self.metrics.increment(name)
+
+    def close(self):
+        """
+        Shut down the threads running blocking attempts.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -2,17 +2,69 @@
 
 # src/langchain_agent.py
 
-from langchain.agents import AgentType, initialize_agent, load_tools
-from langchain.llms import VertexAI
-from langchain.tools import WikipediaQueryRun
-from langchain.utilities import WikipediaAPIWrapper
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import List, Optional
+from .llm_cache import ResponseCache
+from .rate_limit import AdaptiveConcurrency
+
+# (project_id, location) pairs vertexai.init has already run for in this process.
+_INITIALIZED_PROJECTS = set()
+_INIT_LOCK = threading.Lock()
+
+def init_vertexai(project_id: str, location: str):
+    """
+    Initialize Vertex AI once per project and location in this process.
+
+    Args:
+        project_id (str): Google Cloud project ID.
+        location (str): Google Cloud location.
+    """
+    with _INIT_LOCK:
+        if (project_id, location) in _INITIALIZED_PROJECTS:
+            return
+        import vertexai
+
+        vertexai.init(project=project_id, location=location)
+        _INITIALIZED_PROJECTS.add((project_id, location))
+
+def cached_tool(tool, cache: ResponseCache):
+    """
+    Wrap a Langchain tool so its lookups go through a response cache.
+
+    Concurrent lookups of the same query share one call, and the async path
+    runs the tool on a worker thread so it does not block the event loop.
+
+    Args:
+        tool (BaseTool): The Langchain tool, such as the Wikipedia tool.
+        cache (ResponseCache): The cache shared by the agents.
+
+    Returns:
+        Tool: A tool with the same name and description.
+    """
+    from langchain.agents import Tool
+
+    def key(query: str) -> str:
+        normalized = " ".join(query.split()).casefold()
+        return f"langchain_tool:{tool.name}:{normalized}"
+
+    def run(query: str) -> str:
+        return cache.get_or_compute(key(query), lambda: tool.run(query))
+
+    async def arun(query: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await cache.get_or_compute_async(key(query), lambda: loop.run_in_executor(None, tool.run, query))
+
+    return Tool(name=tool.name, description=tool.description, func=run, coroutine=arun)
 
 class LangchainReActAgent:
     """
     Implements a ReAct agent using Langchain.
     """
 
-    def __init__(self, model_name: str, project_id: str, location: str):
+    def __init__(self, model_name: str, project_id: str, location: str, cache: Optional[ResponseCache] = None,
+                 max_concurrency: int = 8):
         """
         Initialize the Langchain ReAct agent.
 
@@ -20,12 +72,41 @@ class LangchainReActAgent:
             model_name (str): Name of the Vertex AI model.
             project_id (str): Google Cloud project ID.
             location (str): Google Cloud location.
+            cache (Optional[ResponseCache]): Cache for Wikipedia lookups. Every lookup
+                goes to Wikipedia if None.
+            max_concurrency (int): Maximum number of queries run at once, counting
+                sync calls from every thread and async calls from every event loop.
         """
-        import vertexai
-        vertexai.init(project=project_id, location=location)
+        from langchain.agents import AgentType, initialize_agent, load_tools
+        from langchain.llms import VertexAI
+
+        init_vertexai(project_id, location)
         self.llm = VertexAI(model_name=model_name, temperature=0)
-        self.tools = load_tools(["wikipedia"], llm=self.llm)
+        tools = load_tools(["wikipedia"], llm=self.llm)
+        self.cache = cache
+        self.tools = tools if cache is None else [cached_tool(tool, cache) for tool in tools]
         self.agent = initialize_agent(self.tools, self.llm, agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION)
+        self.max_concurrency = max_concurrency
+        # A fixed limit: one set of slots for threads and event loops alike.
+        self._slots = AdaptiveConcurrency(initial=max_concurrency, minimum=max_concurrency,
+                                          maximum=max_concurrency)
+
+    @staticmethod
+    def _run_kwargs(verbose: bool) -> dict:
+        """
+        Return the keyword arguments that make a run print its steps.
+
+        Args:
+            verbose (bool): Whether to enable verbose mode.
+
+        Returns:
+            dict: Callbacks for a verbose run, otherwise nothing.
+        """
+        if not verbose:
+            return {}
+        from langchain.callbacks import StdOutCallbackHandler
+
+        return {"callbacks": [StdOutCallbackHandler()]}
 
     def run_query(self, query: str, verbose: bool = False) -> str:
         """
@@ -38,4 +119,114 @@ class LangchainReActAgent:
         Returns:
             str: The agent's response.
         """
-        return self.agent.run(query, verbose=verbose)
+        epoch = self._slots.acquire()
+        try:
+            return self.agent.run(query, **self._run_kwargs(verbose))
+        finally:
+            self._slots.release(epoch)
+
+    async def run_query_async(self, query: str, verbose: bool = False) -> str:
+        """
+        Run a query on Langchain's async path.
+
+        Shares the `max_concurrency` cap with `run_query` and with other event loops.
+
+        Args:
+            query (str): The query to be answered.
+            verbose (bool): Whether to enable verbose mode.
+
+        Returns:
+            str: The agent's response.
+        """
+        epoch = await self._slots.acquire_async()
+        try:
+            return await self.agent.arun(query, **self._run_kwargs(verbose))
+        finally:
+            self._slots.release(epoch)
+
+    async def run_queries_async(self, queries: List[str], verbose: bool = False) -> list:
+        """
+        Run several queries concurrently, up to `max_concurrency` at once.
+
+        Args:
+            queries (List[str]): The queries to be answered.
+            verbose (bool): Whether to enable verbose mode.
+
+        Returns:
+            list: The responses in query order; a failed query gives its exception.
+        """
+        return await asyncio.gather(*(self.run_query_async(query, verbose) for query in queries),
+                                    return_exceptions=True)
+
+class AgentPool:
+    """
+    Process-wide warm agents, built once per model, project and location.
+
+    The agent executor keeps no state between queries, so one warm agent
+    serves all concurrent queries for its configuration, up to its
+    concurrency cap. Agents of one configuration share one lookup cache.
+    Agents of different configurations are built concurrently; callers asking
+    for one that is being built wait for it.
+    """
+
+    # (model_name, project_id, location) -> Future of the agent.
+    _agents = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, model_name: str, project_id: str, location: str, cache: Optional[ResponseCache] = None,
+            max_concurrency: Optional[int] = None) -> LangchainReActAgent:
+        """
+        Return the warm agent for a configuration, building it on first use.
+
+        Args:
+            model_name (str): Name of the Vertex AI model.
+            project_id (str): Google Cloud project ID.
+            location (str): Google Cloud location.
+            cache (Optional[ResponseCache]): Cache for Wikipedia lookups. An in-memory
+                cache is used if None when the agent is built.
+            max_concurrency (Optional[int]): Concurrency cap. 8 if None when the agent
+                is built.
+
+        Returns:
+            LangchainReActAgent: The shared agent.
+
+        Raises:
+            ValueError: If the agent was built with another cache or concurrency cap.
+        """
+        key = (model_name, project_id, location)
+        with cls._lock:
+            future = cls._agents.get(key)
+            builder = future is None
+            if builder:
+                future = cls._agents[key] = Future()
+
+        if builder:
+            try:
+                agent = LangchainReActAgent(model_name, project_id, location,
+                                            cache=cache if cache is not None else ResponseCache(),
+                                            max_concurrency=max_concurrency if max_concurrency is not None else 8)
+            except BaseException as e:
+                with cls._lock:
+                    if cls._agents.get(key) is future:
+                        del cls._agents[key]
+                future.set_exception(e)
+                raise
+            future.set_result(agent)
+            return agent
+
+        agent = future.result()
+        if cache is not None and cache is not agent.cache:
+            raise ValueError(f"The agent for {key} was built with another cache.")
+        if max_concurrency is not None and max_concurrency != agent.max_concurrency:
+            raise ValueError(f"The agent for {key} was built with max_concurrency={agent.max_concurrency}, "
+                             f"not {max_concurrency}.")
+        return agent
+
+    @classmethod
+    def clear(cls):
+        """
+        Drop every warm agent, so the next `get` builds a new one.
+        """
+        with cls._lock:
+            cls._agents.clear()
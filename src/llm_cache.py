@@ -0,0 +1,308 @@
+# Caches LLM responses in memory and on disk.
+
+# src/llm_cache.py
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+class ResponseCache:
+    """
+    Two-tier response cache: an in-process LRU backed by an optional SQLite file.
+
+    Entries are keyed on (model_name, prompt, parameters) and expire after
+    `ttl_seconds`. Concurrent requests for the same key share one upstream call.
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None, max_disk_entries: int = 100000,
+                 ttl_seconds: Optional[float] = None):
+        """
+        Initialize the response cache.
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory.
+            path (Optional[str]): Path of the SQLite file. No disk tier if None.
+            max_disk_entries (int): Maximum number of entries kept on disk.
+            ttl_seconds (Optional[float]): Lifetime of an entry. Entries never expire if None.
+        """
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._in_flight_async = {}
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def is_cacheable(parameters: dict, sample_index: Optional[int] = None) -> bool:
+        """
+        Decide whether a call may be served from the cache.
+
+        Sampling calls (temperature > 0) are only cacheable when they carry a
+        sample index, since otherwise every call is expected to differ.
+
+        Args:
+            parameters (dict): Parameters for the LLM call.
+            sample_index (Optional[int]): Seed or slot index of the sample.
+
+        Returns:
+            bool: True if the call may be cached.
+        """
+        return sample_index is not None or not parameters.get("temperature")
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, parameters: dict, sample_index: Optional[int] = None) -> str:
+        """
+        Build the cache key for a call.
+
+        Args:
+            model_name (str): Name of the model.
+            prompt (str): The prompt sent to the LLM.
+            parameters (dict): Parameters for the LLM call.
+            sample_index (Optional[int]): Seed or slot index of the sample.
+
+        Returns:
+            str: A hex digest identifying the call.
+        """
+        payload = json.dumps([model_name, prompt, parameters, sample_index], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float, now: float) -> bool:
+        """
+        Check whether an entry created at `created` has outlived the TTL.
+        """
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a response, checking memory first and then disk.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[str]: The cached response, or None on a miss.
+        """
+        with self._lock:
+            response = self._lookup(key, time.time())
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return response
+
+    def peek(self, key: str) -> Optional[str]:
+        """
+        Look up a response like `get`, without counting a hit or a miss.
+
+        For secondary lookups made while computing an entry whose miss is
+        already counted.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[str]: The cached response, or None if absent.
+        """
+        with self._lock:
+            return self._lookup(key, time.time())
+
+    def _lookup(self, key: str, now: float) -> Optional[str]:
+        """
+        Look up a response in both tiers without counting it. Call with the lock held.
+
+        Args:
+            key (str): The cache key.
+            now (float): The current time.
+
+        Returns:
+            Optional[str]: The cached response, or None on a miss.
+        """
+        entry = self._memory.get(key)
+        if entry is not None:
+            response, created = entry
+            if not self._expired(created, now):
+                self._memory.move_to_end(key)
+                return response
+            del self._memory[key]
+
+        if self._db is not None:
+            row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                response, created = row
+                if not self._expired(created, now):
+                    self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self._remember(key, response, created)
+                    return response
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+        return None
+
+    def put(self, key: str, response: str):
+        """
+        Store a response in both tiers.
+
+        Args:
+            key (str): The cache key.
+            response (str): The LLM's response.
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now),
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, key: str, response: str, created: float):
+        """
+        Insert an entry into the memory tier, evicting the least recently used.
+        """
+        self._memory[key] = (response, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float):
+        """
+        Drop expired entries and trim the disk tier to `max_disk_entries`.
+        """
+        if self.ttl_seconds is not None:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        """
+        Return the cached response, or compute and store it.
+
+        If another thread is already computing the same key, wait for its result
+        instead of calling `compute` again.
+
+        Args:
+            key (str): The cache key.
+            compute (Callable[[], str]): Produces the response on a miss.
+
+        Returns:
+            str: The response.
+        """
+        response = self.get(key)
+        if response is not None:
+            return response
+
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                # A leader that finished since the miss above has already stored its response.
+                response = self._lookup(key, time.time())
+                if response is not None:
+                    self.misses -= 1
+                    self.hits += 1
+                    return response
+                flight = {"event": threading.Event(), "response": None, "error": None}
+                self._in_flight[key] = flight
+
+        if not leader:
+            flight["event"].wait()
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["response"]
+
+        try:
+            response = compute()
+            self.put(key, response)
+            flight["response"] = response
+            return response
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight["event"].set()
+
+    async def get_or_compute_async(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """
+        Async version of `get_or_compute` for callers on an event loop.
+
+        Args:
+            key (str): The cache key.
+            compute (Callable[[], Awaitable[str]]): Produces the response on a miss.
+
+        Returns:
+            str: The response.
+        """
+        response = self.get(key)
+        if response is not None:
+            return response
+
+        flight = self._in_flight_async.get(key)
+        if flight is not None:
+            return await asyncio.shield(flight)
+
+        flight = asyncio.ensure_future(compute())
+        self._in_flight_async[key] = flight
+        try:
+            response = await asyncio.shield(flight)
+            # Store before dropping the flight, so a later caller finds one or the other.
+            self.put(key, response)
+        finally:
+            self._in_flight_async.pop(key, None)
+        return response
+
+    def stats(self) -> dict:
+        """
+        Return the hit and miss counters.
+
+        Returns:
+            dict: Hits, misses, hit ratio and the number of entries in memory.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def clear(self):
+        """
+        Remove every entry from both tiers.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        """
+        Close the SQLite connection.
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -1 +1,305 @@
+# Wraps the Vertex AI text generation model.
 
+# src/llm_interface.py
+
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Optional
+from .hedging import HedgePolicy
+from .llm_cache import ResponseCache
+from .metrics import MetricsCollector, estimate_tokens
+from .rate_limit import RateLimiter
+
+if TYPE_CHECKING:
+    from vertexai.language_models import TextGenerationModel
+    from .traces import TraceRecorder
+
+class LLMInterface:
+    """
+    Interface for calling a Vertex AI text generation model.
+    """
+
+    def __init__(self, project_id: Optional[str], location: Optional[str], model_name: str,
+                 cache: Optional[ResponseCache] = None, metrics: Optional[MetricsCollector] = None,
+                 rate_limiter: Optional[RateLimiter] = None, hedging: Optional[HedgePolicy] = None,
+                 recorder: Optional["TraceRecorder"] = None, model=None):
+        """
+        Initialize Vertex AI and load the model, unless a model is given.
+
+        Args:
+            project_id (Optional[str]): Google Cloud project ID. Unused if `model` is given.
+            location (Optional[str]): Google Cloud location. Unused if `model` is given.
+            model_name (str): Name of the Vertex AI model.
+            cache (Optional[ResponseCache]): Cache for responses. Calls are not cached if None.
+            metrics (Optional[MetricsCollector]): Records call latency and sizes. Calls
+                are not measured if None.
+            rate_limiter (Optional[RateLimiter]): Applies quotas, adaptive concurrency and
+                retries to model calls. Errors are raised at once if None.
+            hedging (Optional[HedgePolicy]): Sends a duplicate of attempts that run past
+                a latency percentile, within a hedge budget. Attempts are not hedged if None.
+            recorder (Optional[TraceRecorder]): Receives every prompt, response and call
+                latency, for replay with ReplayLLM. Calls are not recorded if None.
+            model: A loaded model, or a stand-in with the same predict methods such
+                as a trace replay. Vertex AI is initialized and the model loaded if None.
+        """
+        self.model_name = model_name
+        self.cache = cache
+        self.metrics = metrics
+        self.rate_limiter = rate_limiter
+        self.hedging = hedging
+        self.recorder = recorder
+        if metrics is not None and cache is not None:
+            metrics.track_cache("llm_cache", cache)
+        self.parameters = {
+            "temperature": 0,
+            "max_output_tokens": 1024,
+            "top_p": 0.8,
+            "top_k": 40,
+        }
+        self.model = model
+        if model is None:
+            self._load_vertex_ai(project_id, location)
+
+    def _load_vertex_ai(self, project_id: Optional[str], location: Optional[str]):
+        """
+        Initialize Vertex AI and load the model, leaving it to the first call if that fails.
+
+        Args:
+            project_id (Optional[str]): Google Cloud project ID.
+            location (Optional[str]): Google Cloud location.
+        """
+        # Vertex AI takes seconds to import, so it is loaded only when an interface is created.
+        import vertexai
+        from vertexai.language_models import TextGenerationModel
+
+        vertexai.init(project=project_id, location=location)
+        try:
+            self.model = TextGenerationModel.from_pretrained(self.model_name)
+        except Exception:
+            # Credentials may not be available yet; load on the first call instead.
+            self.model = None
+
+    def _get_model(self) -> "TextGenerationModel":
+        """
+        Return the loaded model, loading it first if needed.
+
+        Returns:
+            TextGenerationModel: The Vertex AI model.
+        """
+        if self.model is None:
+            from vertexai.language_models import TextGenerationModel
+
+            self.model = TextGenerationModel.from_pretrained(self.model_name)
+        return self.model
+
+    def _show_activity(self, prompt: str, response: str):
+        """
+        Print the prompt and the response.
+
+        Args:
+            prompt (str): The prompt sent to the LLM.
+            response (str): The LLM's response.
+        """
+        print(f"The call to the LLM:\n{prompt}\n")
+        print("The response:")
+        print(response)
+
+    def _call_parameters(self, stop_sequences: Optional[List[str]]) -> dict:
+        """
+        Return the parameters for a call, adding stop sequences if given.
+
+        Args:
+            stop_sequences (Optional[List[str]]): Sequences that end generation.
+
+        Returns:
+            dict: Parameters for the model call.
+        """
+        if not stop_sequences:
+            return self.parameters
+        return dict(self.parameters, stop_sequences=list(stop_sequences))
+
+    def _predict(self, prompt: str, parameters: dict) -> str:
+        """
+        Call the model once, through the rate limiter if there is one.
+
+        With hedging, each attempt goes through the rate limiter on its own, so
+        a duplicate takes its own slot and quota and holds its slot for as long
+        as it runs.
+
+        Args:
+            prompt (str): The prompt to send to the LLM.
+            parameters (dict): Parameters for the model call.
+
+        Returns:
+            str: The LLM's response.
+        """
+        prompt_tokens = estimate_tokens(prompt)
+
+        def attempt() -> str:
+            return self._get_model().predict(prompt, **parameters).text
+
+        def admit(fn: Callable[[], str]) -> str:
+            return fn() if self.rate_limiter is None else self.rate_limiter.call(fn, prompt_tokens)
+
+        if self.hedging is None:
+            return admit(attempt)
+        return self.hedging.call(attempt, admit)
+
+    async def _predict_async(self, prompt: str, parameters: dict) -> str:
+        """
+        Call the model once without blocking, through the rate limiter if there is one.
+
+        Args:
+            prompt (str): The prompt to send to the LLM.
+            parameters (dict): Parameters for the model call.
+
+        Returns:
+            str: The LLM's response.
+        """
+        prompt_tokens = estimate_tokens(prompt)
+
+        async def attempt() -> str:
+            return (await self._get_model().predict_async(prompt, **parameters)).text
+
+        async def admit(fn: Callable[[], Awaitable[str]]) -> str:
+            if self.rate_limiter is None:
+                return await fn()
+            return await self.rate_limiter.call_async(fn, prompt_tokens)
+
+        if self.hedging is None:
+            return await admit(attempt)
+        return await self.hedging.call_async(attempt, admit)
+
+    def _cache_key(self, prompt: str, parameters: dict, sample_index: Optional[int]) -> Optional[str]:
+        """
+        Return the cache key for a call, or None if the call must not be cached.
+
+        Args:
+            prompt (str): The prompt to send to the LLM.
+            parameters (dict): Parameters for the model call.
+            sample_index (Optional[int]): Seed or slot index of the sample.
+
+        Returns:
+            Optional[str]: The cache key, or None.
+        """
+        if self.cache is None or not self.cache.is_cacheable(parameters, sample_index):
+            return None
+        return self.cache.make_key(self.model_name, prompt, parameters, sample_index)
+
+    def _record(self, prompt: str, response: str, seconds: float, stop_sequences: Optional[List[str]]):
+        """
+        Record a finished call in the metrics and the trace, if there are any.
+
+        Args:
+            prompt (str): The prompt sent to the LLM.
+            response (str): The LLM's response.
+            seconds (float): Latency of the call.
+            stop_sequences (Optional[List[str]]): Sequences that ended generation.
+        """
+        if self.metrics is not None:
+            self.metrics.record_call("llm", prompt, response, seconds)
+        if self.recorder is not None:
+            self.recorder.record("llm", prompt, response, seconds, list(stop_sequences) if stop_sequences else None)
+
+    def call_llm(self, prompt: str, show_activity: bool = True, sample_index: Optional[int] = None,
+                 stop_sequences: Optional[List[str]] = None) -> str:
+        """
+        Send a prompt to the LLM and return its response.
+
+        Args:
+            prompt (str): The prompt to send to the LLM.
+            show_activity (bool): Whether to print the prompt and the response.
+            sample_index (Optional[int]): Seed or slot index of the sample. Lets
+                sampling calls (temperature > 0) be served from the cache.
+            stop_sequences (Optional[List[str]]): Sequences that end generation.
+                The model leaves them out of the response.
+
+        Returns:
+            str: The LLM's response.
+        """
+        start = time.perf_counter()
+        parameters = self._call_parameters(stop_sequences)
+        key = self._cache_key(prompt, parameters, sample_index)
+        if key is None:
+            response = self._predict(prompt, parameters)
+        else:
+            response = self.cache.get_or_compute(key, lambda: self._predict(prompt, parameters))
+        self._record(prompt, response, time.perf_counter() - start, stop_sequences)
+        if show_activity:
+            self._show_activity(prompt, response)
+        return response
+
+    async def call_llm_async(self, prompt: str, show_activity: bool = False, sample_index: Optional[int] = None,
+                             stop_sequences: Optional[List[str]] = None) -> str:
+        """
+        Send a prompt to the LLM without blocking the event loop.
+
+        Args:
+            prompt (str): The prompt to send to the LLM.
+            show_activity (bool): Whether to print the prompt and the response.
+            sample_index (Optional[int]): Seed or slot index of the sample.
+            stop_sequences (Optional[List[str]]): Sequences that end generation.
+
+        Returns:
+            str: The LLM's response.
+        """
+        start = time.perf_counter()
+        parameters = self._call_parameters(stop_sequences)
+        key = self._cache_key(prompt, parameters, sample_index)
+        if key is None:
+            response = await self._predict_async(prompt, parameters)
+        else:
+            response = await self.cache.get_or_compute_async(key, lambda: self._predict_async(prompt, parameters))
+        self._record(prompt, response, time.perf_counter() - start, stop_sequences)
+        if show_activity:
+            self._show_activity(prompt, response)
+        return response
+
+    def stream_llm(self, prompt: str, show_activity: bool = True, stop_sequences: Optional[List[str]] = None,
+                   stop_condition: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Stream a response from the LLM, ending early once it is complete.
+
+        Generation ends at the first stop sequence, or as soon as `stop_condition`
+        returns True for the text received so far; the stream is then closed so the
+        model stops generating. Stop sequences are also applied to the streamed text,
+        so the result never contains one.
+
+        Args:
+            prompt (str): The prompt to send to the LLM.
+            show_activity (bool): Whether to print the prompt and the response.
+            stop_sequences (Optional[List[str]]): Sequences that end generation.
+            stop_condition (Optional[Callable[[str], bool]]): Called with the text
+                received so far; returning True ends generation.
+
+        Returns:
+            str: The LLM's response.
+        """
+        start = time.perf_counter()
+        parameters = self._call_parameters(stop_sequences)
+
+        def consume() -> str:
+            response = ""
+            stream = self._get_model().predict_streaming(prompt, **parameters)
+            try:
+                for chunk in stream:
+                    response += chunk.text
+                    cuts = [response.find(stop) for stop in stop_sequences or [] if stop in response]
+                    if cuts:
+                        return response[:min(cuts)]
+                    if stop_condition is not None and stop_condition(response):
+                        break
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+            return response
+
+        if self.rate_limiter is None:
+            response = consume()
+        else:
+            # A failed stream is retried from the start; its partial text is dropped.
+            response = self.rate_limiter.call(consume, estimate_tokens(prompt))
+        self._record(prompt, response, time.perf_counter() - start, stop_sequences)
+        if show_activity:
+            self._show_activity(prompt, response)
+        return response
@@ -0,0 +1,259 @@
+# Collects counters and latency histograms for LLM calls, ReAct steps and caches.
+
+# src/metrics.py
+
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+# Upper bounds, in seconds, of the default latency histogram buckets.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upper bounds of the size histogram buckets, in characters or tokens.
+SIZE_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536, 262144)
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text at four characters per token.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The estimated token count.
+    """
+    return (len(text) + 3) // 4
+
+class _Shard:
+    """
+    The counters and histograms recorded by one thread.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, float] = {}
+        # name -> [bucket counts, sum, count]
+        self.histograms: Dict[str, list] = {}
+
+    def merge(self, other: "_Shard"):
+        """
+        Add another shard's counters and histograms to this one.
+        """
+        for name, value in list(other.counters.items()):
+            self.counters[name] = self.counters.get(name, 0) + value
+        for name, (buckets, total, count) in list(other.histograms.items()):
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = [[0] * len(buckets), 0.0, 0]
+            histogram[0] = [a + b for a, b in zip(histogram[0], buckets)]
+            histogram[1] += total
+            histogram[2] += count
+
+class MetricsCollector:
+    """
+    Counters, histograms and gauges exported as JSONL or Prometheus text.
+
+    Each thread records into its own shard, so recording takes no lock; the
+    shards are only merged when the metrics are read. The shards of threads
+    that have finished are folded into one retired shard, so short-lived
+    threads do not pile up. Components take an
+    optional collector and skip all instrumentation when it is None.
+    """
+
+    def __init__(self, buckets: Optional[Dict[str, tuple]] = None):
+        """
+        Initialize the metrics collector.
+
+        Args:
+            buckets (Optional[Dict[str, tuple]]): Histogram bucket bounds by metric name.
+                Names ending in "_seconds" default to DEFAULT_BUCKETS and all
+                others to SIZE_BUCKETS.
+        """
+        self.buckets = dict(buckets or {})
+        self._local = threading.local()
+        # (recording thread, its shard) for every thread seen since the last retirement.
+        self._shards: List[Tuple[threading.Thread, _Shard]] = []
+        # Everything recorded by threads that have finished.
+        self._retired = _Shard()
+        self._shards_lock = threading.Lock()
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    def _shard(self) -> _Shard:
+        """
+        Return the calling thread's shard, creating it on first use.
+        """
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._retire_finished()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_finished(self):
+        """
+        Fold the shards of finished threads into the retired shard. Call with the shards lock held.
+        """
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._retired.merge(shard)
+        self._shards = live
+
+    def _bounds(self, name: str) -> tuple:
+        """
+        Return the histogram bucket bounds for a metric.
+        """
+        bounds = self.buckets.get(name)
+        if bounds is None:
+            bounds = DEFAULT_BUCKETS if name.endswith("_seconds") else SIZE_BUCKETS
+        return bounds
+
+    def increment(self, name: str, value: float = 1):
+        """
+        Add to a counter.
+
+        Args:
+            name (str): The counter name.
+            value (float): The amount to add.
+        """
+        counters = self._shard().counters
+        counters[name] = counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        """
+        Record a value in a histogram.
+
+        Args:
+            name (str): The histogram name.
+            value (float): The observed value.
+        """
+        bounds = self._bounds(name)
+        histograms = self._shard().histograms
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = [[0] * (len(bounds) + 1), 0.0, 0]
+        histogram[0][bisect.bisect_left(bounds, value)] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """
+        Record the duration of a block in a histogram, in seconds.
+
+        Args:
+            name (str): The histogram name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def gauge(self, name: str, read: Callable[[], float]):
+        """
+        Register a gauge read when the metrics are exported.
+
+        Args:
+            name (str): The gauge name.
+            read (Callable[[], float]): Returns the current value.
+        """
+        self._gauges[name] = read
+
+    def track_cache(self, prefix: str, cache):
+        """
+        Export the hit and miss counters of a ResponseCache as gauges.
+
+        Args:
+            prefix (str): Prefix of the gauge names, such as "llm_cache".
+            cache (ResponseCache): The cache to read.
+        """
+        for stat in ("hits", "misses", "hit_ratio"):
+            self.gauge(f"{prefix}_{stat}", lambda stat=stat: cache.stats()[stat])
+
+    def record_call(self, prefix: str, prompt: str, response: str, seconds: float):
+        """
+        Record the latency and the sizes of one LLM call.
+
+        Args:
+            prefix (str): Prefix of the metric names, such as "llm".
+            prompt (str): The prompt sent to the LLM.
+            response (str): The LLM's response.
+            seconds (float): The latency of the call.
+        """
+        self.increment(f"{prefix}_calls_total")
+        self.observe(f"{prefix}_call_seconds", seconds)
+        self.observe(f"{prefix}_prompt_chars", len(prompt))
+        self.observe(f"{prefix}_response_chars", len(response))
+        self.increment(f"{prefix}_prompt_tokens_total", estimate_tokens(prompt))
+        self.increment(f"{prefix}_response_tokens_total", estimate_tokens(response))
+
+    def snapshot(self) -> dict:
+        """
+        Merge the shards and read the gauges.
+
+        Returns:
+            dict: "counters" and "gauges" map names to values; "histograms" maps
+            names to their bucket bounds, bucket counts, sum and count.
+        """
+        merged = _Shard()
+        with self._shards_lock:
+            self._retire_finished()
+            merged.merge(self._retired)
+            for _, shard in self._shards:
+                merged.merge(shard)
+        counters = merged.counters
+        histograms = {name: {"bounds": list(self._bounds(name)), "buckets": buckets, "sum": total, "count": count}
+                      for name, (buckets, total, count) in merged.histograms.items()}
+        gauges = {name: read() for name, read in self._gauges.items()}
+        return {"counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def write_jsonl(self, out: TextIO):
+        """
+        Write one JSON object per metric.
+
+        Args:
+            out (TextIO): The file to write to.
+        """
+        snapshot = self.snapshot()
+        timestamp = time.time()
+        for kind, key in (("counter", "counters"), ("gauge", "gauges")):
+            for name, value in sorted(snapshot[key].items()):
+                out.write(json.dumps({"time": timestamp, "type": kind, "name": name, "value": value}) + "\n")
+        for name, histogram in sorted(snapshot["histograms"].items()):
+            out.write(json.dumps({"time": timestamp, "type": "histogram", "name": name, **histogram}) + "\n")
+
+    def to_prometheus(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        for name, value in sorted(snapshot["gauges"].items()):
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        for name, histogram in sorted(snapshot["histograms"].items()):
+            lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip([*histogram["bounds"], "+Inf"], histogram["buckets"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines += [f"{name}_sum {histogram['sum']}", f"{name}_count {histogram['count']}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """
+        Zero every counter and histogram. Gauges stay registered.
+        """
+        with self._shards_lock:
+            for shard in [self._retired, *(shard for _, shard in self._shards)]:
+                shard.counters.clear()
+                shard.histograms.clear()
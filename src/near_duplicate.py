@@ -0,0 +1,338 @@
+# Serves cached results for reworded questions using MinHash signatures and an LSH index.
+
+# src/near_duplicate.py
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+_NON_WORD = re.compile(r"[^\w\s]")
+# Mersenne prime 2**31 - 1: hashes are reduced below it so a * h + b fits in 64 bits.
+_PRIME = (1 << 31) - 1
+
+def normalize_question(question: str) -> str:
+    """
+    Case-fold a question and drop punctuation and repeated whitespace.
+
+    Args:
+        question (str): The question.
+
+    Returns:
+        str: The normalized question.
+    """
+    return " ".join(_NON_WORD.sub(" ", question.casefold()).split())
+
+def numeric_tokens(question: str) -> Tuple[str, ...]:
+    """
+    Return the tokens of a normalized question that hold digits, in order.
+
+    Shingles barely notice a changed number, so "12 times 13" and "12 times 14"
+    look alike; a hit also needs these tokens to match exactly.
+
+    Args:
+        question (str): The question.
+
+    Returns:
+        Tuple[str, ...]: The numeric tokens.
+    """
+    return tuple(token for token in normalize_question(question).split() if any(c.isdigit() for c in token))
+
+def shingles(question: str, size: int = 4) -> List[str]:
+    """
+    Split a normalized question into overlapping character shingles.
+
+    Args:
+        question (str): The question.
+        size (int): Characters per shingle.
+
+    Returns:
+        List[str]: The distinct shingles; the whole text if it is shorter than `size`.
+    """
+    text = normalize_question(question)
+    if len(text) <= size:
+        return [text]
+    return list({text[i:i + size] for i in range(len(text) - size + 1)})
+
+def namespace_for(kind: str, *texts: str) -> str:
+    """
+    Build a namespace from a strategy name and the texts its results depend on.
+
+    Args:
+        kind (str): The strategy, such as "cot" or "react".
+        *texts (str): The exemplar, context and so on.
+
+    Returns:
+        str: The namespace.
+    """
+    digest = hashlib.sha256("\x00".join(texts).encode("utf-8")).hexdigest()[:16]
+    return f"{kind}:{digest}"
+
+class MinHasher:
+    """
+    Computes MinHash signatures whose agreement estimates Jaccard similarity.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 4, seed: int = 1):
+        """
+        Draw the hash permutations.
+
+        Args:
+            num_perm (int): Signature length.
+            shingle_size (int): Characters per shingle.
+            seed (int): Seed of the permutations; signatures are only comparable
+                between hashers with the same seed and length.
+        """
+        import numpy as np
+
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, question: str) -> "numpy.ndarray":
+        """
+        Return the MinHash signature of a question.
+
+        Args:
+            question (str): The question.
+
+        Returns:
+            numpy.ndarray: `num_perm` uint32 values.
+        """
+        import numpy as np
+
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingles(question, self.shingle_size)),
+                             dtype=np.uint64)
+        return ((self._a * hashes[np.newaxis, :] + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def similarity(first: "numpy.ndarray", second: "numpy.ndarray") -> float:
+        """
+        Estimate the Jaccard similarity of two signatures.
+        """
+        return float((first == second).sum()) / len(first)
+
+class NearDuplicateCache:
+    """
+    Approximate cache keyed on questions, for results that survive rewording.
+
+    Each question is reduced to a MinHash signature and indexed in `bands`
+    LSH bands; questions sharing a band are candidates, and the closest one at
+    or above the threshold with the same numbers is a hit. Entries are scoped by a namespace, such as
+    the strategy and exemplar, and evicted least recently used first. With a
+    path, entries are also kept in SQLite and reloaded on start.
+    """
+
+    def __init__(self, threshold: float = 0.9, related_threshold: float = 0.5, max_entries: int = 10000,
+                 path: Optional[str] = None, num_perm: int = 128, bands: int = 32, shingle_size: int = 4,
+                 log: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold (float): Estimated Jaccard similarity needed to serve a
+                cached result. Questions differing in one word, such as "born
+                first" and "born last", score about 0.77.
+            related_threshold (float): Lower similarity at which callers may reuse
+                parts of a result, such as ReAct observations.
+            max_entries (int): Maximum number of entries kept.
+            path (Optional[str]): Path of the SQLite file. Entries are only kept in
+                memory if None.
+            num_perm (int): Signature length; must be a multiple of `bands`.
+            bands (int): Number of LSH bands. More bands find less similar candidates.
+            shingle_size (int): Characters per shingle.
+            log (Optional[Callable[[str], None]]): Receives a line per hit with its
+                score and the matched question, for auditing. Hits are not logged if None.
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands}).")
+        self.threshold = threshold
+        self.related_threshold = related_threshold
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.log = log
+        self.hits = 0
+        self.misses = 0
+        # entry id -> (namespace, question, signature, value), least recently used first.
+        self._entries = OrderedDict()
+        self._buckets: List[Dict[bytes, set]] = [{} for _ in range(bands)]
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, "
+                "question TEXT NOT NULL, signature BLOB NOT NULL, value TEXT NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.commit()
+            import numpy as np
+
+            rows = self._db.execute(
+                "SELECT id, namespace, question, signature, value FROM "
+                "(SELECT * FROM entries ORDER BY accessed DESC LIMIT ?) ORDER BY accessed", (max_entries,)
+            ).fetchall()
+            for entry_id, namespace, question, signature, value in rows:
+                self._index(entry_id, namespace, question, np.frombuffer(signature, dtype=np.uint32), json.loads(value))
+            self._next_id = (self._db.execute("SELECT MAX(id) FROM entries").fetchone()[0] or 0) + 1
+
+    def _band_keys(self, signature: "numpy.ndarray") -> List[bytes]:
+        """
+        Return the bucket key of each band of a signature.
+        """
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _index(self, entry_id: int, namespace: str, question: str, signature: "numpy.ndarray", value: dict):
+        """
+        Add an entry to the LRU and the LSH buckets.
+        """
+        self._entries[entry_id] = (namespace, question, signature, value)
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(key, set()).add(entry_id)
+
+    def _unindex(self, entry_id: int):
+        """
+        Remove an entry from the LRU and the LSH buckets.
+        """
+        _, _, signature, _ = self._entries.pop(entry_id)
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band][key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[band][key]
+
+    def _search(self, question: str, namespace: str, threshold: float,
+                related_threshold: Optional[float] = None) -> Tuple[Optional[tuple], Optional[tuple]]:
+        """
+        Find the closest earlier questions with one signature and one pass over the candidates.
+
+        Counts one hit or one miss.
+
+        Returns:
+            Tuple[Optional[tuple], Optional[tuple]]: The hit, and on a miss the closest
+            entry at or above `related_threshold`; each a (value, similarity,
+            matched question) triple or None.
+        """
+        signature = self.hasher.signature(question)
+        numbers = numeric_tokens(question)
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+            best_id, best_score = None, -1.0
+            closest_id, closest_score = None, -1.0
+            for entry_id in candidates:
+                entry_namespace, entry_question, entry_signature, _ = self._entries[entry_id]
+                if entry_namespace != namespace:
+                    continue
+                score = MinHasher.similarity(signature, entry_signature)
+                if score > closest_score:
+                    closest_id, closest_score = entry_id, score
+                if score > best_score and numeric_tokens(entry_question) == numbers:
+                    best_id, best_score = entry_id, score
+            if best_id is None or best_score < threshold:
+                self.misses += 1
+                if related_threshold is None or closest_id is None or closest_score < related_threshold:
+                    return None, None
+                _, matched, _, value = self._entries[closest_id]
+                return None, (value, closest_score, matched)
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            _, matched, _, value = self._entries[best_id]
+            if self._db is not None:
+                self._db.execute("UPDATE entries SET accessed = ? WHERE id = ?", (time.time(), best_id))
+                self._db.commit()
+        if self.log is not None:
+            self.log(f"near-duplicate hit score={best_score:.3f} namespace={namespace!r} "
+                     f"question={question!r} matched={matched!r}")
+        return (value, best_score, matched), None
+
+    def lookup(self, question: str, namespace: str = "",
+               threshold: Optional[float] = None) -> Optional[Tuple[dict, float, str]]:
+        """
+        Find the cached result of the most similar earlier question with the same numbers.
+
+        Args:
+            question (str): The question.
+            namespace (str): Only entries stored under this namespace match.
+            threshold (Optional[float]): Similarity needed for a hit. Defaults to `threshold`.
+
+        Returns:
+            Optional[Tuple[dict, float, str]]: The cached value, the estimated
+            similarity and the matched question, or None on a miss.
+        """
+        return self._search(question, namespace, self.threshold if threshold is None else threshold)[0]
+
+    def lookup_related(self, question: str,
+                       namespace: str = "") -> Tuple[Optional[Tuple[dict, float, str]], Optional[Tuple[dict, float, str]]]:
+        """
+        Look a question up for a hit, falling back to a related entry on a miss.
+
+        A related entry only needs `related_threshold` and may differ in its
+        numbers, so callers should reuse parts of it, not its answer.
+
+        Args:
+            question (str): The question.
+            namespace (str): Only entries stored under this namespace match.
+
+        Returns:
+            Tuple[Optional[Tuple[dict, float, str]], Optional[Tuple[dict, float, str]]]:
+            The hit, or None and the closest related entry if there is one.
+        """
+        return self._search(question, namespace, self.threshold, self.related_threshold)
+
+    def put(self, question: str, value: dict, namespace: str = ""):
+        """
+        Store the result of a question, evicting the least recently used entries.
+
+        Args:
+            question (str): The question.
+            value (dict): The result; must be JSON-serializable when the cache has a path.
+            namespace (str): Scope of the entry.
+        """
+        signature = self.hasher.signature(question)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index(entry_id, namespace, question, signature, value)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(next(iter(self._entries)))
+                self._unindex(evicted[-1])
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT INTO entries (id, namespace, question, signature, value, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                    (entry_id, namespace, question, signature.tobytes(), json.dumps(value), time.time()),
+                )
+                self._db.executemany("DELETE FROM entries WHERE id = ?", [(e,) for e in evicted])
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """
+        Return hit and miss counts and the number of entries.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries.
+        """
+        return len(self._entries)
+
+    def close(self):
+        """
+        Close the SQLite connection.
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
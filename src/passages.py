@@ -0,0 +1,148 @@
+# Splits articles into passages and ranks them against a query with BM25.
+
+# src/passages.py
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_HEADING = re.compile(r"^=+[^=].*=+$")
+# Words that say how a thought searches rather than what it looks for.
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have he her his i in is it its of on or she that the their then
+they this to was were what when where which who will with need search find look up out
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into case-folded words, leaving out stop words.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        List[str]: The words in order.
+    """
+    return [word for word in _WORD.findall(text.casefold()) if word not in STOP_WORDS]
+
+def split_passages(text: str, passage_chars: int = 300) -> List[str]:
+    """
+    Split an article into passages of at most `passage_chars` characters.
+
+    Paragraphs are kept whole when they fit; longer ones are packed sentence
+    by sentence, and a sentence longer than a passage is cut. Section headings
+    are dropped.
+
+    Args:
+        text (str): The article text.
+        passage_chars (int): Maximum length of a passage.
+
+    Returns:
+        List[str]: The passages in article order.
+    """
+    passages = []
+    for paragraph in text.split("\n"):
+        paragraph = paragraph.strip()
+        if not paragraph or _HEADING.match(paragraph):
+            continue
+        if len(paragraph) <= passage_chars:
+            passages.append(paragraph)
+            continue
+        current = ""
+        for sentence in _SENTENCE_END.split(paragraph):
+            while len(sentence) > passage_chars:
+                if current:
+                    passages.append(current)
+                    current = ""
+                passages.append(sentence[:passage_chars])
+                sentence = sentence[passage_chars:].lstrip()
+            if current and len(current) + 1 + len(sentence) > passage_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current} {sentence}" if current else sentence
+        if current:
+            passages.append(current)
+    return passages
+
+class PassageIndex:
+    """
+    In-memory BM25 index over the passages of one article.
+
+    Postings map each word to the passages containing it, so scoring a query
+    only touches the passages that share a word with it.
+    """
+
+    def __init__(self, passages: List[str], k1: float = 1.5, b: float = 0.75):
+        """
+        Index the passages.
+
+        Args:
+            passages (List[str]): The passages in article order.
+            k1 (float): BM25 term-frequency saturation.
+            b (float): BM25 length normalization.
+        """
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+        for position, passage in enumerate(passages):
+            words = tokenize(passage)
+            self.lengths.append(len(words))
+            for word, count in Counter(words).items():
+                self.postings.setdefault(word, []).append((position, count))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        total = len(passages)
+        self.idf = {word: math.log(1 + (total - len(hits) + 0.5) / (len(hits) + 0.5))
+                    for word, hits in self.postings.items()}
+
+    def scores(self, query: str) -> List[float]:
+        """
+        Score every passage against a query.
+
+        Args:
+            query (str): The query.
+
+        Returns:
+            List[float]: The BM25 score of each passage, 0 where no word matches.
+        """
+        scores = [0.0] * len(self.passages)
+        for word in set(tokenize(query)):
+            idf = self.idf.get(word)
+            if idf is None:
+                continue
+            for position, count in self.postings[word]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / (self.average_length or 1))
+                scores[position] += idf * count * (self.k1 + 1) / (count + norm)
+        return scores
+
+    def select(self, query: str, budget: int) -> str:
+        """
+        Return the best passages for a query that fit in `budget` characters.
+
+        Passages are taken best first, ties and unmatched passages in article
+        order, and joined in article order. With no matching word this is the
+        start of the article.
+
+        Args:
+            query (str): The query.
+            budget (int): Maximum number of characters to return.
+
+        Returns:
+            str: The selected passages separated by newlines.
+        """
+        scores = self.scores(query)
+        ranked = sorted(range(len(self.passages)), key=lambda position: (-scores[position], position))
+        chosen = []
+        used = 0
+        for position in ranked:
+            size = len(self.passages[position]) + (1 if chosen else 0)
+            if used + size <= budget:
+                chosen.append(position)
+                used += size
+        if not chosen and ranked:
+            return self.passages[ranked[0]][:budget]
+        return "\n".join(self.passages[position] for position in sorted(chosen))
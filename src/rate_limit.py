@@ -0,0 +1,445 @@
+# Client-side rate limiting, adaptive concurrency and retries for LLM calls.
+
+# src/rate_limit.py
+
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+from .metrics import MetricsCollector, estimate_tokens
+
+# HTTP codes of errors that mean the service is shedding load (TooManyRequests and
+# ResourceExhausted in google.api_core); the concurrency limit shrinks on these.
+THROTTLE_CODES = (429,)
+# HTTP codes of errors worth retrying after a backoff: also InternalServerError,
+# ServiceUnavailable and DeadlineExceeded.
+RETRYABLE_CODES = THROTTLE_CODES + (500, 503, 504)
+
+def is_throttle(error: BaseException) -> bool:
+    """
+    Check whether an error is a quota or rate-limit rejection.
+
+    Args:
+        error (BaseException): The error raised by the model call.
+
+    Returns:
+        bool: True for throttling errors.
+    """
+    return getattr(error, "code", None) in THROTTLE_CODES
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Check whether a call that raised an error may be retried.
+
+    Args:
+        error (BaseException): The error raised by the model call.
+
+    Returns:
+        bool: True for throttling and transient server errors.
+    """
+    return getattr(error, "code", None) in RETRYABLE_CODES
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` tokens per minute.
+
+    `reserve` takes tokens immediately, letting the balance go negative, and
+    returns how long the caller must wait for the balance to cover it. Callers
+    therefore queue in reservation order without holding a lock while waiting.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the token bucket, full.
+
+        Args:
+            per_minute (float): Refill rate in tokens per minute.
+            capacity (Optional[float]): Largest burst. Defaults to one minute of tokens.
+            clock (Callable[[], float]): Monotonic clock in seconds.
+        """
+        self.rate = per_minute / 60
+        self.capacity = per_minute if capacity is None else capacity
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """
+        Add the tokens accrued since the last update.
+        """
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take tokens and return the wait before they may be used.
+
+        Args:
+            amount (float): Number of tokens to take.
+
+        Returns:
+            float: Seconds to wait; 0 if the tokens were available.
+        """
+        with self._lock:
+            self._refill(self.clock())
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def charge(self, amount: float):
+        """
+        Take tokens without waiting, for usage only known after the call.
+
+        Args:
+            amount (float): Number of tokens to take.
+        """
+        with self._lock:
+            self._refill(self.clock())
+            self._tokens -= amount
+
+    def refund(self, amount: float):
+        """
+        Give back tokens taken by a reservation that will not be used.
+
+        Args:
+            amount (float): Number of tokens to give back.
+        """
+        with self._lock:
+            self._refill(self.clock())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit adjusted by additive increase, multiplicative decrease.
+
+    Each successful call grows the limit by `increase / limit`, about `increase`
+    per round of calls; a throttled call multiplies it by `decrease`. Only one
+    decrease is applied per round: throttles from calls that started before the
+    last decrease are ignored, since they reflect the old limit.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 64, increase: float = 1.0,
+                 decrease: float = 0.5):
+        """
+        Initialize the adaptive limit.
+
+        Args:
+            initial (int): Starting number of calls in flight.
+            minimum (int): Smallest limit.
+            maximum (int): Largest limit.
+            increase (float): Growth of the limit per round of successful calls.
+            decrease (float): Factor applied to the limit on throttling.
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self._epoch = 0
+        self._condition = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _try_acquire(self) -> Optional[int]:
+        """
+        Take a slot if one is free. Must be called with the condition held.
+
+        Returns:
+            Optional[int]: The current epoch, or None if the limit is reached.
+        """
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return self._epoch
+        return None
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """
+        Wait for a free slot.
+
+        Args:
+            timeout (Optional[float]): Longest wait in seconds. Waits forever if None.
+
+        Returns:
+            int: The epoch to pass back to `release`.
+
+        Raises:
+            TimeoutError: If no slot freed up in time.
+        """
+        with self._condition:
+            epoch = self._try_acquire()
+            if epoch is None and not self._condition.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                raise TimeoutError("Timed out waiting for a concurrency slot.")
+            return epoch if epoch is not None else self._try_acquire()
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> int:
+        """
+        Wait for a free slot without blocking the event loop.
+
+        Args:
+            timeout (Optional[float]): Longest wait in seconds. Waits forever if None.
+
+        Returns:
+            int: The epoch to pass back to `release`.
+
+        Raises:
+            TimeoutError: If no slot freed up in time.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._condition:
+                epoch = self._try_acquire()
+                if epoch is not None:
+                    return epoch
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError("Timed out waiting for a concurrency slot.")
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                raise TimeoutError("Timed out waiting for a concurrency slot.") from None
+
+    def release(self, epoch: int, throttled: bool = False, succeeded: bool = True):
+        """
+        Return a slot and adjust the limit from the call's outcome.
+
+        Args:
+            epoch (int): The epoch returned by `acquire`.
+            throttled (bool): Whether the call was throttled.
+            succeeded (bool): Whether the call succeeded.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                if epoch == self._epoch:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._epoch += 1
+            elif succeeded:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(lambda waiter=waiter: waiter.done() or waiter.set_result(None))
+
+class RetryPolicy:
+    """
+    Jittered exponential backoff bounded by a per-call deadline.
+
+    The delay before retry n (from 0) is drawn uniformly from
+    [0, min(max_delay, base_delay * 2 ** n)] ("full jitter"), which spreads
+    retries from many callers instead of having them collide.
+    """
+
+    def __init__(self, max_attempts: int = 6, base_delay: float = 0.5, max_delay: float = 30.0,
+                 deadline: Optional[float] = 120.0, rng: Optional[random.Random] = None):
+        """
+        Initialize the retry policy.
+
+        Args:
+            max_attempts (int): Attempts per call, including the first.
+            base_delay (float): Upper bound of the first backoff, in seconds.
+            max_delay (float): Largest upper bound of a backoff, in seconds.
+            deadline (Optional[float]): Seconds a call may spend waiting for quota and
+                a slot and retrying; no attempt starts after it. An attempt already
+                running is not interrupted, so the model client needs its own
+                timeout. Unbounded if None.
+            rng (Optional[random.Random]): Source of jitter.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.rng = rng or random.Random()
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Return the delay before retrying after a failed attempt.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 0.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+class RateLimiter:
+    """
+    Wraps model calls with request and token buckets, an adaptive concurrency
+    limit and retries.
+
+    Prompt tokens are reserved before a call; response tokens are charged after
+    it, so the token bucket tracks actual usage. Throttling errors shrink the
+    concurrency limit and are retried like transient server errors; other
+    errors are raised at once.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 concurrency: Optional[AdaptiveConcurrency] = None, retry: Optional[RetryPolicy] = None,
+                 metrics: Optional[MetricsCollector] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            requests_per_minute (Optional[float]): Request quota. Unlimited if None.
+            tokens_per_minute (Optional[float]): Token quota, counting prompt and
+                response tokens. Unlimited if None.
+            concurrency (Optional[AdaptiveConcurrency]): Limit on calls in flight.
+                Defaults to an AdaptiveConcurrency with default settings.
+            retry (Optional[RetryPolicy]): Retry policy. Defaults to RetryPolicy().
+            metrics (Optional[MetricsCollector]): Records retries, throttles and waits.
+            clock (Callable[[], float]): Monotonic clock in seconds.
+            sleep (Callable[[float], None]): Blocking sleep used by the sync path.
+        """
+        self.requests = TokenBucket(requests_per_minute, clock=clock) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute else None
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.retry = retry or RetryPolicy()
+        self.metrics = metrics
+        self.clock = clock
+        self.sleep = sleep
+
+    def _quota_wait(self, prompt_tokens: int, start: float) -> float:
+        """
+        Reserve one request and the prompt tokens, returning the wait needed.
+
+        Raises:
+            TimeoutError: If the wait would run past the deadline; the
+                reservation is given back.
+        """
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(prompt_tokens))
+        if wait and self.retry.deadline is not None and wait >= self.retry.deadline - (self.clock() - start):
+            if self.requests is not None:
+                self.requests.refund(1)
+            if self.tokens is not None:
+                self.tokens.refund(prompt_tokens)
+            raise TimeoutError("LLM call deadline exceeded waiting for quota.")
+        if wait and self.metrics is not None:
+            self.metrics.observe("rate_limit_wait_seconds", wait)
+        return wait
+
+    def _remaining(self, start: float) -> Optional[float]:
+        """
+        Return the seconds left before the call's deadline, or None if unbounded.
+
+        Raises:
+            TimeoutError: If the deadline has passed.
+        """
+        if self.retry.deadline is None:
+            return None
+        remaining = self.retry.deadline - (self.clock() - start)
+        if remaining <= 0:
+            raise TimeoutError("LLM call deadline exceeded.")
+        return remaining
+
+    def _after_failure(self, error: Exception, attempt: int, start: float) -> float:
+        """
+        Decide whether to retry a failed attempt and return the backoff.
+
+        Raises:
+            Exception: The error itself if it is not retryable, the attempts are
+                used up, or the backoff would run past the deadline.
+        """
+        if not is_retryable(error) or attempt + 1 >= self.retry.max_attempts:
+            raise error
+        delay = self.retry.backoff(attempt)
+        remaining = self._remaining(start)
+        if remaining is not None and delay >= remaining:
+            raise error
+        if self.metrics is not None:
+            self.metrics.increment("llm_retries_total")
+            if is_throttle(error):
+                self.metrics.increment("llm_throttled_total")
+        return delay
+
+    def _charge(self, response: str):
+        """
+        Charge the response tokens once the call has returned.
+        """
+        if self.tokens is not None:
+            self.tokens.charge(estimate_tokens(response))
+
+    def call(self, fn: Callable[[], str], prompt_tokens: int = 0) -> str:
+        """
+        Run a blocking model call under the limits, retrying on transient errors.
+
+        The retry deadline bounds the waits and retries, and no attempt starts
+        after it; a running attempt is not interrupted.
+
+        Args:
+            fn (Callable[[], str]): Makes one attempt and returns the response.
+            prompt_tokens (int): Estimated tokens in the prompt.
+
+        Returns:
+            str: The response.
+        """
+        start = self.clock()
+        attempt = 0
+        while True:
+            wait = self._quota_wait(prompt_tokens, start)
+            if wait:
+                self.sleep(wait)
+            epoch = self.concurrency.acquire(self._remaining(start))
+            try:
+                # Waiting for the slot may have used up the deadline.
+                self._remaining(start)
+                response = fn()
+            except Exception as e:
+                self.concurrency.release(epoch, throttled=is_throttle(e), succeeded=False)
+                delay = self._after_failure(e, attempt, start)
+                attempt += 1
+                self.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled or interrupted: not an outcome of the call, so give the slot back unchanged.
+                self.concurrency.release(epoch, succeeded=False)
+                raise
+            self.concurrency.release(epoch)
+            self._charge(response)
+            return response
+
+    async def call_async(self, fn: Callable[[], Awaitable[str]], prompt_tokens: int = 0) -> str:
+        """
+        Run a model call under the limits without blocking the event loop.
+
+        The retry deadline bounds the waits and retries as in `call`.
+
+        Args:
+            fn (Callable[[], Awaitable[str]]): Makes one attempt and returns the response.
+            prompt_tokens (int): Estimated tokens in the prompt.
+
+        Returns:
+            str: The response.
+        """
+        start = self.clock()
+        attempt = 0
+        while True:
+            wait = self._quota_wait(prompt_tokens, start)
+            if wait:
+                await asyncio.sleep(wait)
+            epoch = await self.concurrency.acquire_async(self._remaining(start))
+            try:
+                # Waiting for the slot may have used up the deadline.
+                self._remaining(start)
+                response = await fn()
+            except Exception as e:
+                self.concurrency.release(epoch, throttled=is_throttle(e), succeeded=False)
+                delay = self._after_failure(e, attempt, start)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled or interrupted: not an outcome of the call, so give the slot back unchanged.
+                self.concurrency.release(epoch, succeeded=False)
+                raise
+            self.concurrency.release(epoch)
+            self._charge(response)
+            return response
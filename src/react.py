@@ -2,24 +2,66 @@
 
 # src/react.py
 
-from llm_interface import LLMInterface
-from tools import WikipediaTool
+import re
+import time
+from typing import Optional, Union
+from .llm_interface import LLMInterface
+from .chain_state import ReActState
+from .context_budget import ContextBudget
+from .exemplars import ExemplarBank, resolve_exemplar
+from .metrics import MetricsCollector, estimate_tokens
+from .near_duplicate import NearDuplicateCache, namespace_for
+from .tool_registry import ToolRegistry
+from .tools import PREFIX, RANKED, WikipediaTool
+from .transcript import ReActTranscript, split_response_lines
+
+# End generation once the action is written, before the model invents an observation.
+REACT_STOP_SEQUENCES = ["<STOP>", "\nObservation"]
+_ACTION_PREFIX = re.compile(r"^\s*Action\s*\d*\s*:\s*")
+
+def observation_key(action: str) -> str:
+    """
+    Normalize an action line so the same lookup matches across chains and steps.
+
+    Args:
+        action (str): The action line, such as "Action 2: Gerald Ford<STOP>".
+
+    Returns:
+        str: The case-folded action without its step prefix and stop text.
+    """
+    return " ".join(_ACTION_PREFIX.sub("", action.split("<STOP>")[0], count=1).split()).casefold()
 
 class ReAct:
     """
     Implements ReAct (Reasoning + Acting) prompting for LLMs.
     """
 
-    def __init__(self, llm: LLMInterface, tool: WikipediaTool):
+    def __init__(self, llm: LLMInterface, tool: WikipediaTool, metrics: Optional[MetricsCollector] = None,
+                 budget: Optional[ContextBudget] = None, tools: Optional[ToolRegistry] = None,
+                 near_cache: Optional[NearDuplicateCache] = None):
         """
         Initialize the ReAct instance.
 
         Args:
             llm (LLMInterface): An instance of LLMInterface.
             tool (WikipediaTool): An instance of WikipediaTool.
+            metrics (Optional[MetricsCollector]): Records the time each step spends in
+                the LLM, in parsing and in the tool. Steps are not measured if None.
+            budget (Optional[ContextBudget]): Compacts earlier steps when the prompt
+                grows over its token budget. The full transcript is sent if None.
+            tools (Optional[ToolRegistry]): Runs each action line against named tools,
+                in parallel and with timeouts. Every action goes to `tool` if None.
+            near_cache (Optional[NearDuplicateCache]): Serves answers to reworded
+                questions answered before with the same context and exemplar, and
+                reuses their observations for less similar questions. Every
+                question runs a full chain if None.
         """
         self.llm = llm
         self.tool = tool
+        self.metrics = metrics
+        self.budget = budget
+        self.tools = tools
+        self.near_cache = near_cache
 
     def get_wiki_query(self, llm_response: str, stop_text: str = "<STOP>") -> str:
         """
@@ -30,53 +72,187 @@ class ReAct:
             stop_text (str): The delimiter indicating the end of the action.
 
         Returns:
-            str: The extracted Wikipedia query.
+            str: The extracted Wikipedia query, without its "Action N:" prefix.
         """
         first_line = llm_response.splitlines()[0]
         query = first_line.split(stop_text)[0]
-        return query.strip()
+        return _ACTION_PREFIX.sub("", query, count=1).strip()
+
+    @staticmethod
+    def step_complete(llm_response: str) -> bool:
+        """
+        Check whether a partial response already holds a full answer or action.
+
+        Args:
+            llm_response (str): The text generated so far.
+
+        Returns:
+            bool: True once the first line closes an answer or a third line starts.
+        """
+        first_line, _, rest = llm_response.partition("\n")
+        if "]" in first_line.partition("Answer[")[2]:
+            return True
+        return "\n" in rest
+
+    def _record_step(self, start: Optional[float], llm_done: Optional[float], parse_done: Optional[float],
+                     tool_start: Optional[float] = None, tool_done: Optional[float] = None):
+        """
+        Record the LLM, parse and tool time of one step.
+
+        Args:
+            start (Optional[float]): When the step started, or None if its LLM call
+                ran before the chain was resumed.
+            llm_done (Optional[float]): When the LLM call returned, or None likewise.
+            parse_done (Optional[float]): When the response was parsed, or None likewise.
+            tool_start (Optional[float]): When the tool was called, or None if the
+                step ended with an answer.
+            tool_done (Optional[float]): When the tool returned, or None likewise.
+        """
+        if self.metrics is None:
+            return
+        self.metrics.increment("react_steps_total")
+        if start is not None:
+            self.metrics.observe("react_step_llm_seconds", llm_done - start)
+            self.metrics.observe("react_step_parse_seconds", parse_done - llm_done)
+        if tool_done is not None:
+            self.metrics.observe("react_step_tool_seconds", tool_done - tool_start)
 
-    def react_chain(self, context: str, exemplar: str, question: str, max_steps: int = 7, show_activity: bool = False) -> str:
+    def _save(self, store, state: ReActState):
+        """
+        Checkpoint the state if there is a store, timing the write on its own.
+
+        Args:
+            store: The state store, or None.
+            state (ReActState): The state to save.
+        """
+        if store is None:
+            return
+        start = time.perf_counter()
+        store.save(state)
+        if self.metrics is not None:
+            self.metrics.observe("react_checkpoint_seconds", time.perf_counter() - start)
+
+    def react_chain(self, context: str, exemplar: Union[str, ExemplarBank], question: str, max_steps: int = 7, show_activity: bool = False,
+                    stream: bool = False, store=None, chain_id: Optional[str] = None) -> str:
         """
         Execute a ReAct chain to answer a question.
 
         Args:
             context (str): Instructions for the LLM.
-            exemplar (str): An exemplar demonstrating ReAct steps.
+            exemplar (Union[str, ExemplarBank]): An exemplar demonstrating ReAct steps,
+                or a bank to pick the exemplars for the question from. They are picked
+                once and reused by every step.
             question (str): The question to be answered.
             max_steps (int): Maximum number of ReAct steps.
             show_activity (bool): Whether to print activity logs.
+            stream (bool): Whether to stream each step and stop as soon as the
+                answer or the action is complete.
+            store (Optional[MemoryStateStore or FileStateStore]): Receives the chain
+                state after every LLM call and lookup. Nothing is saved if None.
+            chain_id (Optional[str]): Identifier of the chain in the store. A random
+                one is used if None.
 
         Returns:
             str: The final answer from the LLM.
         """
-        next_llm_call = f"{context}\n\n{exemplar}\n\nQuestion: {question}\nThought 1:"
-        step = 1
+        exemplar = resolve_exemplar(exemplar, question)
+        state = ReActState(ReActTranscript(context, exemplar, question), max_steps, chain_id)
+        if self.near_cache is None:
+            return self.resume(state, store, show_activity, stream)
+
+        namespace = namespace_for("react", context, exemplar)
+        hit, related = self.near_cache.lookup_related(question, namespace)
+        if hit is not None:
+            return hit[0]["answer"]
+        if related is not None:
+            state.known_observations = dict(related[0]["observations"])
+        answer = self.resume(state, store, show_activity, stream)
+        if answer is not None:
+            observations = {observation_key(step.action): step.observation for step in state.transcript.steps}
+            self.near_cache.put(question, {"answer": answer, "observations": observations}, namespace)
+        return answer
+
+    def resume(self, state: ReActState, store=None, show_activity: bool = False, stream: bool = False) -> str:
+        """
+        Continue a ReAct chain from a saved state.
+
+        A pending action is looked up first, without calling the LLM again. A
+        finished chain returns its answer at once.
+
+        Args:
+            state (ReActState): The chain state, for example from `store.load(chain_id)`.
+            store (Optional[MemoryStateStore or FileStateStore]): Receives the chain
+                state after every LLM call and lookup. Nothing is saved if None.
+            show_activity (bool): Whether to print activity logs.
+            stream (bool): Whether to stream each step and stop as soon as the
+                answer or the action is complete.
+
+        Returns:
+            str: The final answer from the LLM, or None if there is none.
+        """
+        transcript = state.transcript
 
-        while step <= max_steps:
+        while not state.done and transcript.step <= state.max_steps:
             if show_activity:
-                print(f"\033[1mReAct chain step {step}:\033[0m\x1B[0m")
-            llm_response = self.llm.call_llm(next_llm_call, show_activity)
-
-            # Check for an answer
-            response_first_line = llm_response.splitlines()[0]
-            first_line_answer_split = response_first_line.split("Answer[")
-            if len(first_line_answer_split) > 1:
-                return first_line_answer_split[1].split("]")[0]
-
-            # Assume the second line is the action
-            if len(llm_response.splitlines()) < 2:
-                break  # Incomplete response
-            response_second_line = llm_response.splitlines()[1]
-            wiki_query = self.get_wiki_query(response_second_line)
-            wiki_text = self.tool.wiki_tool(wiki_query)
+                print(f"\033[1mReAct chain step {transcript.step}:\033[0m\x1B[0m")
+            step_start = llm_done = parse_done = None
+            if state.pending_action is None:
+                step_start = time.perf_counter()
+                prompt = transcript.render() if self.budget is None else self.budget.render(transcript)
+                if self.metrics is not None:
+                    self.metrics.observe("react_prompt_tokens", estimate_tokens(prompt))
+                if stream:
+                    llm_response = self.llm.stream_llm(prompt, show_activity,
+                                                       stop_sequences=REACT_STOP_SEQUENCES,
+                                                       stop_condition=self.step_complete)
+                else:
+                    llm_response = self.llm.call_llm(prompt, show_activity,
+                                                     stop_sequences=REACT_STOP_SEQUENCES)
+                llm_done = time.perf_counter()
 
-            # Assemble the next LLM call
-            usable_response = f"{response_first_line}\n{response_second_line}"
-            obs = f"Observation {step}: {wiki_text}"
-            step += 1
-            next_llm_call = f"{next_llm_call} {usable_response}\n{obs}\nThought {step}:"
+                # Check for an answer
+                response_first_line, response_second_line = split_response_lines(llm_response)
+                first_line_answer_split = response_first_line.split("Answer[")
+                if len(first_line_answer_split) > 1:
+                    state.answer = first_line_answer_split[1].split("]")[0]
+                    state.done = True
+                    self._record_step(step_start, llm_done, time.perf_counter())
+                    break
 
-        return None  # Max steps exceeded without finding an answer
+                # Assume the second line is the action
+                if response_second_line is None:
+                    break  # Incomplete response
+                if "<STOP>" not in response_second_line:
+                    # The stop sequence is left out of the response; keep the exemplar's format.
+                    response_second_line = f"{response_second_line}<STOP>"
+                state.pending_action = {
+                    "thought": response_first_line,
+                    "action": response_second_line,
+                    "query": self.get_wiki_query(response_second_line),
+                }
+                parse_done = time.perf_counter()
+                self._save(store, state)
 
+            tool_start = time.perf_counter()
+            known = state.known_observations.get(observation_key(state.pending_action["action"]))
+            if known is not None:
+                wiki_text = known
+            elif self.tools is not None:
+                focus = state.pending_action["thought"] if getattr(self.tool, "extraction", PREFIX) == RANKED else None
+                wiki_text = self.tools.run_action(state.pending_action["action"], focus=focus)
+            elif getattr(self.tool, "extraction", PREFIX) == RANKED:
+                # Rank the article's passages against what the thought is looking for.
+                wiki_text = self.tool.wiki_tool(state.pending_action["query"], focus=state.pending_action["thought"])
+            else:
+                wiki_text = self.tool.wiki_tool(state.pending_action["query"])
+            self._record_step(step_start, llm_done, parse_done, tool_start, time.perf_counter())
+
+            # Assemble the next LLM call
+            transcript.add_step(state.pending_action["thought"], state.pending_action["action"], wiki_text)
+            state.pending_action = None
+            self._save(store, state)
 
+        # An answer, an incomplete response or max steps exceeded all end the chain.
+        state.done = True
+        self._save(store, state)
+        return state.answer
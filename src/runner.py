@@ -0,0 +1,362 @@
+# Runs a reasoning strategy over a JSONL dataset in resumable shards.
+
+# src/runner.py
+
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import time
+from contextlib import ExitStack
+from typing import Callable, Iterator, Optional
+
+STRATEGIES = ("cot", "react", "self_consistency")
+
+def shard_path(output_path: str, shard: int, shards: int) -> str:
+    """
+    Return the path of one shard's output file.
+
+    Args:
+        output_path (str): Path of the merged output.
+        shard (int): Index of the shard.
+        shards (int): Number of shards.
+
+    Returns:
+        str: The shard's output path.
+    """
+    return f"{output_path}.shard-{shard:04d}-of-{shards:04d}"
+
+def resume_point(path: str) -> int:
+    """
+    Find the last completed line of a shard and drop any partially written record.
+
+    Records are written in input order, so the last complete record is the
+    checkpoint; only the tail of the file is read.
+
+    Args:
+        path (str): The shard's output path.
+
+    Returns:
+        int: The dataset line of the last completed record, or -1 if none.
+    """
+    if not os.path.exists(path):
+        return -1
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        block = 4096
+        tail = b""
+        position = end
+        # Read backwards until the tail holds a complete record.
+        while position > 0:
+            step = min(block, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            if tail.count(b"\n") >= 2 or (position == 0 and b"\n" in tail):
+                break
+        complete = tail[:tail.rfind(b"\n") + 1]
+        if len(complete) < len(tail):
+            # A crash left a partial record; cut it off so the file stays valid JSONL.
+            f.truncate(position + len(complete))
+        lines = complete.splitlines()
+        if not lines:
+            return -1
+        return json.loads(lines[-1])["line"]
+
+def iter_shard(dataset_path: str, shard: int, shards: int, after: int = -1) -> Iterator[tuple]:
+    """
+    Stream the questions of one shard, skipping those already completed.
+
+    Line i of the dataset belongs to shard i % shards.
+
+    Args:
+        dataset_path (str): JSONL file with a "question" and an optional "id" per line.
+        shard (int): Index of the shard.
+        shards (int): Number of shards.
+        after (int): Skip lines up to and including this one.
+
+    Yields:
+        tuple: The dataset line and the parsed record.
+    """
+    with open(dataset_path, encoding="utf-8") as f:
+        for line, text in enumerate(f):
+            if line % shards != shard or line <= after or not text.strip():
+                continue
+            yield line, json.loads(text)
+
+def build_strategy(config: dict, stack: Optional[ExitStack] = None) -> Callable[[str], dict]:
+    """
+    Build the LLM, the tool and the strategy named in the config.
+
+    Args:
+        config (dict): The runner configuration.
+        stack (Optional[ExitStack]): Closes what the strategy opens, such as a
+            trace file, when it exits. Nothing is closed if None.
+
+    Returns:
+        Callable[[str], dict]: Answers one question and returns the result fields.
+    """
+    from .llm_cache import ResponseCache
+    from .llm_interface import LLMInterface
+    from .tools import WikipediaTool
+
+    return_chars = config.get("return_chars", 1000)
+    extraction = config.get("extraction", "prefix")
+    if config.get("replay_trace"):
+        from .traces import ReplayLLM, ReplayWikipediaTool, TraceReplay
+
+        replay = TraceReplay(config["replay_trace"], simulate_latency=config.get("replay_latency", False))
+        llm = ReplayLLM(replay)
+        tool = ReplayWikipediaTool(replay, return_chars=return_chars, extraction=extraction)
+    else:
+        recorder = None
+        if config.get("record_trace"):
+            from .traces import TraceRecorder
+
+            recorder = TraceRecorder(config["record_trace"])
+            if stack is not None:
+                stack.callback(recorder.close)
+        cache = ResponseCache(path=config["cache_path"]) if config.get("cache_path") else None
+        llm = LLMInterface(config["project_id"], config["location"], config["model_name"], cache=cache,
+                           recorder=recorder)
+        tool = WikipediaTool(return_chars=return_chars, extraction=extraction, recorder=recorder)
+    exemplar = config.get("exemplar", "")
+    if config.get("exemplar_bank_path"):
+        from .exemplars import ExemplarBank
+
+        # Chain of Thought and self-consistency prompts end with "Q: " before the question.
+        exemplar = ExemplarBank.from_jsonl(config["exemplar_bank_path"], k=config.get("exemplars_per_prompt", 2),
+                                           max_tokens=config.get("max_exemplar_tokens"),
+                                           suffix="" if config["strategy"] == "react" else "\n\nQ: ")
+
+    if config["strategy"] == "cot":
+        from .answers import extract_answer
+        from .chain_of_thought import ChainOfThought
+
+        chain = ChainOfThought(llm=llm, tool=tool)
+
+        def answer(question: str) -> dict:
+            # generate_batch does not print the prompt, unlike generate_response.
+            response = chain.generate_batch(exemplar, [question])[0]
+            if isinstance(response, Exception):
+                raise response
+            return {"response": response, "answer": extract_answer(response)}
+        return answer
+
+    if config["strategy"] == "react":
+        from .context_budget import ContextBudget
+        from .react import ReAct
+
+        budget = ContextBudget(config["max_prompt_tokens"]) if config.get("max_prompt_tokens") else None
+        react = ReAct(llm=llm, tool=tool, budget=budget)
+
+        def answer(question: str) -> dict:
+            return {"answer": react.react_chain(config.get("context", ""), exemplar, question,
+                                                max_steps=config.get("max_steps", 7))}
+        return answer
+
+    if config["strategy"] == "self_consistency":
+        from .exemplars import resolve_exemplar
+        from .self_consistency import SelfConsistency
+
+        llm.parameters["temperature"] = config.get("temperature", 0.7)
+        self_consistency = SelfConsistency(llm=llm, tool=tool)
+
+        def answer(question: str) -> dict:
+            prompt = f"{resolve_exemplar(exemplar, question)}{question}\nA:"
+            answer_counts = self_consistency.run_multiple_responses(
+                prompt, llm.parameters, runs=config.get("runs", 10),
+                max_concurrency=config.get("max_concurrency", 1), show_activity=False,
+            )
+            return {"answer": answer_counts.most_common(1)[0][0], "answer_counts": dict(answer_counts)}
+        return answer
+
+    raise ValueError(f"Unknown strategy {config['strategy']!r}; expected one of {STRATEGIES}.")
+
+def run_shard(config: dict, shard: int, shards: int, progress=None,
+              report: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Answer every question of one shard, appending one record per question.
+
+    Records are flushed as they are written, so a restart resumes after the
+    last one. A question that raises gets a record with its error instead of
+    stopping the shard.
+
+    Args:
+        config (dict): The runner configuration.
+        shard (int): Index of the shard.
+        shards (int): Number of shards.
+        progress (Optional[multiprocessing.Value]): Shared count of completed questions.
+        report (Optional[Callable[[int], None]]): Called with the count answered so far
+            after each question.
+
+    Returns:
+        int: The number of questions answered in this run.
+    """
+    path = shard_path(config["output_path"], shard, shards)
+    after = resume_point(path)
+    answer = None
+    done = 0
+    with ExitStack() as stack, open(path, "a", encoding="utf-8") as out:
+        for line, record in iter_shard(config["dataset_path"], shard, shards, after):
+            if answer is None:
+                # Built lazily so a finished shard does not load a model.
+                answer = build_strategy(config, stack)
+            result = {"line": line, "id": record.get("id", line)}
+            start = time.perf_counter()
+            try:
+                result.update(answer(record["question"]))
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            result["seconds"] = round(time.perf_counter() - start, 3)
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            done += 1
+            if progress is not None:
+                with progress.get_lock():
+                    progress.value += 1
+            if report is not None:
+                report(done)
+    return done
+
+def merge_shards(output_path: str, shards: int) -> int:
+    """
+    Merge the shard outputs into one file in dataset order.
+
+    Each shard is already in dataset order, so this is a streaming k-way merge.
+
+    Args:
+        output_path (str): Path of the merged output.
+        shards (int): Number of shards.
+
+    Returns:
+        int: The number of records written.
+    """
+    files = [open(shard_path(output_path, shard, shards), encoding="utf-8") for shard in range(shards)]
+    count = 0
+    try:
+        streams = [((json.loads(text)["line"], text) for text in f) for f in files]
+        with open(output_path, "w", encoding="utf-8") as out:
+            for _, text in heapq.merge(*streams):
+                out.write(text)
+                count += 1
+    finally:
+        for f in files:
+            f.close()
+    return count
+
+def _throughput(count: int, elapsed: float) -> str:
+    return f"{count} questions in {elapsed:.0f}s ({count / elapsed if elapsed else 0.0:.2f}/s)"
+
+def run(config: dict, processes: int = 1, report_every: float = 10.0,
+        log: Callable[[str], None] = print) -> int:
+    """
+    Run the dataset across `processes` shards, report throughput and merge the results.
+
+    Rerunning with the same output path and number of processes resumes each
+    shard after its last completed question.
+
+    Args:
+        config (dict): The runner configuration.
+        processes (int): Number of shards, each run in its own process.
+        report_every (float): Seconds between throughput reports.
+        log (Callable[[str], None]): Receives the reports.
+
+    Returns:
+        int: The number of questions answered in this run.
+    """
+    start = time.perf_counter()
+    if processes <= 1:
+        last_report = start
+
+        def report(count: int):
+            nonlocal last_report
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                last_report = now
+                log(_throughput(count, now - start))
+
+        done = run_shard(config, 0, 1, report=report)
+    else:
+        progress = multiprocessing.Value("i", 0)
+        workers = [multiprocessing.Process(target=run_shard, args=(config, shard, processes, progress))
+                   for shard in range(processes)]
+        for worker in workers:
+            worker.start()
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=report_every / len(workers))
+            log(_throughput(progress.value, time.perf_counter() - start))
+        failed = [shard for shard, worker in enumerate(workers) if worker.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Shards {failed} failed; rerun to resume them.")
+        done = progress.value
+    elapsed = time.perf_counter() - start
+    log(f"Answered {done} questions in {elapsed:.1f}s ({done / elapsed if elapsed else 0.0:.2f}/s)")
+    merged = merge_shards(config["output_path"], max(1, processes))
+    log(f"Wrote {merged} results to {config['output_path']}")
+    return done
+
+def read_text(path: Optional[str]) -> str:
+    """
+    Return the contents of a text file, or "" if no path is given.
+    """
+    if not path:
+        return ""
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a reasoning strategy over a JSONL dataset of questions.")
+    parser.add_argument("dataset_path", help="JSONL file with a \"question\" and an optional \"id\" per line.")
+    parser.add_argument("output_path", help="JSONL file for the results; shards are written next to it.")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="cot")
+    parser.add_argument("--project-id", help="Google Cloud project ID; not needed with --replay-trace.")
+    parser.add_argument("--location", default="us-central1", help="Google Cloud location.")
+    parser.add_argument("--model-name", default="text-bison@001", help="Name of the Vertex AI model.")
+    parser.add_argument("--exemplar-file", help="Text file with the exemplar.")
+    parser.add_argument("--exemplar-bank", help="JSONL file with a \"question\" and an \"exemplar\" per line; "
+                                                "each question gets the most relevant ones instead of --exemplar-file.")
+    parser.add_argument("--exemplars-per-prompt", type=int, default=2, help="Exemplars picked from the bank.")
+    parser.add_argument("--max-exemplar-tokens", type=int, help="Token budget of the exemplars picked from the bank.")
+    parser.add_argument("--context-file", help="Text file with the ReAct instructions.")
+    parser.add_argument("--processes", type=int, default=1, help="Number of shards run in parallel.")
+    parser.add_argument("--extraction", choices=("prefix", "ranked"), default="prefix",
+                        help="Return the article start or the passages that best match each ReAct thought.")
+    parser.add_argument("--max-steps", type=int, default=7, help="Maximum ReAct steps.")
+    parser.add_argument("--max-prompt-tokens", type=int, help="Compact ReAct prompts larger than this.")
+    parser.add_argument("--runs", type=int, default=10, help="Samples per self-consistency question.")
+    parser.add_argument("--max-concurrency", type=int, default=1, help="Self-consistency samples in flight.")
+    parser.add_argument("--temperature", type=float, default=0.7, help="Self-consistency sampling temperature.")
+    parser.add_argument("--cache-path", help="SQLite file for a persistent response cache.")
+    parser.add_argument("--record-trace", help="Append every LLM call and Wikipedia lookup to this trace file.")
+    parser.add_argument("--replay-trace", help="Serve LLM calls and Wikipedia lookups from this trace file.")
+    parser.add_argument("--replay-latency", action="store_true", help="Wait the recorded latency of each replayed call.")
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between throughput reports.")
+    args = parser.parse_args()
+    if not args.project_id and not args.replay_trace:
+        parser.error("--project-id is required unless --replay-trace is given.")
+    run({
+        "dataset_path": args.dataset_path,
+        "output_path": args.output_path,
+        "strategy": args.strategy,
+        "project_id": args.project_id,
+        "location": args.location,
+        "model_name": args.model_name,
+        "exemplar": read_text(args.exemplar_file),
+        "exemplar_bank_path": args.exemplar_bank,
+        "exemplars_per_prompt": args.exemplars_per_prompt,
+        "max_exemplar_tokens": args.max_exemplar_tokens,
+        "context": read_text(args.context_file),
+        "extraction": args.extraction,
+        "max_steps": args.max_steps,
+        "max_prompt_tokens": args.max_prompt_tokens,
+        "runs": args.runs,
+        "max_concurrency": args.max_concurrency,
+        "temperature": args.temperature,
+        "cache_path": args.cache_path,
+        "record_trace": args.record_trace,
+        "replay_trace": args.replay_trace,
+        "replay_latency": args.replay_latency,
+    }, processes=args.processes, report_every=args.report_every)
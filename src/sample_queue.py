@@ -0,0 +1,218 @@
+# Work queues that spread self-consistency samples over worker processes and hosts.
+
+# src/sample_queue.py
+
+import argparse
+import os
+import queue
+import threading
+from multiprocessing.managers import BaseManager
+from typing import Optional, Tuple
+
+# Environment variable workers read the hex authkey from when --authkey is not given.
+AUTHKEY_ENV = "SAMPLE_QUEUE_AUTHKEY"
+
+class LocalSampleQueue:
+    """
+    In-process stand-in for RemoteSampleQueue, for tests and single-machine runs.
+
+    A sample queue has a `tasks` queue of (job_id, prompt, index) tuples, or None
+    to stop a worker, and a `results` queue of (job_id, index, response, error)
+    tuples. Workers run `run_sample_worker` against it.
+    """
+
+    def __init__(self):
+        """
+        Initialize empty task and result queues.
+        """
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+
+    def stop_workers(self, count: int):
+        """
+        Ask `count` workers to exit once the tasks ahead of the request are done.
+
+        Args:
+            count (int): Number of workers to stop.
+        """
+        for _ in range(count):
+            self.tasks.put(None)
+
+    def close(self):
+        """
+        Release the queue. Nothing to do in-process.
+        """
+
+# The queues served by a RemoteSampleQueue; they live in the manager's server process.
+_TASKS = queue.Queue()
+_RESULTS = queue.Queue()
+
+def _get_tasks() -> queue.Queue:
+    return _TASKS
+
+def _get_results() -> queue.Queue:
+    return _RESULTS
+
+class _ServerManager(BaseManager):
+    pass
+
+_ServerManager.register("get_tasks", callable=_get_tasks)
+_ServerManager.register("get_results", callable=_get_results)
+
+class _ClientManager(BaseManager):
+    pass
+
+_ClientManager.register("get_tasks")
+_ClientManager.register("get_results")
+
+class RemoteSampleQueue(LocalSampleQueue):
+    """
+    Task and result queues served over TCP by a multiprocessing manager.
+
+    The coordinator calls `serve`; workers on this or other hosts call
+    `connect` with the same address and authkey. The manager unpickles what
+    peers send, so anyone holding the authkey can run code on the coordinator:
+    keep the key secret and the port off untrusted networks.
+    """
+
+    def __init__(self, manager: BaseManager, owner: bool, authkey: bytes):
+        """
+        Wrap a started or connected manager. Use `serve` or `connect` instead.
+
+        Args:
+            manager (BaseManager): The manager.
+            owner (bool): Whether closing the queue shuts the server down.
+            authkey (bytes): The key the queues are served with.
+        """
+        self.manager = manager
+        self.owner = owner
+        self.authkey = authkey
+        self.tasks = manager.get_tasks()
+        self.results = manager.get_results()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """
+        Return the (host, port) the queues are served on.
+        """
+        return self.manager.address
+
+    @property
+    def authkey_hex(self) -> str:
+        """
+        Return the authkey as hex, for workers' --authkey or SAMPLE_QUEUE_AUTHKEY.
+        """
+        return self.authkey.hex()
+
+    @classmethod
+    def serve(cls, address: Tuple[str, int] = ("127.0.0.1", 0),
+              authkey: Optional[bytes] = None) -> "RemoteSampleQueue":
+        """
+        Start serving the queues from a new server process.
+
+        Args:
+            address (Tuple[str, int]): Host and port to listen on. Port 0 picks a free port.
+            authkey (Optional[bytes]): Key workers must present. A random 32-byte key
+                is generated if None; pass `authkey_hex` to the workers.
+
+        Returns:
+            RemoteSampleQueue: The coordinator's side of the queues.
+        """
+        authkey = authkey if authkey is not None else os.urandom(32)
+        manager = _ServerManager(address=address, authkey=authkey)
+        manager.start()
+        return cls(manager, owner=True, authkey=authkey)
+
+    @classmethod
+    def connect(cls, address: Tuple[str, int], authkey: bytes) -> "RemoteSampleQueue":
+        """
+        Connect to queues served by `serve`.
+
+        Args:
+            address (Tuple[str, int]): The coordinator's host and port.
+            authkey (bytes): The key the queues were served with.
+
+        Returns:
+            RemoteSampleQueue: A worker's side of the queues.
+        """
+        manager = _ClientManager(address=tuple(address), authkey=authkey)
+        manager.connect()
+        return cls(manager, owner=False, authkey=authkey)
+
+    def close(self):
+        """
+        Shut the server down if this side started it.
+        """
+        if self.owner:
+            self.manager.shutdown()
+
+def run_sample_worker(sample_queue: LocalSampleQueue, llm, threads: int = 1) -> int:
+    """
+    Answer sample tasks until the worker is asked to stop.
+
+    Each thread takes one task at a time and sends back the response, or the
+    error if the call failed, so the coordinator can retry it.
+
+    Args:
+        sample_queue (LocalSampleQueue or RemoteSampleQueue): The queues to work on.
+        llm (LLMInterface): Generates the samples.
+        threads (int): Number of tasks answered concurrently. Each thread stops at
+            its own stop request.
+
+    Returns:
+        int: The number of tasks answered.
+    """
+    done = []
+
+    def work():
+        count = 0
+        while True:
+            task = sample_queue.tasks.get()
+            if task is None:
+                break
+            job_id, prompt, index = task
+            try:
+                response, error = llm.call_llm(prompt, show_activity=False), None
+            except Exception as e:
+                response, error = None, f"{type(e).__name__}: {e}"
+            sample_queue.results.put((job_id, index, response, error))
+            count += 1
+        done.append(count)
+
+    if threads <= 1:
+        work()
+    else:
+        workers = [threading.Thread(target=work, daemon=True) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return sum(done)
+
+def parse_address(text: str) -> Tuple[str, int]:
+    """
+    Parse a "host:port" address.
+    """
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer self-consistency samples for a remote coordinator.")
+    parser.add_argument("address", help="The coordinator's host:port.")
+    parser.add_argument("--authkey", default=os.environ.get(AUTHKEY_ENV),
+                        help=f"Hex key the queues were served with; defaults to ${AUTHKEY_ENV}.")
+    parser.add_argument("--project-id", required=True, help="Google Cloud project ID.")
+    parser.add_argument("--location", default="us-central1", help="Google Cloud location.")
+    parser.add_argument("--model-name", default="text-bison@001", help="Name of the Vertex AI model.")
+    parser.add_argument("--temperature", type=float, default=0.7, help="Sampling temperature.")
+    parser.add_argument("--threads", type=int, default=8, help="Samples requested concurrently.")
+    args = parser.parse_args()
+    if not args.authkey:
+        parser.error(f"--authkey or ${AUTHKEY_ENV} is required.")
+
+    from .llm_interface import LLMInterface
+
+    worker_llm = LLMInterface(args.project_id, args.location, args.model_name)
+    worker_llm.parameters["temperature"] = args.temperature
+    remote = RemoteSampleQueue.connect(parse_address(args.address), bytes.fromhex(args.authkey))
+    print(f"Answered {run_sample_worker(remote, worker_llm, threads=args.threads)} samples.")
@@ -2,28 +2,74 @@
 
 # src/self_consistency.py
 
+import asyncio
+import heapq
+import math
+import queue
+import uuid
 from collections import Counter
-import matplotlib.pyplot as plt
-from llm_interface import LLMInterface
-from tools import WikipediaTool
+from typing import Callable, List, Optional, Sequence, Tuple
+from .answers import extract_answer
+from .llm_interface import LLMInterface
+from .metrics import MetricsCollector
+from .tools import WikipediaTool
+
+def beta_leader_confidence(answer_counts: Counter) -> float:
+    """
+    Posterior probability that the leading answer beats the runner-up.
+
+    Treats the leader's share of the top-two votes as Beta(leader + 1, runner_up + 1)
+    and returns the probability that this share exceeds one half.
+
+    Args:
+        answer_counts (Counter): A counter of the answers drawn so far.
+
+    Returns:
+        float: The confidence in the leading answer, between 0 and 1.
+    """
+    top_two = [count for _, count in answer_counts.most_common(2)]
+    if not top_two:
+        return 0.0
+    a = top_two[0] + 1
+    b = (top_two[1] if len(top_two) > 1 else 0) + 1
+    # For integer a and b, P(X > 1/2) with X ~ Beta(a, b) is P(Y < a) with Y ~ Binomial(a + b - 1, 1/2).
+    n = a + b - 1
+    return sum(math.comb(n, k) for k in range(a)) / 2 ** n
 
 class SelfConsistency:
     """
     Implements Self-Consistency for improving the reliability of LLM responses.
     """
 
-    def __init__(self, llm: LLMInterface, tool: WikipediaTool):
+    def __init__(self, llm: LLMInterface, tool: WikipediaTool, metrics: Optional[MetricsCollector] = None):
         """
         Initialize the SelfConsistency instance.
 
         Args:
             llm (LLMInterface): An instance of LLMInterface.
             tool (WikipediaTool): An instance of WikipediaTool.
+            metrics (Optional[MetricsCollector]): Records samples and unparsed answers.
+                Runs are not measured if None.
         """
         self.llm = llm
         self.tool = tool
+        self.metrics = metrics
+
+    @staticmethod
+    def extract_answer(response: str) -> str:
+        """
+        Extract the final answer from a response.
+
+        Args:
+            response (str): The LLM's response.
+
+        Returns:
+            str: The answer, or "NA" if none was found.
+        """
+        return extract_answer(response)
 
-    def run_multiple_responses(self, prompt: str, parameters: dict, runs: int = 40) -> Counter:
+    def run_multiple_responses(self, prompt: str, parameters: dict, runs: int = 40, max_concurrency: int = 1,
+                               show_activity: bool = True) -> Counter:
         """
         Generate multiple responses and count their occurrences.
 
@@ -31,27 +77,293 @@ class SelfConsistency:
             prompt (str): The prompt to send to the LLM.
             parameters (dict): Parameters for the LLM call.
             runs (int): Number of times to run the prompt.
+            max_concurrency (int): Number of samples kept in flight. Values above 1
+                use the concurrent path.
+            show_activity (bool): Whether to print each response and the counts.
 
         Returns:
             Counter: A counter of the different answers.
         """
-        responses = []
+        if max_concurrency > 1:
+            return asyncio.run(self.run_multiple_responses_async(prompt, parameters, runs, max_concurrency, show_activity))
+
         answers = []
 
         for i in range(runs):
-            print(f"Response {i + 1}...")
             response = self.llm.call_llm(prompt, show_activity=False)
-            responses.append(response)
+            answers.append(self._record_sample(response, i + 1, show_activity))
+
+        return self._report_answer_counts(answers, show_activity)
+
+    async def run_multiple_responses_async(self, prompt: str, parameters: dict, runs: int = 40, max_concurrency: int = 10,
+                                           show_activity: bool = True) -> Counter:
+        """
+        Generate multiple responses concurrently and count their occurrences.
+
+        At most `max_concurrency` calls are in flight at once. Responses are
+        handled in completion order; the resulting counter is the same as the
+        sequential path would produce for the same responses.
+
+        Args:
+            prompt (str): The prompt to send to the LLM.
+            parameters (dict): Parameters for the LLM call.
+            runs (int): Number of times to run the prompt.
+            max_concurrency (int): Maximum number of samples in flight.
+            show_activity (bool): Whether to print each response and the counts.
+
+        Returns:
+            Counter: A counter of the different answers.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def sample() -> str:
+            async with semaphore:
+                return await self.llm.call_llm_async(prompt, show_activity=False)
+
+        answers = []
+        tasks = [asyncio.ensure_future(sample()) for _ in range(runs)]
+        for i, finished in enumerate(asyncio.as_completed(tasks)):
+            response = await finished
+            answers.append(self._record_sample(response, i + 1, show_activity))
+
+        return self._report_answer_counts(answers, show_activity)
+
+    def run_distributed_responses(self, prompt: str, parameters: dict, sample_queue, runs: int = 40,
+                                  max_retries: int = 2, timeout: Optional[float] = None,
+                                  show_activity: bool = True) -> Counter:
+        """
+        Generate multiple responses on worker processes and count their occurrences.
+
+        Each sample is a task on `sample_queue`; workers running
+        `run_sample_worker` answer them and the answers are counted as the
+        responses stream back. A failed sample is handed out again up to
+        `max_retries` times. Only one run should read a queue's results at a
+        time; results of other runs are dropped.
+
+        Args:
+            prompt (str): The prompt to send to the LLM.
+            parameters (dict): Parameters for the LLM call. Workers use their own.
+            sample_queue (LocalSampleQueue or RemoteSampleQueue): The work queues.
+            runs (int): Number of times to run the prompt.
+            max_retries (int): Number of times a failed sample is retried.
+            timeout (Optional[float]): Seconds to wait for each response. Waits
+                forever if None.
+            show_activity (bool): Whether to print each response and the counts.
+
+        Returns:
+            Counter: A counter of the different answers.
+
+        Raises:
+            RuntimeError: If a sample still fails after `max_retries` retries.
+            TimeoutError: If no response arrives within `timeout`.
+        """
+        job_id = uuid.uuid4().hex
+        for index in range(runs):
+            sample_queue.tasks.put((job_id, prompt, index))
+
+        answer_counts = Counter()
+        failures = Counter()
+        received = 0
+        while received < runs:
             try:
-                answer = response.split("The answer is")[1].split(".")[0].strip()
-            except Exception:
-                answer = "NA"
-            answers.append(answer)
+                result_job, index, response, error = sample_queue.results.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No sample arrived within {timeout}s; {received} of {runs} received.")
+            if result_job != job_id:
+                continue  # Left over from an earlier run that timed out.
+            if error is not None:
+                failures[index] += 1
+                if failures[index] > max_retries:
+                    raise RuntimeError(f"Sample {index} failed {failures[index]} times: {error}")
+                sample_queue.tasks.put((job_id, prompt, index))
+                continue
+            received += 1
+            answer_counts[self._record_sample(response, received, show_activity)] += 1
+
+        if show_activity:
+            print("Answers and counts from most common to least common:")
+            print(answer_counts.most_common())
+        return answer_counts
+
+    def run_adaptive_responses(self, prompt: str, parameters: dict, min_runs: int = 5, max_runs: int = 40,
+                               confidence: float = 0.95,
+                               confidence_rule: Callable[[Counter], float] = beta_leader_confidence,
+                               show_activity: bool = True) -> Tuple[Counter, int, float]:
+        """
+        Generate responses until the leading answer is decisive.
+
+        Sampling stops as soon as at least `min_runs` responses have been drawn and
+        `confidence_rule` reports a confidence of at least `confidence`, or when
+        `max_runs` responses have been drawn.
+
+        Args:
+            prompt (str): The prompt to send to the LLM.
+            parameters (dict): Parameters for the LLM call.
+            min_runs (int): Minimum number of responses to draw.
+            max_runs (int): Maximum number of responses to draw.
+            confidence (float): Confidence needed to stop early.
+            confidence_rule (Callable[[Counter], float]): Maps the answer counts to a
+                confidence in the leading answer.
+            show_activity (bool): Whether to print each response and the counts.
+
+        Returns:
+            Tuple[Counter, int, float]: The answer counts, the number of responses
+            drawn and the final confidence.
+        """
+        answer_counts = Counter()
+        current_confidence = 0.0
+        runs = 0
+
+        while runs < max_runs:
+            runs += 1
+            response = self.llm.call_llm(prompt, show_activity=False)
+            answer_counts[self._record_sample(response, runs, show_activity)] += 1
+            current_confidence = confidence_rule(answer_counts)
+            if runs >= min_runs and current_confidence >= confidence:
+                break
+
+        if self.metrics is not None:
+            self.metrics.observe("self_consistency_adaptive_runs", runs)
+        if show_activity:
+            print(f"Stopped after {runs} responses with confidence {current_confidence:.3f}.")
+            print("Answers and counts from most common to least common:")
+            print(answer_counts.most_common())
+        return answer_counts, runs, current_confidence
+
+    def run_budgeted_responses(self, prompts: Sequence[str], parameters: dict, total_budget: int,
+                               initial_runs: int = 3, max_runs: int = 40, confidence: float = 0.95,
+                               confidence_rule: Callable[[Counter], float] = beta_leader_confidence,
+                               max_concurrency: int = 10,
+                               show_activity: bool = False) -> List[Tuple[Counter, int, float]]:
+        """
+        Share one sample budget across a batch of prompts, favoring the uncertain ones.
+
+        See `run_budgeted_responses_async`.
+
+        Returns:
+            List[Tuple[Counter, int, float]]: Per prompt, the answer counts, the
+            number of responses drawn and the final confidence.
+        """
+        return asyncio.run(self.run_budgeted_responses_async(prompts, parameters, total_budget, initial_runs, max_runs,
+                                                             confidence, confidence_rule, max_concurrency,
+                                                             show_activity))
+
+    async def run_budgeted_responses_async(self, prompts: Sequence[str], parameters: dict, total_budget: int,
+                                           initial_runs: int = 3, max_runs: int = 40, confidence: float = 0.95,
+                                           confidence_rule: Callable[[Counter], float] = beta_leader_confidence,
+                                           max_concurrency: int = 10,
+                                           show_activity: bool = False) -> List[Tuple[Counter, int, float]]:
+        """
+        Share one sample budget across a batch of prompts, favoring the uncertain ones.
+
+        Every prompt first gets `initial_runs` samples, drawn round-robin so a
+        small budget still covers each prompt. The rest of the budget goes one
+        sample at a time to the open prompt with the lowest confidence (fewest
+        samples on ties). A prompt closes once it reaches `confidence` or
+        `max_runs`. Each prompt has at most one adaptive sample in flight, so
+        every sample is chosen with the latest counts.
+
+        Args:
+            prompts (Sequence[str]): The prompts to send to the LLM.
+            parameters (dict): Parameters for the LLM call.
+            total_budget (int): Total number of samples for the batch.
+            initial_runs (int): Samples drawn for every prompt before allocating the rest.
+            max_runs (int): Maximum number of samples for one prompt.
+            confidence (float): Confidence at which a prompt needs no more samples.
+            confidence_rule (Callable[[Counter], float]): Maps the answer counts to a
+                confidence in the leading answer.
+            max_concurrency (int): Maximum number of samples in flight.
+            show_activity (bool): Whether to print each response and a summary.
+
+        Returns:
+            List[Tuple[Counter, int, float]]: Per prompt, the answer counts, the
+            number of responses drawn and the final confidence.
+        """
+        answer_counts = [Counter() for _ in prompts]
+        runs = [0] * len(prompts)
+        confidences = [0.0] * len(prompts)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def sample(i: int) -> Tuple[int, str]:
+            async with semaphore:
+                return i, await self.llm.call_llm_async(prompts[i], show_activity=False)
+
+        def record(i: int, response: str):
+            runs[i] += 1
+            answer_counts[i][self._record_sample(response, runs[i], show_activity)] += 1
+            confidences[i] = confidence_rule(answer_counts[i])
+
+        def is_open(i: int) -> bool:
+            return runs[i] < max_runs and confidences[i] < confidence
+
+        initial = [i for _ in range(min(initial_runs, max_runs)) for i in range(len(prompts))][:max(0, total_budget)]
+        for finished in asyncio.as_completed([sample(i) for i in initial]):
+            record(*(await finished))
+        spent = len(initial)
+
+        # Lowest confidence first, then fewest samples.
+        waiting = [(confidences[i], runs[i], i) for i in range(len(prompts)) if is_open(i)]
+        heapq.heapify(waiting)
+        in_flight = set()
+        while waiting or in_flight:
+            while waiting and spent < total_budget and len(in_flight) < max_concurrency:
+                in_flight.add(asyncio.ensure_future(sample(heapq.heappop(waiting)[2])))
+                spent += 1
+            if not in_flight:
+                break
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                i, response = task.result()
+                record(i, response)
+                if is_open(i):
+                    heapq.heappush(waiting, (confidences[i], runs[i], i))
+
+        if self.metrics is not None:
+            for count in runs:
+                self.metrics.observe("self_consistency_budgeted_runs", count)
+        if show_activity:
+            settled = sum(1 for value in confidences if value >= confidence)
+            print(f"Spent {spent} of {total_budget} samples; {settled} of {len(prompts)} prompts reached "
+                  f"confidence {confidence}.")
+        return list(zip(answer_counts, runs, confidences))
+
+    def _record_sample(self, response: str, number: int, show_activity: bool) -> str:
+        """
+        Extract the answer of one sample, counting and printing it as requested.
+
+        Args:
+            response (str): The LLM's response.
+            number (int): The position of the sample, starting at 1.
+            show_activity (bool): Whether to print the response.
+
+        Returns:
+            str: The answer, or "NA" if none was found.
+        """
+        answer = self.extract_answer(response)
+        if self.metrics is not None:
+            self.metrics.increment("self_consistency_samples_total")
+            if answer == "NA":
+                self.metrics.increment("self_consistency_unparsed_total")
+        if show_activity:
+            print(f"Response {number}...")
             print(response)
+        return answer
 
+    def _report_answer_counts(self, answers: list, show_activity: bool = True) -> Counter:
+        """
+        Count the answers and print them from most to least common.
+
+        Args:
+            answers (list): The extracted answers.
+            show_activity (bool): Whether to print the counts.
+
+        Returns:
+            Counter: A counter of the different answers.
+        """
         answer_counts = Counter(answers)
-        print("Answers and counts from most common to least common:")
-        print(answer_counts.most_common())
+        if show_activity:
+            print("Answers and counts from most common to least common:")
+            print(answer_counts.most_common())
         return answer_counts
 
     def plot_answer_distribution(self, answer_counts: Counter):
@@ -61,6 +373,8 @@ class SelfConsistency:
         Args:
             answer_counts (Counter): A counter of the different answers.
         """
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots()
         ax.bar(answer_counts.keys(), answer_counts.values())
         ax.tick_params(axis='x', rotation=55)
@@ -0,0 +1,287 @@
+# Maps ReAct action names to tools and runs a step's actions in parallel with timeouts.
+
+# src/tool_registry.py
+
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+from .metrics import MetricsCollector
+
+# "Action 2: " before the actions and "<STOP>" after them.
+_ACTION_PREFIX = re.compile(r"^\s*Action\s*\d*\s*:\s*")
+# Name[argument]; the argument may not contain brackets.
+_CALL = re.compile(r"([A-Za-z_][\w ]*?)\s*\[([^\[\]]*)\]")
+
+class RegisteredTool:
+    """
+    A tool with its limits: a timeout, a concurrency pool and a result-size cap.
+    """
+
+    def __init__(self, name: str, func: Callable, timeout: float = 10.0, max_concurrency: int = 4,
+                 max_chars: Optional[int] = None, takes_focus: bool = False):
+        """
+        Initialize the tool.
+
+        Args:
+            name (str): The action name the model uses, as in Name[argument].
+            func (Callable): Takes the argument and returns the observation. May be
+                a coroutine function.
+            timeout (float): Seconds to wait for a call before giving up on it.
+            max_concurrency (int): Maximum number of calls running at once.
+            max_chars (Optional[int]): Observations are cut to this many characters.
+                No cap if None.
+            takes_focus (bool): Whether func also takes a `focus` keyword, the
+                thought that asked for the call.
+        """
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_chars = max_chars
+        self.takes_focus = takes_focus
+        self.is_async = asyncio.iscoroutinefunction(func)
+        # Sync calls that timed out but are still holding a pool thread.
+        self.abandoned = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+class ToolRegistry:
+    """
+    Runs the actions of a ReAct step against registered tools.
+
+    An action line holds one or more Name[argument] calls, or a bare argument
+    for the default tool. Calls of one step run in parallel; sync tools run on
+    their own thread pool and async tools on a shared background event loop.
+    A call that times out or raises gives an observation saying so, so one slow
+    tool never stalls the chain.
+
+    A thread cannot be interrupted, so a sync call that times out keeps its pool
+    thread until it returns. Once every thread of a tool is held by such calls,
+    new calls to it are rejected at once instead of queueing behind them. Sync
+    tools must enforce their own timeouts (for example on their HTTP requests)
+    to free their threads.
+    """
+
+    def __init__(self, default: Optional[str] = None, metrics: Optional[MetricsCollector] = None):
+        """
+        Initialize an empty registry.
+
+        Args:
+            default (Optional[str]): Tool that receives actions without a Name[...] call.
+                The first registered tool if None.
+            metrics (Optional[MetricsCollector]): Records calls, timeouts, errors and
+                latency. Calls are not measured if None.
+        """
+        self.tools: Dict[str, RegisteredTool] = {}
+        self.default = default
+        self.metrics = metrics
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, func: Callable, timeout: float = 10.0, max_concurrency: int = 4,
+                 max_chars: Optional[int] = None, takes_focus: bool = False) -> "ToolRegistry":
+        """
+        Register a tool under an action name.
+
+        Args:
+            name (str): The action name; matched case-insensitively.
+            func (Callable): Takes the argument and returns the observation. May be
+                a coroutine function. A sync func must time out on its own; the
+                registry stops waiting for it but cannot stop it.
+            timeout (float): Seconds to wait for a call before giving up on it.
+            max_concurrency (int): Maximum number of calls running at once.
+            max_chars (Optional[int]): Observations are cut to this many characters.
+            takes_focus (bool): Whether func also takes a `focus` keyword.
+
+        Returns:
+            ToolRegistry: The registry, for chaining.
+        """
+        self.tools[name.casefold()] = RegisteredTool(name, func, timeout, max_concurrency, max_chars, takes_focus)
+        if self.default is None:
+            self.default = name
+        return self
+
+    @classmethod
+    def for_wikipedia(cls, tool, timeout: float = 10.0, max_concurrency: int = 4,
+                      metrics: Optional[MetricsCollector] = None) -> "ToolRegistry":
+        """
+        Build a registry whose default tool is a WikipediaTool, named "Wikipedia".
+
+        The tool gets the focus of each lookup, which ranked extraction uses.
+
+        Args:
+            tool (WikipediaTool): The Wikipedia tool.
+            timeout (float): Seconds to wait for a lookup.
+            max_concurrency (int): Maximum number of lookups running at once.
+            metrics (Optional[MetricsCollector]): Records calls, timeouts, errors and latency.
+
+        Returns:
+            ToolRegistry: The registry.
+        """
+        return cls(metrics=metrics).register("Wikipedia", tool.wiki_tool, timeout, max_concurrency,
+                                             max_chars=tool.return_chars, takes_focus=True)
+
+    def parse_actions(self, action: str) -> List[Tuple[str, str]]:
+        """
+        Split an action line into tool calls.
+
+        Args:
+            action (str): The action line, such as "Action 2: Wikipedia[A] Wikipedia[B]<STOP>".
+
+        Returns:
+            List[Tuple[str, str]]: The (tool name, argument) calls in order. A line
+            without a call to a registered tool is one call to the default tool.
+        """
+        text = _ACTION_PREFIX.sub("", action.split("<STOP>")[0], count=1).strip()
+        calls = [(name, argument.strip()) for name, argument in _CALL.findall(text)
+                 if name.strip().casefold() in self.tools]
+        return calls or [(self.default, text)]
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Return the event loop async tools run on, starting it on first use.
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="tool-registry-loop", daemon=True).start()
+            return self._loop
+
+    def _submit(self, tool: RegisteredTool, argument: str, focus: Optional[str] = None) -> Optional[Future]:
+        """
+        Start a call on the tool's pool.
+
+        Args:
+            tool (RegisteredTool): The tool.
+            argument (str): The argument.
+            focus (Optional[str]): Passed to tools that take a focus, if not None.
+
+        Returns:
+            Optional[Future]: The call's result, or None if every thread of the
+            tool is held by calls that timed out.
+        """
+        kwargs = {"focus": focus} if tool.takes_focus and focus is not None else {}
+        if not tool.is_async:
+            with self._lock:
+                if tool.abandoned >= tool.max_concurrency:
+                    return None
+                if tool._executor is None:
+                    tool._executor = ThreadPoolExecutor(tool.max_concurrency, thread_name_prefix=f"tool-{tool.name}")
+            return tool._executor.submit(tool.func, argument, **kwargs)
+
+        async def call():
+            if tool._slots is None:
+                tool._slots = asyncio.Semaphore(tool.max_concurrency)
+            async with tool._slots:
+                return await tool.func(argument, **kwargs)
+
+        return asyncio.run_coroutine_threadsafe(call(), self._background_loop())
+
+    def _abandon(self, tool: RegisteredTool, future: Future):
+        """
+        Give up on a timed-out call, counting it against the tool's pool until it returns.
+        """
+        if future.cancel() or tool.is_async:
+            # Not started yet, or a task the cancellation reaches.
+            return
+
+        def returned(_):
+            with self._lock:
+                tool.abandoned -= 1
+
+        with self._lock:
+            tool.abandoned += 1
+        future.add_done_callback(returned)
+
+    def dispatch(self, calls: List[Tuple[str, str]], focus: Optional[str] = None) -> List[str]:
+        """
+        Run tool calls in parallel, each within its tool's timeout.
+
+        Args:
+            calls (List[Tuple[str, str]]): The (tool name, argument) calls.
+            focus (Optional[str]): The thought behind the calls, passed to tools
+                that take a focus.
+
+        Returns:
+            List[str]: One observation per call, in call order.
+        """
+        start = time.perf_counter()
+        pending = []
+        for name, argument in calls:
+            tool = self.tools.get((name or "").strip().casefold())
+            pending.append((tool, name, None if tool is None else self._submit(tool, argument, focus)))
+
+        observations = []
+        for tool, name, future in pending:
+            if tool is None:
+                observations.append(f"Unknown tool {name}. Available tools: {', '.join(t.name for t in self.tools.values())}.")
+                continue
+            if future is None:
+                self._count("tool_rejections_total")
+                observations.append(f"{tool.name} is unavailable: {tool.abandoned} calls are still running "
+                                    f"past the {tool.timeout:g} second timeout.")
+                continue
+            try:
+                result = str(future.result(timeout=max(0.0, start + tool.timeout - time.perf_counter())))
+                self._count("tool_calls_total")
+            except FutureTimeoutError:
+                self._abandon(tool, future)
+                self._count("tool_timeouts_total")
+                result = f"{tool.name} timed out after {tool.timeout:g} seconds."
+            except Exception as e:
+                self._count("tool_errors_total")
+                result = f"{tool.name} failed: {type(e).__name__}: {e}"
+            if tool.max_chars is not None:
+                result = result[:tool.max_chars]
+            observations.append(result)
+        if self.metrics is not None:
+            self.metrics.observe("tool_dispatch_seconds", time.perf_counter() - start)
+        return observations
+
+    def run_action(self, action: str, focus: Optional[str] = None) -> str:
+        """
+        Run every call of an action line and merge the observations in order.
+
+        Args:
+            action (str): The action line.
+            focus (Optional[str]): The thought behind the action, passed to tools
+                that take a focus.
+
+        Returns:
+            str: The observation, or one "Name[argument]: observation" line per
+            call when the line holds several calls.
+        """
+        calls = self.parse_actions(action)
+        observations = self.dispatch(calls, focus)
+        if len(calls) == 1:
+            return observations[0]
+        return "\n".join(f"{name}[{argument}]: {observation}"
+                         for (name, argument), observation in zip(calls, observations))
+
+    def _count(self, name: str):
+        """
+        Increment a counter if metrics are recorded.
+        """
+        if self.metrics is not None:
+            self.metrics.increment(name)
+
+    def close(self):
+        """
+        Shut down the thread pools and the background event loop.
+
+        The registry can be used again afterwards; it starts new pools and a new loop.
+        """
+        for tool in self.tools.values():
+            if tool._executor is not None:
+                tool._executor.shutdown(wait=False, cancel_futures=True)
+                tool._executor = None
+            # The semaphore belongs to the loop being stopped.
+            tool._slots = None
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
@@ -2,36 +2,195 @@
 
 # src/tools.py
 
-import wikipedia
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Tuple
+from .llm_cache import ResponseCache
+from .metrics import MetricsCollector
+from .passages import PassageIndex, split_passages
+
+if TYPE_CHECKING:
+    from .traces import TraceRecorder
+
+PREFIX = "prefix"
+RANKED = "ranked"
 
 class WikipediaTool:
     """
     Tool for interacting with Wikipedia to fetch article snippets.
     """
 
-    def __init__(self, return_chars: int = 1000):
+    def __init__(self, return_chars: int = 1000, cache: Optional[ResponseCache] = None,
+                 metrics: Optional[MetricsCollector] = None, extraction: str = PREFIX,
+                 passage_chars: int = 300, max_indexed_articles: int = 64,
+                 recorder: Optional["TraceRecorder"] = None):
         """
         Initialize the Wikipedia tool.
 
         Args:
             return_chars (int): Number of characters to return from the article.
+            cache (Optional[ResponseCache]): Cache for article snippets, or for whole
+                articles in "ranked" mode. Every lookup goes to Wikipedia if None.
+            metrics (Optional[MetricsCollector]): Records lookup latency. Lookups are
+                not measured if None.
+            extraction (str): "prefix" returns the start of the article; "ranked"
+                returns the passages that best match the focus of the lookup.
+            passage_chars (int): Maximum length of a passage in "ranked" mode.
+            max_indexed_articles (int): Number of article passage indexes kept in
+                memory in "ranked" mode.
+            recorder (Optional[TraceRecorder]): Receives every lookup, snippet and
+                latency, for replay with ReplayWikipediaTool. Lookups are not recorded if None.
         """
+        if extraction not in (PREFIX, RANKED):
+            raise ValueError(f"Unknown extraction {extraction!r}; expected {PREFIX!r} or {RANKED!r}.")
         self.return_chars = return_chars
+        self.cache = cache
+        self.metrics = metrics
+        self.extraction = extraction
+        self.passage_chars = passage_chars
+        self.max_indexed_articles = max_indexed_articles
+        self.recorder = recorder
+        # Normalized query or title -> PassageIndex, least recently used first.
+        self._indexes = OrderedDict()
+        self._index_lock = threading.Lock()
+        if metrics is not None and cache is not None:
+            metrics.track_cache("wikipedia_cache", cache)
 
-    def wiki_tool(self, query: str) -> str:
+    def wiki_tool(self, query: str, focus: Optional[str] = None) -> str:
         """
         Fetch a snippet from a Wikipedia article based on the query.
 
         Args:
             query (str): The search query for Wikipedia.
+            focus (Optional[str]): What the snippet should be about, such as the
+                thought that chose the lookup. Passages are ranked against it in
+                "ranked" mode, or against the query if None. Ignored in "prefix" mode.
 
         Returns:
             str: A snippet from the Wikipedia article.
         """
+        start = time.perf_counter()
+        if self.extraction == RANKED:
+            snippet = self._article_index(query).select(focus or query, self.return_chars)
+        elif self.cache is None:
+            snippet = self._fetch_snippet(query)[1]
+        else:
+            entry = self.cache.get_or_compute(self._cache_key("query", query), lambda: self._fetch_entry(query))
+            snippet = json.loads(entry)["snippet"]
+        seconds = time.perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.increment("wikipedia_lookups_total")
+            self.metrics.observe("wikipedia_lookup_seconds", seconds)
+        if self.recorder is not None:
+            self.recorder.record("wikipedia", query, snippet, seconds, focus)
+        return snippet
+
+    def _fetch_snippet(self, query: str) -> Tuple[str, str]:
+        """
+        Fetch an article from Wikipedia, falling back to auto-suggest.
+
+        Args:
+            query (str): The search query for Wikipedia.
+
+        Returns:
+            Tuple[str, str]: The resolved article title and its snippet.
+        """
+        title, content = self._fetch_article(query)
+        return title, content[:self.return_chars]
+
+    def _fetch_article(self, query: str) -> Tuple[str, str]:
+        """
+        Fetch a whole article from Wikipedia, falling back to auto-suggest.
+
+        Args:
+            query (str): The search query for Wikipedia.
+
+        Returns:
+            Tuple[str, str]: The resolved article title and its text.
+        """
+        import wikipedia
+
         try:
-            page = wikipedia.page(query, auto_suggest=False, redirect=True).content
+            page = wikipedia.page(query, auto_suggest=False, redirect=True)
         except wikipedia.exceptions.PageError:
-            page = wikipedia.page(query, auto_suggest=True, redirect=True).content
-        snippet = page[:self.return_chars]
-        return snippet
+            page = wikipedia.page(query, auto_suggest=True, redirect=True)
+        return page.title, page.content
+
+    def _article_index(self, query: str) -> PassageIndex:
+        """
+        Return the passage index of the article a query resolves to.
+
+        Indexes are kept under both the query and the title, so a later query
+        naming the resolved article reuses the index without a lookup.
 
+        Args:
+            query (str): The search query for Wikipedia.
+
+        Returns:
+            PassageIndex: The article's passage index.
+        """
+        query_key = self._cache_key("query", query)
+        with self._index_lock:
+            index = self._indexes.get(query_key)
+            if index is not None:
+                self._indexes.move_to_end(query_key)
+                return index
+
+        if self.cache is None:
+            title, content = self._fetch_article(query)
+        else:
+            entry = json.loads(self.cache.get_or_compute(
+                self._cache_key("article", query), lambda: json.dumps(self._fetch_article(query))))
+            title, content = entry
+        title_key = self._cache_key("title", title)
+        with self._index_lock:
+            index = self._indexes.get(title_key)
+        if index is None:
+            index = PassageIndex(split_passages(content, self.passage_chars))
+            if self.metrics is not None:
+                self.metrics.increment("wikipedia_index_builds_total")
+
+        with self._index_lock:
+            for key in (title_key, query_key):
+                self._indexes[key] = index
+                self._indexes.move_to_end(key)
+            while len(self._indexes) > 2 * self.max_indexed_articles:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _fetch_entry(self, query: str) -> str:
+        """
+        Build the cache entry for a query missing from the query index.
+
+        The query is first tried as a title, so a query naming an article that
+        an earlier query already resolved to is served without a lookup. That
+        probe is not counted, since the query's miss already was.
+
+        Args:
+            query (str): The search query for Wikipedia.
+
+        Returns:
+            str: The cache entry, a JSON object with the title and the snippet.
+        """
+        entry = self.cache.peek(self._cache_key("title", query))
+        if entry is None:
+            title, snippet = self._fetch_snippet(query)
+            entry = json.dumps({"title": title, "snippet": snippet})
+            self.cache.put(self._cache_key("title", title), entry)
+        return entry
+
+    def _cache_key(self, kind: str, text: str) -> str:
+        """
+        Build a cache key from a query or a title.
+
+        Args:
+            kind (str): "query", "title", or "article" for a whole article by query.
+            text (str): The query or the title.
+
+        Returns:
+            str: The cache key.
+        """
+        normalized = " ".join(text.split()).casefold()
+        return f"wikipedia:{self.return_chars}:{kind}:{normalized}"
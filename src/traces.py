@@ -0,0 +1,280 @@
+# Records LLM and Wikipedia traffic to a trace file and replays it offline.
+
+# src/traces.py
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+from .llm_interface import LLMInterface
+from .metrics import MetricsCollector
+from .tools import PREFIX, WikipediaTool
+
+LLM = "llm"
+WIKIPEDIA = "wikipedia"
+
+class TraceMiss(KeyError):
+    """
+    Raised when a replayed request is not in the trace.
+    """
+
+class TraceRecorder:
+    """
+    Appends one JSON line per request to a trace file.
+
+    Each record holds the kind of request ("llm" or "wikipedia"), the request
+    (prompt or query), its context (stop sequences or focus), the response,
+    the latency in seconds and the wall-clock time it finished. Every record
+    is written with a single append, so several threads or processes can share
+    a file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open the trace file for appending, creating it if needed.
+
+        Args:
+            path (str): Path of the trace file.
+        """
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, request: str, response: str, seconds: float, context=None):
+        """
+        Append a request and its response.
+
+        Args:
+            kind (str): "llm" or "wikipedia".
+            request (str): The prompt or query.
+            response (str): The response or snippet.
+            seconds (float): How long the request took.
+            context: What else the response depends on, such as stop sequences or
+                the focus of a lookup; must be JSON-serializable.
+        """
+        line = json.dumps({"kind": kind, "request": request, "context": context, "response": response,
+                           "seconds": round(seconds, 6), "at": round(time.time(), 6)},
+                          ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._fd is None:
+                raise ValueError(f"Trace {self.path} is closed.")
+            os.write(self._fd, line.encode("utf-8"))
+
+    def close(self):
+        """
+        Close the trace file.
+        """
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+def load_trace(path: str) -> List[dict]:
+    """
+    Read the records of a trace file, skipping a partly written last line.
+
+    Args:
+        path (str): Path of the trace file.
+
+    Returns:
+        List[dict]: The records in the order they were written.
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves a truncated line.
+                continue
+    return records
+
+def _trace_key(kind: str, request: str, context) -> Tuple[str, str, str]:
+    """
+    Return the key a request is replayed by.
+    """
+    return kind, request, json.dumps(context, sort_keys=True)
+
+class TraceReplay:
+    """
+    Serves recorded responses in the order they were recorded.
+
+    A request recorded several times, such as a self-consistency prompt, gets
+    its recorded responses in turn and starts over once they are used up. With
+    `simulate_latency`, each response is delayed by its recorded latency
+    divided by `speed`.
+    """
+
+    def __init__(self, path: str, simulate_latency: bool = False, speed: float = 1.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Load a trace.
+
+        Args:
+            path (str): Path of the trace file.
+            simulate_latency (bool): Whether to wait the recorded latency before
+                serving a response.
+            speed (float): Divides the simulated latencies; 2.0 replays twice as fast.
+            sleep (Callable[[float], None]): Blocking sleep used by the sync path.
+        """
+        self.simulate_latency = simulate_latency
+        self.speed = speed
+        self.sleep = sleep
+        self._records: Dict[Tuple[str, str, str], List[dict]] = defaultdict(list)
+        for record in load_trace(path):
+            self._records[_trace_key(record["kind"], record["request"], record.get("context"))].append(record)
+        self._next: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _take(self, kind: str, request: str, context) -> dict:
+        """
+        Return the next recorded response to a request.
+
+        Raises:
+            TraceMiss: If the request was not recorded.
+        """
+        key = _trace_key(kind, request, context)
+        records = self._records.get(key)
+        if not records:
+            raise TraceMiss(f"No {kind} record for {request[:80]!r} with context {context!r}.")
+        with self._lock:
+            position = self._next[key]
+            self._next[key] = position + 1
+        return records[position % len(records)]
+
+    def _delay(self, record: dict) -> float:
+        """
+        Return how long to wait before serving a record.
+        """
+        return record["seconds"] / self.speed if self.simulate_latency else 0.0
+
+    def lookup(self, kind: str, request: str, context=None) -> str:
+        """
+        Serve the next recorded response to a request.
+
+        Args:
+            kind (str): "llm" or "wikipedia".
+            request (str): The prompt or query.
+            context: The stop sequences or focus it was recorded with.
+
+        Returns:
+            str: The recorded response.
+
+        Raises:
+            TraceMiss: If the request was not recorded.
+        """
+        record = self._take(kind, request, context)
+        delay = self._delay(record)
+        if delay:
+            self.sleep(delay)
+        return record["response"]
+
+    async def lookup_async(self, kind: str, request: str, context=None) -> str:
+        """
+        Serve the next recorded response to a request without blocking the event loop.
+
+        Args:
+            kind (str): "llm" or "wikipedia".
+            request (str): The prompt or query.
+            context: The stop sequences or focus it was recorded with.
+
+        Returns:
+            str: The recorded response.
+        """
+        record = self._take(kind, request, context)
+        delay = self._delay(record)
+        if delay:
+            await asyncio.sleep(delay)
+        return record["response"]
+
+    def __len__(self) -> int:
+        """
+        Return the number of distinct requests in the trace.
+        """
+        return len(self._records)
+
+class _Response:
+    """
+    A model response with the `text` attribute of a Vertex AI response.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+
+class _ReplayModel:
+    """
+    Stands in for a Vertex AI text generation model, serving responses from a trace.
+    """
+
+    def __init__(self, replay: TraceReplay):
+        self.replay = replay
+
+    def predict(self, prompt: str, stop_sequences: Optional[List[str]] = None, **parameters) -> _Response:
+        return _Response(self.replay.lookup(LLM, prompt, stop_sequences))
+
+    async def predict_async(self, prompt: str, stop_sequences: Optional[List[str]] = None, **parameters) -> _Response:
+        return _Response(await self.replay.lookup_async(LLM, prompt, stop_sequences))
+
+    def predict_streaming(self, prompt: str, stop_sequences: Optional[List[str]] = None, **parameters):
+        yield _Response(self.replay.lookup(LLM, prompt, stop_sequences))
+
+class ReplayLLM(LLMInterface):
+    """
+    LLMInterface backend that serves responses from a trace instead of Vertex AI.
+
+    Responses are looked up by prompt and stop sequences; the other model
+    parameters are ignored, so a trace can be replayed under another
+    configuration of the strategies.
+    """
+
+    def __init__(self, replay: TraceReplay, model_name: str = "replay", metrics: Optional[MetricsCollector] = None):
+        """
+        Initialize the replay backend. Vertex AI is not loaded.
+
+        Args:
+            replay (TraceReplay): The trace to serve.
+            model_name (str): Name reported for the model.
+            metrics (Optional[MetricsCollector]): Records call latency and sizes.
+        """
+        super().__init__(None, None, model_name, metrics=metrics, model=_ReplayModel(replay))
+
+class ReplayWikipediaTool(WikipediaTool):
+    """
+    WikipediaTool backend that serves snippets from a trace instead of Wikipedia.
+    """
+
+    def __init__(self, replay: TraceReplay, return_chars: int = 1000, metrics: Optional[MetricsCollector] = None,
+                 extraction: str = PREFIX):
+        """
+        Initialize the replay backend.
+
+        Args:
+            replay (TraceReplay): The trace to serve.
+            return_chars (int): Number of characters the recorded snippets were cut to.
+            metrics (Optional[MetricsCollector]): Records lookup latency.
+            extraction (str): The extraction the trace was recorded with; decides
+                whether ReAct passes the focus of each lookup.
+        """
+        super().__init__(return_chars=return_chars, metrics=metrics, extraction=extraction)
+        self.replay = replay
+
+    def wiki_tool(self, query: str, focus: Optional[str] = None) -> str:
+        """
+        Serve the recorded snippet for a lookup.
+
+        Args:
+            query (str): The search query for Wikipedia.
+            focus (Optional[str]): The focus the lookup was recorded with.
+
+        Returns:
+            str: The recorded snippet.
+        """
+        start = time.perf_counter()
+        snippet = self.replay.lookup(WIKIPEDIA, query, focus)
+        if self.metrics is not None:
+            self.metrics.increment("wikipedia_lookups_total")
+            self.metrics.observe("wikipedia_lookup_seconds", time.perf_counter() - start)
+        return snippet
@@ -0,0 +1,170 @@
+# Builds ReAct prompts incrementally.
+
+# src/transcript.py
+
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+# The same line boundaries as str.splitlines.
+_LINE_BREAK = re.compile("\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+# A segment written by format_step.
+_STEP_SEGMENT = re.compile(r" (?P<thought>[^\n]*)\n(?P<action>[^\n]*)\n"
+                           r"Observation \d+: (?P<observation>.*)\nThought \d+:", re.DOTALL)
+
+def split_response_lines(llm_response: str) -> Tuple[str, Optional[str]]:
+    """
+    Return the first two lines of a response in a single pass.
+
+    Matches `llm_response.splitlines()[0]` and `[1]` without splitting the
+    rest of the response.
+
+    Args:
+        llm_response (str): The LLM's response.
+
+    Returns:
+        Tuple[str, Optional[str]]: The first line and the second line, or None
+        if the response has a single line.
+    """
+    parts = _LINE_BREAK.split(llm_response, maxsplit=2)
+    if len(parts) == 1 or (len(parts) == 2 and parts[1] == ""):
+        return parts[0], None
+    return parts[0], parts[1]
+
+class Step(NamedTuple):
+    """
+    One completed ReAct step.
+    """
+    thought: str
+    action: str
+    observation: str
+
+def format_step(number: int, step: Step) -> str:
+    """
+    Render a completed step and the marker of the next thought.
+
+    Args:
+        number (int): The step's number, starting at 1.
+        step (Step): The step.
+
+    Returns:
+        str: The step's segment of the prompt.
+    """
+    return f" {step.thought}\n{step.action}\nObservation {number}: {step.observation}\nThought {number + 1}:"
+
+class ReActTranscript:
+    """
+    Append-only ReAct prompt made of segments with a cached rendering.
+
+    The header (context, exemplar and question) is the first segment and each
+    step appends one segment. `boundaries` gives the character offset where each
+    segment ends; a prefix up to any boundary never changes, so a backend with
+    prefix caching can reuse it across steps.
+    """
+
+    def __init__(self, context: str, exemplar: str, question: str):
+        """
+        Start a transcript with the header and the first thought marker.
+
+        Args:
+            context (str): Instructions for the LLM.
+            exemplar (str): An exemplar demonstrating ReAct steps.
+            question (str): The question to be answered.
+        """
+        self.segments: List[str] = []
+        self.boundaries: List[int] = []
+        self.steps: List[Step] = []
+        self.step = 1
+        self._rendered = ""
+        self._pending: List[str] = []
+        self._append(f"{context}\n\n{exemplar}\n\nQuestion: {question}\nThought 1:")
+
+    def _append(self, segment: str):
+        """
+        Add a segment and record where it ends.
+
+        Args:
+            segment (str): The text to append.
+        """
+        self.segments.append(segment)
+        self._pending.append(segment)
+        self.boundaries.append((self.boundaries[-1] if self.boundaries else 0) + len(segment))
+
+    def add_step(self, thought: str, action: str, observation: str):
+        """
+        Record a completed step and open the next thought.
+
+        Args:
+            thought (str): The thought line of the LLM's response.
+            action (str): The action line of the LLM's response.
+            observation (str): The result of the action.
+        """
+        step = Step(thought, action, observation)
+        self.steps.append(step)
+        self._append(format_step(self.step, step))
+        self.step += 1
+
+    def render_steps(self, steps: List[Step]) -> str:
+        """
+        Render the header followed by a replacement for the completed steps.
+
+        Args:
+            steps (List[Step]): The steps to render, such as a compacted copy of `steps`.
+
+        Returns:
+            str: The prompt with those steps.
+        """
+        return "".join([self.segments[0], *(format_step(number, step) for number, step in enumerate(steps, 1))])
+
+    def to_dict(self) -> dict:
+        """
+        Return the transcript as JSON-serializable data.
+
+        Returns:
+            dict: The segments, the completed steps and the current step.
+        """
+        return {"segments": list(self.segments), "steps": [list(step) for step in self.steps], "step": self.step}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ReActTranscript":
+        """
+        Rebuild a transcript saved with `to_dict`.
+
+        Args:
+            data (dict): The saved segments, steps and step. Steps are parsed
+                from the segments if missing, as in older checkpoints.
+
+        Returns:
+            ReActTranscript: The restored transcript.
+        """
+        transcript = cls.__new__(cls)
+        transcript.segments = []
+        transcript.boundaries = []
+        transcript._rendered = ""
+        transcript._pending = []
+        for segment in data["segments"]:
+            transcript._append(segment)
+        if "steps" in data:
+            transcript.steps = [Step(*step) for step in data["steps"]]
+        else:
+            # Saved before steps were recorded; every segment after the header is one step.
+            transcript.steps = [Step(*_STEP_SEGMENT.fullmatch(segment).groups()) for segment in data["segments"][1:]]
+        transcript.step = data["step"]
+        return transcript
+
+    def render(self) -> str:
+        """
+        Return the full prompt, joining only the segments added since the last call.
+
+        Returns:
+            str: The prompt for the next LLM call.
+        """
+        if self._pending:
+            self._rendered = "".join([self._rendered, *self._pending])
+            self._pending.clear()
+        return self._rendered
+
+    def __len__(self) -> int:
+        """
+        Return the length of the rendered prompt.
+        """
+        return self.boundaries[-1]
@@ -0,0 +1,91 @@
+# Aggregates self-consistency votes over many questions with NumPy array operations.
+
+# src/votes.py
+
+from typing import Dict, Iterable, Optional, Sequence
+import numpy as np
+from .answers import AnswerVocabulary, extract_answer
+
+def answer_matrix(responses: Sequence[Sequence[str]], vocabulary: AnswerVocabulary,
+                  samples: Optional[int] = None) -> np.ndarray:
+    """
+    Extract and intern the answers of every sample into a (questions x samples) matrix.
+
+    Args:
+        responses (Sequence[Sequence[str]]): The sampled responses of each question.
+        vocabulary (AnswerVocabulary): Interns the canonical answers.
+        samples (Optional[int]): Number of columns. Defaults to the largest number
+            of responses for a question; shorter rows are padded with -1.
+
+    Returns:
+        np.ndarray: Answer ids, -1 where the answer is missing.
+    """
+    if samples is None:
+        samples = max((len(row) for row in responses), default=0)
+    ids = np.full((len(responses), samples), -1, dtype=np.int64)
+    for i, row in enumerate(responses):
+        ids[i, :len(row)] = [vocabulary.intern(extract_answer(response)) for response in row[:samples]]
+    return ids
+
+def answer_ids(answers: Iterable[Iterable[str]], vocabulary: AnswerVocabulary, samples: int) -> np.ndarray:
+    """
+    Intern already extracted answers into a (questions x samples) matrix.
+
+    Args:
+        answers (Iterable[Iterable[str]]): The extracted answers of each question.
+        vocabulary (AnswerVocabulary): Interns the canonical answers.
+        samples (int): Number of columns; rows are truncated or padded with -1.
+
+    Returns:
+        np.ndarray: Answer ids, -1 where the answer is missing.
+    """
+    rows = [[vocabulary.intern(answer) for answer in row][:samples] for row in answers]
+    ids = np.full((len(rows), samples), -1, dtype=np.int64)
+    for i, row in enumerate(rows):
+        ids[i, :len(row)] = row
+    return ids
+
+def aggregate_votes(ids: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compute the majority answer, its share and the vote entropy of every question.
+
+    Each row is sorted once; equal answers then form runs whose lengths are the
+    vote counts, so no per-question Python loop or counter is needed. Ties go to
+    the answer with the smallest id, that is the one interned first.
+
+    Args:
+        ids (np.ndarray): (questions x samples) answer ids, -1 where missing.
+
+    Returns:
+        Dict[str, np.ndarray]: Per question, "winner" (answer id, -1 if no answer),
+        "votes" (votes for the winner), "valid" (non-missing samples),
+        "agreement" (votes / valid, 0 if none) and "entropy" (of the answer
+        distribution, in nats).
+    """
+    questions, samples = ids.shape
+    winner = np.full(questions, -1, dtype=np.int64)
+    votes = np.zeros(questions, dtype=np.int64)
+    entropy = np.zeros(questions, dtype=np.float64)
+    valid = (ids >= 0).sum(axis=1)
+    if questions and samples:
+        ordered = np.sort(ids, axis=1)
+        starts_mask = np.ones_like(ordered, dtype=bool)
+        starts_mask[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+        flat = ordered.ravel()
+        starts = np.flatnonzero(starts_mask.ravel())
+        lengths = np.diff(np.append(starts, flat.size))
+        rows = starts // samples
+        values = flat[starts]
+        answered = values >= 0
+        rows, values, lengths = rows[answered], values[answered], lengths[answered]
+
+        # Longest run first within each row, smallest id on ties.
+        order = np.lexsort((values, -lengths, rows))
+        first = order[np.flatnonzero(np.diff(rows[order], prepend=-1))]
+        winner[rows[first]] = values[first]
+        votes[rows[first]] = lengths[first]
+
+        shares = lengths / valid[rows]
+        entropy = np.bincount(rows, weights=-shares * np.log(shares), minlength=questions)
+    agreement = np.divide(votes, valid, out=np.zeros(questions, dtype=np.float64), where=valid > 0)
+    return {"winner": winner, "votes": votes, "valid": valid, "agreement": agreement, "entropy": entropy}
@@ -0,0 +1,317 @@
+# Serves Wikipedia articles from a locally built, memory-mapped corpus.
+
+# src/wiki_corpus.py
+
+import argparse
+import difflib
+import json
+import mmap
+import threading
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from .llm_cache import ResponseCache
+from .metrics import MetricsCollector
+from .tools import PREFIX, WikipediaTool
+
+if TYPE_CHECKING:
+    from .traces import TraceRecorder
+
+def normalize_title(title: str) -> str:
+    """
+    Normalize a title or query for index lookups.
+
+    Args:
+        title (str): The title or query.
+
+    Returns:
+        str: The case-folded title with underscores and runs of whitespace collapsed.
+    """
+    return " ".join(title.replace("_", " ").split()).casefold()
+
+def trigrams(key: str) -> set:
+    """
+    Return the character trigrams of a normalized title, padded so short titles have some.
+
+    Args:
+        key (str): The normalized title.
+
+    Returns:
+        set: The distinct trigrams.
+    """
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_corpus(jsonl_path: str, output_prefix: str, return_chars: int = 1000) -> int:
+    """
+    Build a corpus from a JSONL file of articles.
+
+    Each line is either an article, {"title": ..., "text": ..., "redirects": [...]},
+    or a redirect, {"title": ..., "redirect": "Target title"}. The build writes
+    `<output_prefix>.blob` with the UTF-8 article texts back to back and
+    `<output_prefix>.index.json` with the title index, the redirect table and
+    the byte length of each article's first `return_chars` characters.
+
+    Args:
+        jsonl_path (str): Path of the JSONL input.
+        output_prefix (str): Path prefix of the corpus files.
+        return_chars (int): Number of characters to precompute the snippet for.
+
+    Returns:
+        int: The number of articles written.
+    """
+    titles = {}
+    redirects = {}
+    offset = 0
+    with open(jsonl_path, encoding="utf-8") as source, open(f"{output_prefix}.blob", "wb") as blob:
+        for line in source:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "redirect" in record:
+                redirects[normalize_title(record["title"])] = record["redirect"]
+                continue
+            text = record["text"]
+            data = text.encode("utf-8")
+            snippet_length = len(text[:return_chars].encode("utf-8"))
+            titles[normalize_title(record["title"])] = [record["title"], offset, len(data), snippet_length]
+            for alias in record.get("redirects", []):
+                redirects[normalize_title(alias)] = record["title"]
+            blob.write(data)
+            offset += len(data)
+
+    with open(f"{output_prefix}.index.json", "w", encoding="utf-8") as index:
+        json.dump({"return_chars": return_chars, "titles": titles, "redirects": redirects}, index)
+    return len(titles)
+
+class WikipediaCorpus:
+    """
+    Read-only view of a corpus built by `build_corpus`.
+    """
+
+    def __init__(self, prefix: str, max_candidates: int = 50, max_scanned: int = 100000):
+        """
+        Load the index and memory-map the article blob.
+
+        Args:
+            prefix (str): Path prefix of the corpus files.
+            max_candidates (int): Number of titles `suggest` compares in full.
+            max_scanned (int): Trigram postings `suggest` reads before it stops
+                adding more common trigrams to the shortlist.
+        """
+        with open(f"{prefix}.index.json", encoding="utf-8") as index:
+            data = json.load(index)
+        self.return_chars = data["return_chars"]
+        self.titles = data["titles"]
+        self.redirects = data["redirects"]
+        self.max_candidates = max_candidates
+        self.max_scanned = max_scanned
+        # Built on the first fuzzy lookup: titles and redirects, and trigram -> their positions.
+        self._names: Optional[List[str]] = None
+        self._trigram_index: Dict[str, List[int]] = {}
+        self._trigram_lock = threading.Lock()
+        self._blob_file = open(f"{prefix}.blob", "rb")
+        if self.titles:
+            self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # mmap cannot map an empty file
+            self._blob = b""
+
+    def resolve(self, query: str) -> Optional[str]:
+        """
+        Resolve a query to an indexed title, following redirects.
+
+        Args:
+            query (str): The title or query.
+
+        Returns:
+            Optional[str]: The normalized title, or None if there is no exact match.
+        """
+        key = normalize_title(query)
+        if key not in self.titles and key in self.redirects:
+            key = normalize_title(self.redirects[key])
+        return key if key in self.titles else None
+
+    def suggest(self, query: str) -> Optional[str]:
+        """
+        Find the closest indexed title or redirect to a query.
+
+        Args:
+            query (str): The title or query.
+
+        Returns:
+            Optional[str]: The normalized title, or None if nothing is close enough.
+        """
+        key = normalize_title(query)
+        matches = difflib.get_close_matches(key, self._shortlist(key), n=1)
+        return self.resolve(matches[0]) if matches else None
+
+    def _build_trigram_index(self):
+        """
+        Index every title and redirect by its trigrams, once.
+        """
+        with self._trigram_lock:
+            if self._names is not None:
+                return
+            names = list(self.titles) + list(self.redirects)
+            index = defaultdict(list)
+            for position, name in enumerate(names):
+                for trigram in trigrams(name):
+                    index[trigram].append(position)
+            self._trigram_index = dict(index)
+            self._names = names
+
+    def _shortlist(self, key: str) -> List[str]:
+        """
+        Return the titles and redirects sharing the most trigrams with a query.
+
+        Trigrams are read rarest first; once `max_scanned` postings have been read,
+        more common trigrams are skipped, so a lookup never scans the whole corpus.
+
+        Args:
+            key (str): The normalized query.
+
+        Returns:
+            List[str]: Up to `max_candidates` names, best first.
+        """
+        self._build_trigram_index()
+        postings = sorted((self._trigram_index[t] for t in trigrams(key) if t in self._trigram_index), key=len)
+        shared = Counter()
+        scanned = 0
+        for positions in postings:
+            if shared and scanned + len(positions) > self.max_scanned:
+                break
+            shared.update(positions)
+            scanned += len(positions)
+        return [self._names[position] for position, _ in shared.most_common(self.max_candidates)]
+
+    def article(self, key: str) -> memoryview:
+        """
+        Return the UTF-8 bytes of an article as a zero-copy slice of the blob.
+
+        Args:
+            key (str): A normalized title returned by `resolve` or `suggest`.
+
+        Returns:
+            memoryview: The article bytes.
+        """
+        _, offset, length, _ = self.titles[key]
+        return memoryview(self._blob)[offset:offset + length]
+
+    def snippet(self, key: str, return_chars: int) -> Tuple[str, str]:
+        """
+        Return the title and the first `return_chars` characters of an article.
+
+        Only the precomputed snippet bytes are decoded when `return_chars` is not
+        larger than the value the corpus was built with.
+
+        Args:
+            key (str): A normalized title returned by `resolve` or `suggest`.
+            return_chars (int): Number of characters to return.
+
+        Returns:
+            Tuple[str, str]: The article title and the snippet.
+        """
+        title, offset, length, snippet_length = self.titles[key]
+        if return_chars <= self.return_chars:
+            text = str(memoryview(self._blob)[offset:offset + snippet_length], "utf-8")
+        else:
+            text = str(self.article(key), "utf-8")
+        return title, text[:return_chars]
+
+    def close(self):
+        """
+        Unmap the blob and close its file.
+        """
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._blob_file.close()
+
+class PageError(LookupError):
+    """
+    No corpus article matches a query.
+
+    Mirrors `wikipedia.exceptions.PageError`, including its `title` attribute,
+    without importing the online client.
+    """
+
+    def __init__(self, title: str):
+        super().__init__(f"{title!r} does not match any pages.")
+        self.title = title
+
+class CorpusWikipediaTool(WikipediaTool):
+    """
+    WikipediaTool backend that serves articles from a local corpus instead of the network.
+    """
+
+    def __init__(self, corpus: WikipediaCorpus, return_chars: int = 1000, cache: Optional[ResponseCache] = None,
+                 metrics: Optional[MetricsCollector] = None, extraction: str = PREFIX, passage_chars: int = 300,
+                 recorder: Optional["TraceRecorder"] = None):
+        """
+        Initialize the corpus-backed Wikipedia tool.
+
+        Args:
+            corpus (WikipediaCorpus): The corpus to serve articles from.
+            return_chars (int): Number of characters to return from the article.
+            cache (Optional[ResponseCache]): Cache for article snippets.
+            metrics (Optional[MetricsCollector]): Records lookup latency.
+            extraction (str): "prefix" or "ranked", as for WikipediaTool.
+            passage_chars (int): Maximum length of a passage in "ranked" mode.
+            recorder (Optional[TraceRecorder]): Receives every lookup, as for WikipediaTool.
+        """
+        super().__init__(return_chars=return_chars, cache=cache, metrics=metrics, extraction=extraction,
+                         passage_chars=passage_chars, recorder=recorder)
+        self.corpus = corpus
+
+    def _resolve(self, query: str) -> str:
+        """
+        Look up an exact (or redirected) title, falling back to the closest title.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            str: The normalized title.
+
+        Raises:
+            PageError: If no title is close to the query.
+        """
+        key = self.corpus.resolve(query)
+        if key is None:
+            key = self.corpus.suggest(query)
+        if key is None:
+            raise PageError(query)
+        return key
+
+    def _fetch_snippet(self, query: str) -> Tuple[str, str]:
+        """
+        Return the snippet of the article a query resolves to.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            Tuple[str, str]: The resolved article title and its snippet.
+        """
+        return self.corpus.snippet(self._resolve(query), self.return_chars)
+
+    def _fetch_article(self, query: str) -> Tuple[str, str]:
+        """
+        Return the whole article a query resolves to.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            Tuple[str, str]: The resolved article title and its text.
+        """
+        key = self._resolve(query)
+        return self.corpus.titles[key][0], str(self.corpus.article(key), "utf-8")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a local Wikipedia corpus from a JSONL file.")
+    parser.add_argument("jsonl_path", help="JSONL file of articles and redirects.")
+    parser.add_argument("output_prefix", help="Path prefix of the corpus files to write.")
+    parser.add_argument("--return-chars", type=int, default=1000, help="Snippet length to precompute.")
+    args = parser.parse_args()
+    count = build_corpus(args.jsonl_path, args.output_prefix, args.return_chars)
+    print(f"Wrote {count} articles to {args.output_prefix}.blob")
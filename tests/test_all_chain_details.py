@@ -0,0 +1,37 @@
+# ChainMetrics callback handler, ensuring runs that end or fail are timed and forgotten.
+
+# tests/test_all_chain_details.py
+
+import unittest
+from src.all_chain_details import ChainMetrics
+from src.metrics import MetricsCollector
+
+class TestChainMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsCollector()
+        self.handler = ChainMetrics(self.metrics)
+
+    def test_failed_runs_are_timed_and_forgotten(self):
+        self.handler.on_llm_start({}, ["prompt"], run_id="llm")
+        self.handler.on_tool_start({}, "query", run_id="tool")
+        self.handler.on_chain_start({}, {}, run_id="chain")
+
+        self.handler.on_llm_error(ValueError("llm"), run_id="llm")
+        self.handler.on_tool_error(ValueError("tool"), run_id="tool")
+        self.handler.on_chain_error(ValueError("chain"), run_id="chain")
+
+        self.assertEqual(self.handler._starts, {})
+        snapshot = self.metrics.snapshot()
+        for kind in ("llm", "tool", "chain"):
+            self.assertEqual(snapshot["counters"][f"langchain_{kind}_errors_total"], 1)
+            self.assertEqual(snapshot["histograms"][f"langchain_{kind}_seconds"]["count"], 1)
+
+    def test_finished_runs_are_forgotten(self):
+        self.handler.on_chain_start({}, {}, run_id="chain")
+        self.handler.on_chain_end({}, run_id="chain")
+
+        self.assertEqual(self.handler._starts, {})
+        self.assertNotIn("langchain_chain_errors_total", self.metrics.snapshot()["counters"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+# Answer extraction, canonicalization and interning used by self-consistency voting.
+
+# tests/test_answers.py
+
+import unittest
+from src.answers import AnswerVocabulary, canonicalize_answer, extract_answer
+
+class TestAnswers(unittest.TestCase):
+    def test_extract_answer(self):
+        self.assertEqual(extract_answer("5 + 6 = 11. The answer is 11."), "11")
+        self.assertEqual(extract_answer("The answer is Paris. Paris is in France."), "Paris")
+        self.assertEqual(extract_answer("The answer is 1.5 hours."), "1.5 hours")
+        self.assertEqual(extract_answer("The answer is 36"), "36")
+        self.assertEqual(extract_answer("No idea."), "NA")
+
+    def test_extract_answer_matches_split_on_plain_answers(self):
+        for response in ["The answer is 48.", "So. The answer is  Berlin .", "The answer is"]:
+            self.assertEqual(extract_answer(response), response.split("The answer is")[1].split(".")[0].strip())
+
+    def test_canonicalize_numbers(self):
+        for answer in ["1,400", "1400", "1400 units", "$1,400.00", "1400.", "**1400**"]:
+            self.assertEqual(canonicalize_answer(answer), "1400")
+        self.assertEqual(canonicalize_answer("2.50"), "2.5")
+        self.assertEqual(canonicalize_answer("-0"), "0")
+        self.assertEqual(canonicalize_answer("-3 degrees"), "-3")
+        self.assertEqual(canonicalize_answer("3 cans and 2 balls"), "3 cans and 2 balls")
+        self.assertEqual(canonicalize_answer("12 tennis balls"), "12")
+        self.assertEqual(canonicalize_answer("50%"), "50")
+
+    def test_canonicalize_keeps_what_changes_the_number(self):
+        self.assertEqual(canonicalize_answer(".5"), "0.5")
+        self.assertEqual(canonicalize_answer("-.25 hours"), "-0.25")
+        for answer in ["2 million", "2 billion", "3 thousand", "7 dozen", "3 and a half", "2 of them"]:
+            self.assertEqual(canonicalize_answer(answer), answer)
+        self.assertNotEqual(canonicalize_answer("2 million"), canonicalize_answer("2"))
+
+    def test_canonicalize_text(self):
+        self.assertEqual(canonicalize_answer("  The   Eiffel Tower! "), "eiffel tower")
+        self.assertEqual(canonicalize_answer('"Paris"'), "paris")
+
+    def test_vocabulary(self):
+        vocabulary = AnswerVocabulary()
+        self.assertEqual(vocabulary.intern("1,400"), 0)
+        self.assertEqual(vocabulary.intern("Paris"), 1)
+        self.assertEqual(vocabulary.intern("1400 units"), 0)
+        self.assertEqual(vocabulary.intern("NA"), -1)
+        self.assertEqual(vocabulary.intern("..."), -1)
+        self.assertEqual(len(vocabulary), 2)
+        self.assertEqual(vocabulary.lookup(1), "paris")
+        self.assertIsNone(vocabulary.lookup(-1))
+
+if __name__ == '__main__':
+    unittest.main()
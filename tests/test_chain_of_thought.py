@@ -1,11 +1,14 @@
 # ChainOfThought class, ensuring it properly generates responses based on exemplars and questions.
 
 
+import asyncio
 import unittest
 from unittest.mock import MagicMock
 from src.chain_of_thought import ChainOfThought
 from src.llm_interface import LLMInterface
 from src.tools import WikipediaTool
+from src.near_duplicate import NearDuplicateCache
+from src.exemplars import ExemplarBank
 
 class TestChainOfThought(unittest.TestCase):
     def setUp(self):
@@ -67,5 +70,61 @@ class TestChainOfThought(unittest.TestCase):
         self.llm.call_llm.assert_called_with(prompt)
         self.assertEqual(response, expected_response)
 
+    def test_generate_batch_keeps_input_order(self):
+        async def call(prompt, show_activity=False):
+            # Finish the first question last.
+            await asyncio.sleep(0.02 if prompt.startswith("Q: first") else 0)
+            return f"Answer to {prompt}"
+
+        self.llm.call_llm_async.side_effect = call
+
+        responses = self.chain.generate_batch("Q: ", ["first", "second", "third"], max_concurrency=3)
+        self.assertEqual(responses, ["Answer to Q: first\nA:", "Answer to Q: second\nA:", "Answer to Q: third\nA:"])
+
+    def test_generate_batch_isolates_errors(self):
+        error = RuntimeError("quota exceeded")
+        self.llm.call_llm_async.side_effect = ["The answer is 11.", error, "The answer is 36."]
+
+        responses = self.chain.generate_batch("Q: ", ["a", "b", "c"], max_concurrency=1)
+        self.assertEqual(responses, ["The answer is 11.", error, "The answer is 36."])
+        self.llm.call_llm_async.assert_called_with("Q: c\nA:", show_activity=False)
+
+    def test_generate_response_serves_reworded_questions(self):
+        chain = ChainOfThought(llm=self.llm, tool=self.tool, near_cache=NearDuplicateCache(threshold=0.8))
+        self.llm.call_llm.side_effect = ["The answer is 36.", "The answer is 12."]
+        question = "She wrote 3 briefs this week. How long did it take?"
+
+        self.assertEqual(chain.generate_response("Q: ", question), "The answer is 36.")
+        self.assertEqual(chain.generate_response("Q: ", "she wrote 3 briefs this week; how long did it take"),
+                         "The answer is 36.")
+        # Another exemplar is another namespace.
+        self.assertEqual(chain.generate_response("Example: ", question), "The answer is 12.")
+        self.assertEqual(self.llm.call_llm.call_count, 2)
+
+    def test_generate_batch_shares_the_near_cache(self):
+        chain = ChainOfThought(llm=self.llm, tool=self.tool, near_cache=NearDuplicateCache(threshold=0.8))
+        self.llm.call_llm.return_value = "The answer is 36."
+        self.llm.call_llm_async.return_value = "The answer is 12."
+        question = "She wrote 3 briefs this week. How long did it take?"
+        chain.generate_response("Q: ", question)
+
+        responses = chain.generate_batch("Q: ", ["she wrote 3 briefs this week; how long did it take",
+                                                 "He read 4 books. How many pages?"])
+        self.assertEqual(responses, ["The answer is 36.", "The answer is 12."])
+        self.llm.call_llm_async.assert_called_once_with("Q: He read 4 books. How many pages?\nA:",
+                                                        show_activity=False)
+        # Batch answers serve later single questions too.
+        self.assertEqual(chain.generate_response("Q: ", "he read 4 books; how many pages"), "The answer is 12.")
+        self.llm.call_llm.assert_called_once()
+
+    def test_generate_response_with_exemplar_bank(self):
+        bank = ExemplarBank([("How many tennis balls?", "Q: How many tennis balls?\nA: 11."),
+                             ("Who was born first?", "Q: Who was born first?\nA: Reagan.")], k=1, suffix="\n\nQ: ")
+        self.llm.call_llm.return_value = "Ford."
+
+        self.chain.generate_response(bank, "Who was born first, Ford or Carter?")
+        self.llm.call_llm.assert_called_once_with(
+            "Q: Who was born first?\nA: Reagan.\n\nQ: Who was born first, Ford or Carter?\nA:")
+
 if __name__ == '__main__':
     unittest.main()
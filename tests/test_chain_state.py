@@ -0,0 +1,92 @@
+# ReActState and its stores, ensuring chain state survives serialization and restarts.
+
+# tests/test_chain_state.py
+
+import json
+import os
+import tempfile
+import unittest
+from src.chain_state import FileStateStore, MemoryStateStore, ReActState
+from src.transcript import ReActTranscript
+
+def make_state(chain_id="chain"):
+    transcript = ReActTranscript("Context.", "Exemplar.", "What is Python?")
+    transcript.add_step(" I need to look up Python.", "Action 1: Python<STOP>", "Python is a language.")
+    state = ReActState(transcript, max_steps=5, chain_id=chain_id)
+    state.pending_action = {"thought": " Look up Guido.", "action": "Action 2: Guido<STOP>", "query": "Guido"}
+    return state
+
+class TestReActState(unittest.TestCase):
+    def test_json_round_trip(self):
+        state = make_state()
+        restored = ReActState.from_json(state.to_json())
+        self.assertEqual(restored.to_dict(), state.to_dict())
+        self.assertEqual(restored.transcript.render(), state.transcript.render())
+        self.assertEqual(restored.transcript.step, 2)
+
+    def test_default_chain_id_is_unique(self):
+        transcript = ReActTranscript("Context.", "Exemplar.", "Question?")
+        self.assertNotEqual(ReActState(transcript).chain_id, ReActState(transcript).chain_id)
+
+    def test_package_exports(self):
+        import src
+        from src import chain_state
+
+        for name in ("FileStateStore", "MemoryStateStore", "ReActState"):
+            self.assertIs(getattr(src, name), getattr(chain_state, name))
+
+class TestStateStores(unittest.TestCase):
+    def check_store(self, store):
+        self.assertIsNone(store.load("chain"))
+        state = make_state()
+        store.save(state)
+        # Later changes to the state are not visible until it is saved again.
+        state.done = True
+        self.assertFalse(store.load("chain").done)
+        self.assertEqual(store.load("chain").pending_action["query"], "Guido")
+        store.save(state)
+        self.assertTrue(store.load("chain").done)
+        self.assertEqual(store.chain_ids(), ["chain"])
+        store.delete("chain")
+        store.delete("chain")
+        self.assertIsNone(store.load("chain"))
+        self.assertEqual(store.chain_ids(), [])
+
+    def test_memory_store(self):
+        self.check_store(MemoryStateStore())
+
+    def test_file_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = FileStateStore(os.path.join(directory, "states"))
+            self.check_store(store)
+            store.save(make_state())
+            self.assertEqual(os.listdir(store.directory), ["chain.json"])
+            # A second store on the same directory sees the chain.
+            self.assertEqual(FileStateStore(store.directory).load("chain").to_dict(), make_state().to_dict())
+
+    def test_file_store_loads_checkpoint_without_steps(self):
+        # Written before transcripts recorded their steps.
+        old = {
+            "chain_id": "chain",
+            "transcript": {"segments": [
+                "Context.\n\nExemplar.\n\nQuestion: What is Python?\nThought 1:",
+                "  I need to look up Python.\nAction 1: Python<STOP>\nObservation 1: Python is a language.\n"
+                "It was created by Guido.\nThought 2:",
+            ], "step": 2},
+            "max_steps": 5,
+            "pending_action": None,
+            "answer": None,
+            "done": False,
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            store = FileStateStore(directory)
+            with open(os.path.join(directory, "chain.json"), "w", encoding="utf-8") as f:
+                json.dump(old, f)
+            state = store.load("chain")
+        self.assertEqual(state.transcript.steps, [(" I need to look up Python.", "Action 1: Python<STOP>",
+                                                   "Python is a language.\nIt was created by Guido.")])
+        self.assertEqual(state.transcript.render_steps(state.transcript.steps), state.transcript.render())
+        self.assertEqual(state.known_observations, {})
+
+if __name__ == '__main__':
+    unittest.main()
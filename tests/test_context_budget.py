@@ -0,0 +1,84 @@
+# ContextBudget and its compaction policies, ensuring prompts stay bounded and the header stays intact.
+
+# tests/test_context_budget.py
+
+import unittest
+from unittest.mock import MagicMock
+from src.context_budget import (ContextBudget, KeepLastObservations, SummarizeObservations,
+                                TruncateObservations, llm_summarizer)
+from src.transcript import ReActTranscript, Step
+
+def make_transcript(steps=5, observation_chars=1000):
+    transcript = ReActTranscript("Context.", "Exemplar.", "Who was born first?")
+    for step in range(1, steps + 1):
+        transcript.add_step(f"Look up item {step}.", f"Action {step}: Item {step}<STOP>",
+                            f"Item {step} " + "x" * observation_chars)
+    return transcript
+
+class TestPolicies(unittest.TestCase):
+    def setUp(self):
+        self.steps = [Step("Thought.", f"Action {i}: A<STOP>", "o" * 500) for i in range(1, 4)]
+
+    def test_truncate_observations(self):
+        steps = TruncateObservations(max_chars=10, keep_last=1)(self.steps)
+        self.assertEqual([step.observation for step in steps[:2]], ["oooooooooo ..."] * 2)
+        self.assertEqual(steps[2], self.steps[2])
+        self.assertEqual([step.action for step in steps], [step.action for step in self.steps])
+
+    def test_keep_last_observations(self):
+        steps = KeepLastObservations(keep_last=2)(self.steps)
+        self.assertEqual([step.observation for step in steps], ["(omitted)", "o" * 500, "o" * 500])
+        self.assertEqual(KeepLastObservations(keep_last=5)(self.steps), self.steps)
+
+    def test_summarize_observations_memoizes(self):
+        summarize = MagicMock(return_value=" Short. ")
+        policy = SummarizeObservations(summarize, keep_last=1)
+        steps = policy(self.steps)
+        policy(self.steps)
+        self.assertEqual([step.observation for step in steps], ["Short.", "Short.", "o" * 500])
+        # The two earlier observations are equal, so one summary serves both calls.
+        summarize.assert_called_once_with("o" * 500)
+
+    def test_llm_summarizer(self):
+        llm = MagicMock()
+        llm.call_llm.return_value = "A summary."
+        self.assertEqual(llm_summarizer(llm, max_words=10)("Long text."), "A summary.")
+        prompt = llm.call_llm.call_args[0][0]
+        self.assertIn("at most 10 words", prompt)
+        self.assertIn("Text: Long text.", prompt)
+
+class TestContextBudget(unittest.TestCase):
+    def test_under_budget_returns_full_prompt(self):
+        transcript = make_transcript(steps=2, observation_chars=10)
+        self.assertEqual(ContextBudget(max_tokens=1000).render(transcript), transcript.render())
+
+    def test_over_budget_keeps_header_and_last_observation(self):
+        transcript = make_transcript(steps=6)
+        prompt = ContextBudget(max_tokens=600).render(transcript)
+        self.assertLessEqual(len(prompt) / 4, 600)
+        self.assertTrue(prompt.startswith(transcript.segments[0]))
+        self.assertTrue(prompt.endswith(transcript.segments[-1]))
+        self.assertIn("Action 1: Item 1<STOP>\nObservation 1:", prompt)
+        # The transcript itself keeps every observation.
+        self.assertEqual(len(transcript.render()), transcript.boundaries[-1])
+        self.assertGreater(len(transcript.render()), 6000)
+
+    def test_prompt_size_stays_bounded(self):
+        budget = ContextBudget(max_tokens=700)
+        sizes = [len(budget.render(make_transcript(steps=steps))) for steps in range(3, 8)]
+        self.assertTrue(all(size <= 2800 for size in sizes))
+
+    def test_policies_stop_once_under_budget(self):
+        second = MagicMock(side_effect=lambda steps: steps)
+        budget = ContextBudget(max_tokens=400, policies=[KeepLastObservations(keep_last=1), second])
+        budget.render(make_transcript(steps=3))
+        second.assert_not_called()
+
+    def test_custom_tokenizer(self):
+        transcript = make_transcript(steps=3, observation_chars=10)
+        budget = ContextBudget(max_tokens=20, policies=[KeepLastObservations(keep_last=0)],
+                               tokenizer=lambda text: len(text.split()))
+        self.assertNotIn("xxxxxxxxxx", budget.render(transcript))
+
+if __name__ == '__main__':
+    unittest.main()
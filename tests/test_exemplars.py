@@ -0,0 +1,68 @@
+# ExemplarBank, ensuring relevant exemplars are picked within the budget and prefixes are reused.
+
+# tests/test_exemplars.py
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.exemplars import ExemplarBank, resolve_exemplar
+
+EXEMPLARS = [
+    ("Roger has 5 tennis balls and buys 2 cans of 3. How many tennis balls does he have?",
+     "Q: Roger has 5 tennis balls and buys 2 cans of 3. How many tennis balls does he have?\nA: 5 + 6 = 11. The answer is 11."),
+    ("Who was born first, Ronald Reagan or Gerald Ford?",
+     "Q: Who was born first, Ronald Reagan or Gerald Ford?\nA: Reagan was born in 1911 and Ford in 1913. The answer is Reagan."),
+    ("What is the capital of the country where the Eiffel Tower stands?",
+     "Q: What is the capital of the country where the Eiffel Tower stands?\nA: The tower is in France. The answer is Paris."),
+]
+
+class TestExemplarBank(unittest.TestCase):
+    def test_select_picks_relevant_exemplars_in_bank_order(self):
+        self.assertEqual(ExemplarBank(EXEMPLARS, k=1).select("Was Gerald Ford born before Jimmy Carter?"), [1])
+        bank = ExemplarBank(EXEMPLARS, k=2)
+        self.assertEqual(bank.select("How many tennis balls are in the Eiffel Tower?"), [0, 2])
+
+    def test_budget_skips_exemplars_that_do_not_fit(self):
+        # The tennis exemplar ranks second but costs more than the budget left.
+        bank = ExemplarBank(EXEMPLARS, k=3, max_tokens=20, separator="",
+                            tokenizer=lambda text: 100 if "tennis" in text else 10)
+        self.assertEqual(bank.select("Tennis balls, Reagan and the Eiffel Tower"), [1, 2])
+        self.assertEqual(ExemplarBank(EXEMPLARS, max_tokens=1).select("Tennis balls"), [])
+
+    def test_render_reuses_interned_prefix(self):
+        bank = ExemplarBank(EXEMPLARS, k=1, suffix="\n\nQ: ")
+        first = bank.render("Who was born first, Nixon or Ford?")
+        second = bank.render("Was Ford born before Reagan?")
+        self.assertIs(first, second)
+        self.assertEqual(first, EXEMPLARS[1][1] + "\n\nQ: ")
+
+    def test_render_reuses_selection_for_the_same_words(self):
+        bank = ExemplarBank(EXEMPLARS, k=1)
+        first = bank.render("Was Ford born before Reagan?")
+        with patch.object(bank.index, "scores") as scores:
+            self.assertIs(bank.render("Reagan, was Ford born before?"), first)
+        scores.assert_not_called()
+
+    def test_render_evicts_least_recently_used_prefixes(self):
+        bank = ExemplarBank(EXEMPLARS, k=1, max_prefixes=1)
+        bank.render("tennis balls")
+        bank.render("Eiffel Tower")
+        self.assertEqual(list(bank._prefixes), [(2,)])
+
+    def test_from_jsonl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bank.jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                for question, exemplar in EXEMPLARS:
+                    f.write(json.dumps({"question": question, "exemplar": exemplar}) + "\n")
+            bank = ExemplarBank.from_jsonl(path, k=1)
+        self.assertEqual(len(bank), 3)
+        self.assertEqual(bank.render("Eiffel Tower"), EXEMPLARS[2][1])
+
+    def test_resolve_exemplar_passes_strings_through(self):
+        self.assertEqual(resolve_exemplar("Q: fixed\n", "anything"), "Q: fixed\n")
+
+if __name__ == "__main__":
+    unittest.main()
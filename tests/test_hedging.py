@@ -0,0 +1,197 @@
+# HedgePolicy, ensuring slow calls are duplicated after the latency percentile and within the hedge budget.
+
+# tests/test_hedging.py
+
+import asyncio
+import threading
+import time
+import unittest
+from src.hedging import HedgeAbandoned, HedgePolicy
+from src.metrics import MetricsCollector
+
+def warmed(policy: HedgePolicy, seconds: float = 0.01, count: int = 20) -> HedgePolicy:
+    for _ in range(count):
+        policy.record(seconds)
+    return policy
+
+class TestHedgePolicy(unittest.TestCase):
+    def test_delay_needs_min_samples_and_uses_percentile(self):
+        policy = HedgePolicy(percentile=0.9, min_samples=10, min_delay=0.0)
+        self.assertIsNone(policy.delay())
+        for i in range(1, 11):
+            policy.record(i / 10)
+        self.assertAlmostEqual(policy.delay(), 1.0)
+        self.assertEqual(warmed(HedgePolicy(min_delay=0.5, min_samples=1), 0.01, 1).delay(), 0.5)
+
+    def test_fast_call_is_not_hedged(self):
+        policy = warmed(HedgePolicy(budget=1.0, burst=1.0, min_delay=0.2))
+        calls = []
+        self.assertEqual(policy.call(lambda: calls.append(1) or "fast"), "fast")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(policy.stats(), {"calls": 1, "hedges": 0, "hedge_wins": 0})
+        policy.close()
+
+    def test_slow_call_is_hedged_and_duplicate_wins(self):
+        metrics = MetricsCollector()
+        policy = warmed(HedgePolicy(budget=1.0, burst=1.0, min_delay=0.01, metrics=metrics))
+        release = threading.Event()
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(2)
+                return "slow"
+            return "hedge"
+
+        self.assertEqual(policy.call(call), "hedge")
+        release.set()
+        self.assertEqual(policy.stats(), {"calls": 1, "hedges": 1, "hedge_wins": 1})
+        self.assertEqual(metrics.snapshot()["counters"]["llm_hedge_wins_total"], 1)
+        policy.close()
+
+    def test_unhedgeable_call_runs_on_the_callers_thread(self):
+        threads = []
+
+        def call():
+            threads.append(threading.current_thread())
+            return "answer"
+
+        # Too few latencies, then latencies but no hedge in the allowance.
+        self.assertEqual(HedgePolicy().call(call), "answer")
+        self.assertEqual(warmed(HedgePolicy(budget=0.5)).call(call), "answer")
+        self.assertEqual(threads, [threading.current_thread()] * 2)
+
+    def test_attempts_go_through_admit(self):
+        policy = warmed(HedgePolicy(budget=1.0, burst=1.0, min_delay=0.01))
+        release = threading.Event()
+        admitted = []
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(2)
+                return "slow"
+            return "hedge"
+
+        def admit(attempt):
+            admitted.append(threading.current_thread())
+            return attempt()
+
+        self.assertEqual(policy.call(call, admit), "hedge")
+        release.set()
+        self.assertEqual(len(admitted), 2)
+        self.assertNotIn(threading.current_thread(), admitted)
+        policy.close()
+
+    def test_delay_starts_when_the_first_attempt_starts(self):
+        policy = warmed(HedgePolicy(budget=1.0, burst=1.0, min_delay=0.05))
+
+        def admit(attempt):
+            # A long wait for a slot is not latency of the attempt.
+            time.sleep(0.2)
+            return attempt()
+
+        self.assertEqual(policy.call(lambda: "answer", admit), "answer")
+        self.assertEqual(policy.stats()["hedges"], 0)
+        policy.close()
+
+    def test_duplicate_admitted_after_the_answer_is_dropped(self):
+        policy = warmed(HedgePolicy(budget=1.0, burst=1.0, min_delay=0.01))
+        gate = threading.Event()
+        admitted = []
+        outcomes = []
+        calls = []
+
+        def call():
+            calls.append(1)
+            time.sleep(0.05)
+            return "first"
+
+        def admit(attempt):
+            admitted.append(1)
+            if len(admitted) == 2:
+                # The duplicate waits for a slot until the call has its answer.
+                gate.wait(2)
+            try:
+                return attempt()
+            except HedgeAbandoned:
+                outcomes.append("abandoned")
+                raise
+
+        self.assertEqual(policy.call(call, admit), "first")
+        gate.set()
+        for _ in range(100):
+            if outcomes:
+                break
+            time.sleep(0.01)
+        self.assertEqual((outcomes, len(calls)), (["abandoned"], 1))
+        policy.close()
+
+    def test_budget_caps_hedges(self):
+        # The median stays at the warm-up latency as slow calls are recorded.
+        policy = warmed(HedgePolicy(percentile=0.5, budget=0.5, burst=1.0, min_delay=0.01))
+        calls = []
+
+        def call():
+            calls.append(1)
+            time.sleep(0.03)
+            return "slow"
+
+        for _ in range(4):
+            self.assertEqual(policy.call(call), "slow")
+        # Four calls earn two hedges at half a hedge per call.
+        self.assertEqual(policy.stats()["hedges"], 2)
+        self.assertEqual(len(calls), 6)
+        policy.close()
+
+    def test_failed_attempt_falls_back_to_the_other(self):
+        policy = warmed(HedgePolicy(budget=1.0, burst=1.0, min_delay=0.01))
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.05)
+                raise RuntimeError("server error")
+            time.sleep(0.1)
+            return "hedge"
+
+        self.assertEqual(policy.call(call), "hedge")
+
+        def fail():
+            time.sleep(0.03)
+            raise RuntimeError("down")
+
+        with self.assertRaises(RuntimeError):
+            policy.call(fail)
+        policy.close()
+
+    def test_call_async_cancels_the_loser(self):
+        policy = warmed(HedgePolicy(budget=1.0, burst=1.0, min_delay=0.01))
+        cancelled = []
+        calls = []
+
+        async def call():
+            calls.append(1)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(2)
+                except asyncio.CancelledError:
+                    cancelled.append(1)
+                    raise
+                return "slow"
+            return "hedge"
+
+        async def run():
+            response = await policy.call_async(call)
+            await asyncio.sleep(0)
+            return response
+
+        self.assertEqual(asyncio.run(run()), "hedge")
+        self.assertEqual(cancelled, [1])
+        self.assertEqual(policy.stats()["hedge_wins"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# Import-time regression check: the core modules must import fast and leave heavy backends unloaded.
+
+# tests/test_imports.py
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Budget for importing every core module in a fresh interpreter. Override with IMPORT_BUDGET_MS.
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 500))
+CORE_MODULES = [f"src.{module}" for module in (
+    "chain_of_thought", "llm_interface", "react", "self_consistency", "tools", "langchain_agent",
+    "rate_limit", "metrics", "llm_cache", "transcript", "wiki_corpus", "answers", "runner",
+    "chain_state", "passages", "near_duplicate", "context_budget", "sample_queue",
+    "tool_registry", "exemplars", "hedging", "traces",
+)]
+HEAVY_MODULES = ["vertexai", "langchain", "matplotlib", "wikipedia", "bs4", "requests", "google.api_core", "numpy"]
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+for module in {modules!r}:
+    __import__(module)
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{"elapsed_ms": elapsed_ms, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def import_in_fresh_interpreter(modules: list) -> dict:
+    """
+    Import modules in a new interpreter and report the time taken and the heavy modules loaded.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    script = SCRIPT.format(modules=modules, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+class TestImports(unittest.TestCase):
+    def test_core_modules_do_not_load_heavy_backends(self):
+        result = import_in_fresh_interpreter(CORE_MODULES)
+        self.assertEqual(result["loaded"], [])
+
+    def test_import_time_budget(self):
+        # Best of three, to ride out a cold disk cache.
+        elapsed_ms = min(import_in_fresh_interpreter(CORE_MODULES)["elapsed_ms"] for _ in range(3))
+        self.assertLess(elapsed_ms, IMPORT_BUDGET_MS)
+
+    def test_package_attributes_are_lazy(self):
+        result = import_in_fresh_interpreter(["src"])
+        self.assertEqual(result["loaded"], [])
+
+    def test_package_attributes_resolve_from_plain_import(self):
+        # Only the repository root on the path, as for `import src` from a checkout.
+        script = ("import json, os, sys, src\n"
+                  "from src.exemplars import ExemplarBank\n"
+                  "print(json.dumps({'names': {name: getattr(src, name).__name__ for name in src.__all__},\n"
+                  "                  'same': src.ExemplarBank is ExemplarBank,\n"
+                  "                  'src_on_path': os.path.dirname(src.__file__) in map(os.path.abspath, sys.path)}))")
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        output = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True,
+                                check=True, cwd=ROOT).stdout
+        result = json.loads(output)
+        self.assertEqual({name: name for name in result["names"]}, result["names"])
+        self.assertTrue(result["same"])
+        self.assertFalse(result["src_on_path"])
+
+if __name__ == '__main__':
+    unittest.main()
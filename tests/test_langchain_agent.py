@@ -1,9 +1,13 @@
 # additional scenarios for the LangchainReActAgent class, including handling multiple questions and agent errors.
 # tests/test_langchain_agent.py
 
+import asyncio
+import threading
 import unittest
-from unittest.mock import MagicMock, patch
-from src.langchain_agent import LangchainReActAgent
+from unittest.mock import AsyncMock, MagicMock, patch
+from src import langchain_agent
+from src.langchain_agent import AgentPool, LangchainReActAgent, cached_tool
+from src.llm_cache import ResponseCache
 
 class TestLangchainReActAgentAdditional(unittest.TestCase):
     @patch('langchain.agents.initialize_agent')
@@ -70,5 +74,143 @@ class TestLangchainReActAgentAdditional(unittest.TestCase):
         
         self.assertTrue("Agent error occurred." in str(context.exception))
 
+@patch('vertexai.init')
+@patch('langchain.agents.initialize_agent')
+@patch('langchain.agents.load_tools')
+@patch('langchain.llms.VertexAI')
+class TestLangchainReActAgentPooling(unittest.TestCase):
+    def setUp(self):
+        AgentPool.clear()
+        langchain_agent._INITIALIZED_PROJECTS.clear()
+
+    def tearDown(self):
+        AgentPool.clear()
+
+    def test_pool_builds_once(self, mock_vertexai, mock_load_tools, mock_initialize_agent, mock_init):
+        mock_load_tools.return_value = []
+        first = AgentPool.get("text-bison@001", "project", "us-central1")
+        second = AgentPool.get("text-bison@001", "project", "us-central1")
+        other = AgentPool.get("text-bison@002", "project", "us-central1")
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(mock_initialize_agent.call_count, 2)
+        mock_init.assert_called_once_with(project="project", location="us-central1")
+
+    def test_pool_rejects_conflicting_settings(self, mock_vertexai, mock_load_tools, mock_initialize_agent, mock_init):
+        mock_load_tools.return_value = []
+        cache = ResponseCache()
+        agent = AgentPool.get("text-bison@001", "project", "us-central1", cache=cache, max_concurrency=4)
+        self.assertIs(AgentPool.get("text-bison@001", "project", "us-central1"), agent)
+        self.assertIs(AgentPool.get("text-bison@001", "project", "us-central1", cache=cache, max_concurrency=4), agent)
+        with self.assertRaises(ValueError):
+            AgentPool.get("text-bison@001", "project", "us-central1", cache=ResponseCache())
+        with self.assertRaises(ValueError):
+            AgentPool.get("text-bison@001", "project", "us-central1", max_concurrency=8)
+
+    def test_pool_builds_configurations_concurrently(self, mock_vertexai, mock_load_tools, mock_initialize_agent,
+                                                     mock_init):
+        mock_load_tools.return_value = []
+        building = threading.Barrier(2, timeout=5)
+
+        def slow_build(*args, **kwargs):
+            # Both builds must be in progress at once to pass the barrier.
+            building.wait()
+            return MagicMock()
+
+        mock_initialize_agent.side_effect = slow_build
+        agents = {}
+
+        def get(name):
+            agents[name] = AgentPool.get(name, "project", "us-central1")
+
+        threads = [threading.Thread(target=get, args=(name,)) for name in ("text-bison@001", "text-bison@002")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        self.assertEqual(len(agents), 2)
+
+    def test_failed_build_is_retried(self, mock_vertexai, mock_load_tools, mock_initialize_agent, mock_init):
+        mock_load_tools.return_value = []
+        mock_initialize_agent.side_effect = [RuntimeError("no credentials"), MagicMock()]
+        with self.assertRaises(RuntimeError):
+            AgentPool.get("text-bison@001", "project", "us-central1")
+        self.assertIsNotNone(AgentPool.get("text-bison@001", "project", "us-central1"))
+
+    def test_run_query_verbose_uses_callbacks(self, mock_vertexai, mock_load_tools, mock_initialize_agent, mock_init):
+        mock_load_tools.return_value = []
+        agent = LangchainReActAgent("text-bison@001", "project", "us-central1")
+        agent.agent.run.return_value = "Olaf Scholz"
+        self.assertEqual(agent.run_query("Who is Chancellor of Germany?"), "Olaf Scholz")
+        agent.agent.run.assert_called_with("Who is Chancellor of Germany?")
+        agent.run_query("Who is Chancellor of Germany?", verbose=True)
+        self.assertIn("callbacks", agent.agent.run.call_args.kwargs)
+
+    def test_run_queries_async_caps_concurrency(self, mock_vertexai, mock_load_tools, mock_initialize_agent, mock_init):
+        mock_load_tools.return_value = []
+        agent = LangchainReActAgent("text-bison@001", "project", "us-central1", max_concurrency=2)
+        in_flight = 0
+        peak = 0
+
+        async def arun(query):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if query == "bad":
+                raise ValueError("bad query")
+            return query.upper()
+
+        agent.agent.arun = AsyncMock(side_effect=arun)
+        results = asyncio.run(agent.run_queries_async(["a", "b", "bad", "c", "d"]))
+        self.assertEqual(results[:2] + results[3:], ["A", "B", "C", "D"])
+        self.assertIsInstance(results[2], ValueError)
+        self.assertEqual(peak, 2)
+        # Every slot was released, so another event loop can use the cap.
+        self.assertEqual(asyncio.run(agent.run_query_async("e")), "E")
+
+    def test_sync_and_async_queries_share_the_cap(self, mock_vertexai, mock_load_tools, mock_initialize_agent, mock_init):
+        mock_load_tools.return_value = []
+        agent = LangchainReActAgent("text-bison@001", "project", "us-central1", max_concurrency=1)
+        started, release = threading.Event(), threading.Event()
+
+        def run(query):
+            started.set()
+            release.wait(5)
+            return query.upper()
+
+        agent.agent.run.side_effect = run
+        agent.agent.arun = AsyncMock(return_value="B")
+        sync_query = threading.Thread(target=agent.run_query, args=("a",))
+        sync_query.start()
+        started.wait(5)
+
+        async def blocked():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(agent.run_query_async("b"), 0.05)
+
+        asyncio.run(blocked())
+        agent.agent.arun.assert_not_called()
+        release.set()
+        sync_query.join(5)
+        self.assertEqual(asyncio.run(agent.run_query_async("b")), "B")
+
+    def test_tools_share_cache(self, mock_vertexai, mock_load_tools, mock_initialize_agent, mock_init):
+        wikipedia = MagicMock()
+        wikipedia.name = "wikipedia"
+        wikipedia.description = "Look up Wikipedia."
+        wikipedia.run.return_value = "Page: Python"
+        mock_load_tools.return_value = [wikipedia]
+        cache = ResponseCache()
+        first = LangchainReActAgent("text-bison@001", "project", "us-central1", cache=cache)
+        second = LangchainReActAgent("text-bison@001", "project", "us-central1", cache=cache)
+
+        self.assertEqual(first.tools[0].run("Python"), "Page: Python")
+        self.assertEqual(second.tools[0].run(" python "), "Page: Python")
+        self.assertEqual(asyncio.run(second.tools[0].arun("Python")), "Page: Python")
+        wikipedia.run.assert_called_once_with("Python")
+        self.assertEqual(first.tools[0].name, "wikipedia")
+
 if __name__ == '__main__':
     unittest.main()
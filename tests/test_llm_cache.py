@@ -0,0 +1,133 @@
+# ResponseCache class, ensuring LRU/TTL eviction, disk persistence and single-flight deduplication.
+
+# tests/test_llm_cache.py
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from src.llm_cache import ResponseCache
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "responses.sqlite")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_is_cacheable(self):
+        self.assertTrue(ResponseCache.is_cacheable({"temperature": 0}))
+        self.assertFalse(ResponseCache.is_cacheable({"temperature": 0.7}))
+        self.assertTrue(ResponseCache.is_cacheable({"temperature": 0.7}, sample_index=3))
+
+    def test_make_key_depends_on_all_inputs(self):
+        key = ResponseCache.make_key("model", "prompt", {"temperature": 0})
+        self.assertEqual(key, ResponseCache.make_key("model", "prompt", {"temperature": 0}))
+        self.assertNotEqual(key, ResponseCache.make_key("other", "prompt", {"temperature": 0}))
+        self.assertNotEqual(key, ResponseCache.make_key("model", "prompt", {"temperature": 0.5}))
+        self.assertNotEqual(key, ResponseCache.make_key("model", "prompt", {"temperature": 0}, sample_index=1))
+
+    def test_lru_eviction_and_counters(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        self.assertEqual(cache.get("a"), "A")
+        cache.put("c", "C")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "C")
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(ttl_seconds=10)
+        with patch('time.time', return_value=1000.0):
+            cache.put("a", "A")
+        with patch('time.time', return_value=1005.0):
+            self.assertEqual(cache.get("a"), "A")
+        with patch('time.time', return_value=1011.0):
+            self.assertIsNone(cache.get("a"))
+
+    def test_disk_tier_persists(self):
+        cache = ResponseCache(path=self.path)
+        cache.put("a", "A")
+        cache.close()
+
+        reopened = ResponseCache(path=self.path)
+        self.assertEqual(reopened.get("a"), "A")
+        reopened.close()
+
+    def test_disk_tier_size_eviction(self):
+        cache = ResponseCache(max_entries=1, path=self.path, max_disk_entries=2)
+        for i, key in enumerate(["a", "b", "c"]):
+            with patch('time.time', return_value=1000.0 + i):
+                cache.put(key, key.upper())
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), "B")
+        cache.close()
+
+    def test_get_or_compute_single_flight(self):
+        cache = ResponseCache()
+        started = threading.Event()
+        release = threading.Event()
+        compute = MagicMock()
+
+        def slow_compute():
+            compute()
+            started.set()
+            release.wait()
+            return "A"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("a", slow_compute)))
+                   for _ in range(4)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["A"] * 4)
+        self.assertEqual(compute.call_count, 1)
+
+    def test_get_or_compute_rechecks_after_losing_race(self):
+        cache = ResponseCache()
+        compute = MagicMock(return_value="B")
+        real_get = cache.get
+
+        def stale_get(key):
+            response = real_get(key)
+            # Another leader stores its response between the miss and the flight check.
+            cache.put(key, "A")
+            return response
+
+        with patch.object(cache, "get", side_effect=stale_get):
+            self.assertEqual(cache.get_or_compute("a", compute), "A")
+        compute.assert_not_called()
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_get_or_compute_async_single_flight(self):
+        cache = ResponseCache()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "A"
+
+        async def run():
+            return await asyncio.gather(*[cache.get_or_compute_async("a", compute) for _ in range(5)])
+
+        self.assertEqual(asyncio.run(run()), ["A"] * 5)
+        self.assertEqual(calls, 1)
+        self.assertEqual(cache.get("a"), "A")
+
+if __name__ == '__main__':
+    unittest.main()
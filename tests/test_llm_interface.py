@@ -1,9 +1,17 @@
 # Tests for the LLMInterface class in llm_interface.py.
 # tests/test_llm_interface.py
 
+import asyncio
+import threading
+import time
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from src.llm_interface import LLMInterface
+from src.llm_cache import ResponseCache
+from src.metrics import MetricsCollector
+from src.rate_limit import RateLimiter, RetryPolicy
+from src.hedging import HedgePolicy
+from google.api_core.exceptions import ResourceExhausted
 
 class TestLLMInterface(unittest.TestCase):
     def setUp(self):
@@ -72,6 +80,171 @@ class TestLLMInterface(unittest.TestCase):
         
         self.assertTrue("LLM Error" in str(context.exception))
 
+    @patch('vertexai.language_models.TextGenerationModel.from_pretrained')
+    def test_call_llm_async(self, mock_from_pretrained):
+        mock_model = MagicMock()
+        mock_model.predict_async = AsyncMock(return_value=MagicMock(text="Rome is the capital of Italy."))
+        mock_from_pretrained.return_value = mock_model
+
+        with patch('builtins.print') as mock_print:
+            response = asyncio.run(self.llm_interface.call_llm_async("What is the capital of Italy?"))
+            mock_model.predict_async.assert_awaited_with("What is the capital of Italy?", **self.llm_interface.parameters)
+            mock_print.assert_not_called()
+            self.assertEqual(response, "Rome is the capital of Italy.")
+
+    @patch('vertexai.language_models.TextGenerationModel.from_pretrained')
+    def test_call_llm_uses_cache(self, mock_from_pretrained):
+        mock_model = MagicMock()
+        mock_model.predict.return_value.text = "Madrid is the capital of Spain."
+        mock_from_pretrained.return_value = mock_model
+        self.llm_interface.cache = ResponseCache()
+
+        first = self.llm_interface.call_llm("What is the capital of Spain?", show_activity=False)
+        second = self.llm_interface.call_llm("What is the capital of Spain?", show_activity=False)
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_model.predict.call_count, 1)
+        self.assertEqual(self.llm_interface.cache.stats()["hits"], 1)
+
+    @patch('vertexai.language_models.TextGenerationModel.from_pretrained')
+    def test_call_llm_sampling_bypasses_cache(self, mock_from_pretrained):
+        mock_model = MagicMock()
+        mock_model.predict.return_value.text = "A sample."
+        mock_from_pretrained.return_value = mock_model
+        self.llm_interface.cache = ResponseCache()
+        self.llm_interface.parameters["temperature"] = 0.7
+
+        self.llm_interface.call_llm("Prompt", show_activity=False)
+        self.llm_interface.call_llm("Prompt", show_activity=False)
+        self.assertEqual(mock_model.predict.call_count, 2)
+
+        self.llm_interface.call_llm("Prompt", show_activity=False, sample_index=0)
+        self.llm_interface.call_llm("Prompt", show_activity=False, sample_index=0)
+        self.assertEqual(mock_model.predict.call_count, 3)
+
+    @patch('vertexai.language_models.TextGenerationModel.from_pretrained')
+    def test_call_llm_records_metrics(self, mock_from_pretrained):
+        mock_model = MagicMock()
+        mock_model.predict.return_value.text = "Paris"
+        mock_from_pretrained.return_value = mock_model
+        metrics = MetricsCollector()
+        cache = ResponseCache()
+        llm_interface = LLMInterface(self.project_id, self.location, self.model_name, cache=cache, metrics=metrics)
+
+        llm_interface.call_llm("Prompt", show_activity=False)
+        llm_interface.call_llm("Prompt", show_activity=False)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["counters"]["llm_calls_total"], 2)
+        self.assertEqual(snapshot["histograms"]["llm_prompt_chars"]["sum"], 12)
+        self.assertEqual(snapshot["gauges"]["llm_cache_hit_ratio"], 0.5)
+
+    @patch('vertexai.language_models.TextGenerationModel.from_pretrained')
+    def test_call_llm_retries_throttled_call(self, mock_from_pretrained):
+        mock_model = MagicMock()
+        mock_model.predict.side_effect = [ResourceExhausted("Quota exceeded"), MagicMock(text="Paris")]
+        mock_from_pretrained.return_value = mock_model
+        limiter = RateLimiter(retry=RetryPolicy(base_delay=0.001))
+        llm_interface = LLMInterface(self.project_id, self.location, self.model_name, rate_limiter=limiter)
+
+        response = llm_interface.call_llm("Prompt", show_activity=False)
+        self.assertEqual(response, "Paris")
+        self.assertEqual(mock_model.predict.call_count, 2)
+
+    @patch('vertexai.language_models.TextGenerationModel.from_pretrained')
+    def test_call_llm_hedges_slow_call(self, mock_from_pretrained):
+        release = threading.Event()
+
+        def predict(prompt, **parameters):
+            if mock_model.predict.call_count == 1:
+                release.wait(2)
+                return MagicMock(text="Slow")
+            return MagicMock(text="Paris")
+
+        mock_model = MagicMock()
+        mock_model.predict.side_effect = predict
+        mock_from_pretrained.return_value = mock_model
+        hedging = HedgePolicy(budget=1.0, burst=1.0, min_samples=1, min_delay=0.01)
+        hedging.record(0.01)
+        llm_interface = LLMInterface(self.project_id, self.location, self.model_name, hedging=hedging)
+
+        self.assertEqual(llm_interface.call_llm("Prompt", show_activity=False), "Paris")
+        release.set()
+        self.assertEqual(mock_model.predict.call_count, 2)
+        hedging.close()
+
+    @patch('vertexai.language_models.TextGenerationModel.from_pretrained')
+    def test_hedge_takes_its_own_rate_limit_slot(self, mock_from_pretrained):
+        release = threading.Event()
+
+        def predict(prompt, **parameters):
+            if mock_model.predict.call_count == 1:
+                release.wait(2)
+                return MagicMock(text="Slow")
+            return MagicMock(text="Paris")
+
+        mock_model = MagicMock()
+        mock_model.predict.side_effect = predict
+        mock_from_pretrained.return_value = mock_model
+        hedging = HedgePolicy(budget=1.0, burst=1.0, min_samples=1, min_delay=0.01)
+        hedging.record(0.01)
+        limiter = RateLimiter(requests_per_minute=600)
+        llm_interface = LLMInterface(self.project_id, self.location, self.model_name, rate_limiter=limiter,
+                                     hedging=hedging)
+
+        with patch.object(limiter, "call", wraps=limiter.call) as call:
+            self.assertEqual(llm_interface.call_llm("Prompt", show_activity=False), "Paris")
+        # The first attempt and the duplicate each went through the limiter, and the
+        # losing attempt keeps its slot until it ends.
+        self.assertEqual(call.call_count, 2)
+        self.assertEqual(limiter.concurrency.in_flight, 1)
+        release.set()
+        hedging.close()
+        for _ in range(100):
+            if limiter.concurrency.in_flight == 0:
+                break
+            time.sleep(0.01)
+        self.assertEqual(limiter.concurrency.in_flight, 0)
+
+    @patch('vertexai.language_models.TextGenerationModel.from_pretrained')
+    def test_call_llm_stop_sequences(self, mock_from_pretrained):
+        mock_model = MagicMock()
+        mock_model.predict.return_value.text = "Action 1: Paris"
+        mock_from_pretrained.return_value = mock_model
+
+        self.llm_interface.call_llm("Prompt", show_activity=False, stop_sequences=["<STOP>"])
+        mock_model.predict.assert_called_with("Prompt", stop_sequences=["<STOP>"], **self.llm_interface.parameters)
+        self.assertNotIn("stop_sequences", self.llm_interface.parameters)
+
+    @patch('vertexai.language_models.TextGenerationModel.from_pretrained')
+    def test_stream_llm_stops_at_stop_sequence(self, mock_from_pretrained):
+        chunks = [MagicMock(text=text) for text in ["Thought 1: Look up.\nAction 1: Par", "is<STOP>\nObserv", "ation 1: made up"]]
+        stream = MagicMock()
+        stream.__iter__.return_value = iter(chunks)
+        mock_model = MagicMock()
+        mock_model.predict_streaming.return_value = stream
+        mock_from_pretrained.return_value = mock_model
+
+        response = self.llm_interface.stream_llm("Prompt", show_activity=False, stop_sequences=["<STOP>"])
+        self.assertEqual(response, "Thought 1: Look up.\nAction 1: Paris")
+        stream.close.assert_called_once()
+
+    @patch('vertexai.language_models.TextGenerationModel.from_pretrained')
+    def test_stream_llm_stop_condition(self, mock_from_pretrained):
+        consumed = []
+
+        def generate():
+            for text in ["Answer[Pa", "ris]", " and more", " text"]:
+                consumed.append(text)
+                yield MagicMock(text=text)
+
+        mock_model = MagicMock()
+        mock_model.predict_streaming.return_value = generate()
+        mock_from_pretrained.return_value = mock_model
+
+        response = self.llm_interface.stream_llm("Prompt", show_activity=False, stop_condition=lambda text: "]" in text)
+        self.assertEqual(response, "Answer[Paris]")
+        self.assertEqual(consumed, ["Answer[Pa", "ris]"])
+
 if __name__ == '__main__':
     unittest.main()
 
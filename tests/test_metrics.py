@@ -0,0 +1,103 @@
+# MetricsCollector class, ensuring thread-sharded counters and histograms merge and export correctly.
+
+# tests/test_metrics.py
+
+import io
+import json
+import threading
+import unittest
+from unittest.mock import MagicMock
+from src.metrics import MetricsCollector, estimate_tokens
+
+class TestMetricsCollector(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsCollector(buckets={"size": (10, 100)})
+
+    def test_counters_and_histograms(self):
+        self.metrics.increment("calls_total")
+        self.metrics.increment("calls_total", 2)
+        for value in (5, 10, 50, 500):
+            self.metrics.observe("size", value)
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["counters"], {"calls_total": 3})
+        self.assertEqual(snapshot["histograms"]["size"],
+                         {"bounds": [10, 100], "buckets": [2, 1, 1], "sum": 565.0, "count": 4})
+
+    def test_threads_merge_on_snapshot(self):
+        def record():
+            for _ in range(1000):
+                self.metrics.increment("calls_total")
+                self.metrics.observe("call_seconds", 0.002)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["counters"]["calls_total"], 4000)
+        self.assertEqual(snapshot["histograms"]["call_seconds"]["count"], 4000)
+
+    def test_finished_threads_are_retired(self):
+        for _ in range(20):
+            thread = threading.Thread(target=self.metrics.increment, args=("calls_total",))
+            thread.start()
+            thread.join()
+        self.metrics.increment("calls_total")
+
+        self.assertEqual(len(self.metrics._shards), 1)
+        self.assertEqual(self.metrics.snapshot()["counters"]["calls_total"], 21)
+
+    def test_timer(self):
+        with self.metrics.timer("step_seconds"):
+            pass
+        self.assertEqual(self.metrics.snapshot()["histograms"]["step_seconds"]["count"], 1)
+
+    def test_track_cache(self):
+        cache = MagicMock()
+        cache.stats.return_value = {"hits": 3, "misses": 1, "hit_ratio": 0.75, "memory_entries": 4}
+        self.metrics.track_cache("llm_cache", cache)
+        self.assertEqual(self.metrics.snapshot()["gauges"],
+                         {"llm_cache_hits": 3, "llm_cache_misses": 1, "llm_cache_hit_ratio": 0.75})
+
+    def test_record_call(self):
+        self.metrics.record_call("llm", "a" * 8, "b" * 5, 0.2)
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["counters"],
+                         {"llm_calls_total": 1, "llm_prompt_tokens_total": 2, "llm_response_tokens_total": 2})
+        self.assertEqual(snapshot["histograms"]["llm_call_seconds"]["sum"], 0.2)
+
+    def test_to_prometheus(self):
+        self.metrics.increment("calls_total")
+        self.metrics.observe("size", 50)
+        self.metrics.gauge("ratio", lambda: 0.5)
+        self.assertEqual(self.metrics.to_prometheus(), "\n".join([
+            "# TYPE calls_total counter", "calls_total 1",
+            "# TYPE ratio gauge", "ratio 0.5",
+            "# TYPE size histogram",
+            'size_bucket{le="10"} 0', 'size_bucket{le="100"} 1', 'size_bucket{le="+Inf"} 1',
+            "size_sum 50.0", "size_count 1",
+        ]) + "\n")
+
+    def test_write_jsonl(self):
+        self.metrics.increment("calls_total")
+        self.metrics.observe("size", 50)
+        out = io.StringIO()
+        self.metrics.write_jsonl(out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(r["type"], r["name"]) for r in records], [("counter", "calls_total"), ("histogram", "size")])
+        self.assertEqual(records[1]["buckets"], [0, 1, 0])
+
+    def test_reset(self):
+        self.metrics.increment("calls_total")
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot()["counters"], {})
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("abcde"), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# NearDuplicateCache, ensuring reworded questions hit, unrelated ones miss, and entries survive restarts.
+
+# tests/test_near_duplicate.py
+
+import os
+import tempfile
+import unittest
+from src.near_duplicate import (MinHasher, NearDuplicateCache, namespace_for, normalize_question, numeric_tokens,
+                                shingles)
+
+QUESTION = "Who was born first, Ronald Reagan or Gerald Ford?"
+REWORDED = "who was born first: Ronald Reagan or Gerald Ford"
+SIMILAR = "Who was born first, Ronald Reagan or Jimmy Carter?"
+UNRELATED = "What is the capital city of Australia?"
+
+class TestMinHash(unittest.TestCase):
+    def test_normalize_and_shingles(self):
+        self.assertEqual(normalize_question("  Who WAS  born, first? "), "who was born first")
+        self.assertEqual(shingles("Abc"), ["abc"])
+        self.assertEqual(sorted(shingles("abcde", size=4)), ["abcd", "bcde"])
+        self.assertEqual(numeric_tokens("What is 12 times 1.5, in 2020s prices?"), ("12", "1", "5", "2020s"))
+
+    def test_similarity_tracks_jaccard(self):
+        hasher = MinHasher()
+        base = hasher.signature(QUESTION)
+        self.assertEqual(MinHasher.similarity(base, hasher.signature(QUESTION)), 1.0)
+        self.assertGreater(MinHasher.similarity(base, hasher.signature(REWORDED)), 0.9)
+        self.assertLess(MinHasher.similarity(base, hasher.signature(UNRELATED)), 0.2)
+
+    def test_namespace_for(self):
+        self.assertEqual(namespace_for("cot", "Exemplar."), namespace_for("cot", "Exemplar."))
+        self.assertNotEqual(namespace_for("cot", "Exemplar."), namespace_for("react", "Exemplar."))
+        self.assertNotEqual(namespace_for("react", "a", "bc"), namespace_for("react", "ab", "c"))
+
+class TestNearDuplicateCache(unittest.TestCase):
+    def test_reworded_question_hits_and_is_logged(self):
+        lines = []
+        cache = NearDuplicateCache(threshold=0.8, log=lines.append)
+        cache.put(QUESTION, {"answer": "Ronald Reagan"}, "react")
+        value, score, matched = cache.lookup(REWORDED, "react")
+        self.assertEqual(value, {"answer": "Ronald Reagan"})
+        self.assertGreaterEqual(score, 0.8)
+        self.assertEqual(matched, QUESTION)
+        self.assertIn(f"score={score:.3f}", lines[0])
+        self.assertIn(repr(QUESTION), lines[0])
+
+    def test_misses(self):
+        cache = NearDuplicateCache(threshold=0.8)
+        cache.put(QUESTION, {"answer": "Ronald Reagan"}, "react")
+        self.assertIsNone(cache.lookup(UNRELATED, "react"))
+        self.assertIsNone(cache.lookup(QUESTION, "cot"))
+        self.assertIsNone(cache.lookup(SIMILAR, "react"))
+        self.assertIsNotNone(cache.lookup(SIMILAR, "react", threshold=0.5))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 3, "entries": 1})
+
+    def test_near_misses_with_different_answers(self):
+        cache = NearDuplicateCache()
+        pairs = [
+            ("What is 12 times 13?", "What is 12 times 14?"),
+            ("She wrote 3 briefs on Monday and 2 on Tuesday. How many briefs did she write?",
+             "She wrote 5 briefs on Monday and 2 on Tuesday. How many briefs did she write?"),
+            (QUESTION, "Who was born last, Ronald Reagan or Gerald Ford?"),
+        ]
+        for question, _ in pairs:
+            cache.put(question, {"answer": question})
+        for _, near_miss in pairs:
+            self.assertIsNone(cache.lookup(near_miss))
+        # A changed number misses even at a threshold its wording would pass.
+        self.assertIsNone(cache.lookup("What is 12 times 14?", threshold=0.5))
+        self.assertIsNotNone(cache.lookup("what is 12 times 13"))
+
+    def test_lookup_related_scans_once(self):
+        cache = NearDuplicateCache()
+        cache.put(QUESTION, {"answer": "Ronald Reagan"}, "react")
+        hit, related = cache.lookup_related(REWORDED, "react")
+        self.assertEqual((hit[0], related), ({"answer": "Ronald Reagan"}, None))
+        hit, related = cache.lookup_related(SIMILAR, "react")
+        self.assertIsNone(hit)
+        self.assertEqual(related[2], QUESTION)
+        self.assertEqual(cache.lookup_related(UNRELATED, "react"), (None, None))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 2, "entries": 1})
+
+    def test_lru_eviction(self):
+        cache = NearDuplicateCache(max_entries=2)
+        cache.put("What is the tallest mountain on Earth?", {"answer": "Everest"})
+        cache.put("Which river is the longest in Africa?", {"answer": "Nile"})
+        cache.lookup("What is the tallest mountain on Earth?")
+        cache.put("Who painted the Mona Lisa?", {"answer": "Leonardo"})
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.lookup("Which river is the longest in Africa?"))
+        self.assertIsNotNone(cache.lookup("What is the tallest mountain on Earth?"))
+        # Evicted entries leave no ids or empty buckets behind.
+        indexed = set().union(*(bucket for band in cache._buckets for bucket in band.values()))
+        self.assertEqual(indexed, set(cache._entries))
+        self.assertTrue(all(len(bucket) > 0 for band in cache._buckets for bucket in band.values()))
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "near.sqlite")
+            cache = NearDuplicateCache(path=path, max_entries=2)
+            cache.put("What is the tallest mountain on Earth?", {"answer": "Everest"})
+            cache.put("Which river is the longest in Africa?", {"answer": "Nile"})
+            cache.put(QUESTION, {"answer": "Ronald Reagan"})
+            cache.close()
+
+            reopened = NearDuplicateCache(path=path, max_entries=2)
+            self.assertEqual(len(reopened), 2)
+            self.assertEqual(reopened.lookup(REWORDED)[0], {"answer": "Ronald Reagan"})
+            self.assertIsNone(reopened.lookup("What is the tallest mountain on Earth?"))
+            reopened.put(UNRELATED, {"answer": "Canberra"})
+            self.assertEqual(reopened.lookup(UNRELATED)[0], {"answer": "Canberra"})
+            reopened.close()
+
+    def test_bands_must_divide_signature(self):
+        with self.assertRaises(ValueError):
+            NearDuplicateCache(num_perm=100, bands=32)
+
+if __name__ == '__main__':
+    unittest.main()
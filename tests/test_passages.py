@@ -0,0 +1,59 @@
+# split_passages and PassageIndex, ensuring BM25 ranking picks the relevant passages within the budget.
+
+# tests/test_passages.py
+
+import unittest
+from src.passages import PassageIndex, split_passages, tokenize
+
+ARTICLE = """Gerald Rudolph Ford Jr. was the 38th president of the United States.
+== Early life ==
+Ford was born in Omaha, Nebraska, and grew up in Grand Rapids, Michigan.
+== Football ==
+Ford played center for the Michigan Wolverines football team. He won two national titles."""
+
+class TestSplitPassages(unittest.TestCase):
+    def test_paragraphs_and_headings(self):
+        passages = split_passages(ARTICLE, passage_chars=300)
+        self.assertEqual(len(passages), 3)
+        self.assertTrue(passages[1].startswith("Ford was born in Omaha"))
+        self.assertFalse(any(passage.startswith("==") for passage in passages))
+
+    def test_long_paragraphs_pack_sentences(self):
+        paragraph = " ".join(f"Sentence number {i} is here." for i in range(20))
+        passages = split_passages(paragraph, passage_chars=60)
+        self.assertTrue(all(len(passage) <= 60 for passage in passages))
+        self.assertEqual(" ".join(passages), paragraph)
+
+    def test_long_sentence_is_cut(self):
+        passages = split_passages("x" * 250, passage_chars=100)
+        self.assertEqual([len(passage) for passage in passages], [100, 100, 50])
+
+class TestPassageIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = PassageIndex(split_passages(ARTICLE, passage_chars=300))
+
+    def test_tokenize_drops_stop_words(self):
+        self.assertEqual(tokenize("I need to find where Ford was born"), ["ford", "born"])
+
+    def test_scores_favor_matching_passage(self):
+        scores = self.index.scores("Where was Ford born?")
+        self.assertEqual(max(range(len(scores)), key=scores.__getitem__), 1)
+        self.assertEqual(self.index.scores("quantum chromodynamics"), [0.0, 0.0, 0.0])
+
+    def test_select_respects_budget_and_order(self):
+        selected = self.index.select("I need to search the football team Ford played for.", 120)
+        self.assertTrue(selected.startswith("Ford played center"))
+        self.assertLessEqual(len(selected), 120)
+
+        both = self.index.select("football Omaha", 500)
+        self.assertLess(both.index("Omaha"), both.index("football"))
+
+    def test_select_without_match_returns_article_start(self):
+        selected = self.index.select("quantum", 80)
+        self.assertEqual(selected, "Gerald Rudolph Ford Jr. was the 38th president of the United States.")
+
+    def test_select_cuts_passage_larger_than_budget(self):
+        self.assertEqual(self.index.select("president", 10), "Gerald Rud")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+# RateLimiter and its parts, ensuring token buckets, AIMD concurrency and retries behave under throttling.
+
+# tests/test_rate_limit.py
+
+import asyncio
+import random
+import unittest
+from unittest.mock import MagicMock
+from google.api_core.exceptions import InvalidArgument, ResourceExhausted, ServiceUnavailable
+from src.rate_limit import AdaptiveConcurrency, RateLimiter, RetryPolicy, TokenBucket, is_retryable, is_throttle
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve_waits_for_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(per_minute=60, capacity=2, clock=clock)
+        self.assertEqual(bucket.reserve(1), 0.0)
+        self.assertEqual(bucket.reserve(1), 0.0)
+        self.assertAlmostEqual(bucket.reserve(1), 1.0)
+        self.assertAlmostEqual(bucket.reserve(1), 2.0)
+        clock.now = 10.0
+        self.assertEqual(bucket.reserve(1), 0.0)
+
+    def test_charge_delays_later_reservations(self):
+        clock = FakeClock()
+        bucket = TokenBucket(per_minute=600, clock=clock)
+        bucket.charge(610)
+        self.assertAlmostEqual(bucket.reserve(0), 1.0)
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def test_additive_increase(self):
+        concurrency = AdaptiveConcurrency(initial=2, maximum=3)
+        for _ in range(10):
+            concurrency.release(concurrency.acquire())
+        self.assertEqual(concurrency.limit, 3)
+
+    def test_one_decrease_per_round(self):
+        concurrency = AdaptiveConcurrency(initial=8)
+        epochs = [concurrency.acquire() for _ in range(4)]
+        for epoch in epochs:
+            concurrency.release(epoch, throttled=True, succeeded=False)
+        self.assertEqual(concurrency.limit, 4)
+        concurrency.release(concurrency.acquire(), throttled=True, succeeded=False)
+        self.assertEqual(concurrency.limit, 2)
+
+    def test_acquire_times_out_at_limit(self):
+        concurrency = AdaptiveConcurrency(initial=1)
+        concurrency.acquire()
+        with self.assertRaises(TimeoutError):
+            concurrency.acquire(timeout=0.01)
+
+    def test_acquire_async_waits_for_release(self):
+        concurrency = AdaptiveConcurrency(initial=1, maximum=1)
+
+        async def run():
+            epoch = await concurrency.acquire_async()
+            waiting = asyncio.ensure_future(concurrency.acquire_async(timeout=1))
+            await asyncio.sleep(0.01)
+            self.assertFalse(waiting.done())
+            concurrency.release(epoch)
+            return await waiting
+
+        self.assertEqual(asyncio.run(run()), 0)
+        self.assertEqual(concurrency.in_flight, 1)
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(requests_per_minute=60, retry=RetryPolicy(max_attempts=4, rng=random.Random(0)),
+                                   clock=self.clock, sleep=self.clock.sleep)
+
+    def test_error_classification(self):
+        self.assertTrue(is_throttle(ResourceExhausted("quota")))
+        self.assertFalse(is_throttle(ServiceUnavailable("down")))
+        self.assertTrue(is_retryable(ServiceUnavailable("down")))
+        self.assertFalse(is_retryable(InvalidArgument("bad")))
+
+    def test_retries_throttled_call(self):
+        fn = MagicMock(side_effect=[ResourceExhausted("quota"), ResourceExhausted("quota"), "Paris"])
+        self.assertEqual(self.limiter.call(fn), "Paris")
+        self.assertEqual(fn.call_count, 3)
+        self.assertLess(self.limiter.concurrency.limit, 4)
+        self.assertEqual(self.limiter.concurrency.in_flight, 0)
+
+    def test_non_retryable_error_is_raised(self):
+        fn = MagicMock(side_effect=InvalidArgument("bad"))
+        with self.assertRaises(InvalidArgument):
+            self.limiter.call(fn)
+        fn.assert_called_once()
+
+    def test_gives_up_after_max_attempts(self):
+        fn = MagicMock(side_effect=ResourceExhausted("quota"))
+        with self.assertRaises(ResourceExhausted):
+            self.limiter.call(fn)
+        self.assertEqual(fn.call_count, 4)
+
+    def test_deadline_stops_retries(self):
+        self.limiter.retry = RetryPolicy(max_attempts=100, base_delay=10, deadline=15, rng=random.Random(0))
+        fn = MagicMock(side_effect=ServiceUnavailable("down"))
+        with self.assertRaises((ServiceUnavailable, TimeoutError)):
+            self.limiter.call(fn)
+        self.assertLessEqual(self.clock.now, 15)
+
+    def test_request_quota_spaces_calls(self):
+        limiter = RateLimiter(requests_per_minute=60, clock=self.clock, sleep=self.clock.sleep)
+        limiter.requests = TokenBucket(60, capacity=1, clock=self.clock)
+        for _ in range(3):
+            limiter.call(lambda: "ok")
+        self.assertAlmostEqual(self.clock.now, 2.0)
+
+    def test_quota_wait_past_deadline_is_refused(self):
+        limiter = RateLimiter(requests_per_minute=60, retry=RetryPolicy(deadline=5), clock=self.clock,
+                              sleep=self.clock.sleep)
+        limiter.requests = TokenBucket(60, capacity=1, clock=self.clock)
+        limiter.call(lambda: "ok")
+        limiter.requests.reserve(9)
+        fn = MagicMock(return_value="late")
+        with self.assertRaises(TimeoutError):
+            limiter.call(fn)
+        fn.assert_not_called()
+        self.assertEqual(self.clock.now, 0.0)
+        # The refused reservation is given back: the next request waits 10 seconds, not 11.
+        self.assertAlmostEqual(limiter.requests.reserve(1), 10.0)
+
+    def test_no_attempt_starts_after_the_deadline(self):
+        self.limiter.retry = RetryPolicy(deadline=5)
+        self.limiter.concurrency = MagicMock()
+        self.limiter.concurrency.acquire.side_effect = lambda timeout: self.clock.sleep(6) or 0
+        fn = MagicMock(return_value="late")
+        with self.assertRaises(TimeoutError):
+            self.limiter.call(fn)
+        fn.assert_not_called()
+        self.limiter.concurrency.release.assert_called_once()
+
+    def test_cancelled_call_releases_its_slot(self):
+        limiter = RateLimiter(concurrency=AdaptiveConcurrency(initial=1, maximum=1))
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        async def run():
+            call = asyncio.ensure_future(limiter.call_async(hang))
+            await asyncio.sleep(0.01)
+            self.assertEqual(limiter.concurrency.in_flight, 1)
+            call.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await call
+
+        asyncio.run(run())
+        self.assertEqual(limiter.concurrency.in_flight, 0)
+        self.assertEqual(limiter.concurrency.limit, 1)
+
+    def test_interrupted_call_releases_its_slot(self):
+        limiter = RateLimiter(concurrency=AdaptiveConcurrency(initial=1, maximum=1))
+        with self.assertRaises(KeyboardInterrupt):
+            limiter.call(MagicMock(side_effect=KeyboardInterrupt))
+        self.assertEqual(limiter.concurrency.in_flight, 0)
+
+    def test_call_async_retries(self):
+        limiter = RateLimiter(retry=RetryPolicy(base_delay=0.001, rng=random.Random(0)))
+        outcomes = [ResourceExhausted("quota"), "Paris"]
+
+        async def fn():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.assertEqual(asyncio.run(limiter.call_async(fn)), "Paris")
+
+if __name__ == '__main__':
+    unittest.main()
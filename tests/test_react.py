@@ -5,11 +5,18 @@
 
 # tests/test_react.py
 
+import time
 import unittest
 from unittest.mock import MagicMock, patch
-from src.react import ReAct
+from src.react import ReAct, REACT_STOP_SEQUENCES
 from src.llm_interface import LLMInterface
 from src.tools import WikipediaTool
+from src.metrics import MetricsCollector
+from src.chain_state import MemoryStateStore, ReActState
+from src.transcript import ReActTranscript
+from src.context_budget import ContextBudget, KeepLastObservations
+from src.tool_registry import ToolRegistry
+from src.near_duplicate import NearDuplicateCache
 
 class TestReAct(unittest.TestCase):
     def setUp(self):
@@ -119,5 +126,207 @@ class TestReAct(unittest.TestCase):
         answer = self.react.react_chain(context, exemplar, question, max_steps=5, show_activity=False)
         self.assertEqual(answer, "Python is a programming language.")
 
+    def test_react_chain_passes_stop_sequences(self):
+        self.llm.call_llm.side_effect = [
+            "I need to look up Python.\nAction 1: Python",
+            "Thought 2: Python is a language. Answer[A programming language]"
+        ]
+        self.tool.wiki_tool.return_value = "Python is a programming language."
+
+        answer = self.react.react_chain("Context.", "Exemplar.", "What is Python?", max_steps=3)
+        self.assertEqual(answer, "A programming language")
+        args, kwargs = self.llm.call_llm.call_args_list[1]
+        self.assertEqual(args[0], "Context.\n\nExemplar.\n\nQuestion: What is Python?\nThought 1: I need to look up Python.\n"
+                                  "Action 1: Python<STOP>\nObservation 1: Python is a programming language.\nThought 2:")
+        self.assertEqual(kwargs["stop_sequences"], REACT_STOP_SEQUENCES)
+        self.tool.wiki_tool.assert_called_with("Python")
+
+    def test_react_chain_stream(self):
+        self.llm.stream_llm.side_effect = [
+            "Thought 1: I need to look up Python.\nAction 1: Python",
+            "Thought 2: Python is a language. Answer[A programming language]"
+        ]
+        self.tool.wiki_tool.return_value = "Python is a programming language."
+
+        answer = self.react.react_chain("Context.", "Exemplar.", "What is Python?", max_steps=3, stream=True)
+        self.assertEqual(answer, "A programming language")
+        self.llm.call_llm.assert_not_called()
+        _, kwargs = self.llm.stream_llm.call_args
+        self.assertEqual(kwargs["stop_sequences"], REACT_STOP_SEQUENCES)
+        self.assertIs(kwargs["stop_condition"], ReAct.step_complete)
+
+    def test_react_chain_records_step_metrics(self):
+        metrics = MetricsCollector()
+        react = ReAct(llm=self.llm, tool=self.tool, metrics=metrics)
+        self.llm.call_llm.side_effect = [
+            "I need to look up Python.\nAction 1: Python",
+            "Thought 2: Python is a language. Answer[A programming language]"
+        ]
+        self.tool.wiki_tool.return_value = "Python is a programming language."
+
+        react.react_chain("Context.", "Exemplar.", "What is Python?", max_steps=3)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["counters"], {"react_steps_total": 2})
+        self.assertEqual(snapshot["histograms"]["react_step_llm_seconds"]["count"], 2)
+        self.assertEqual(snapshot["histograms"]["react_step_parse_seconds"]["count"], 2)
+        self.assertEqual(snapshot["histograms"]["react_step_tool_seconds"]["count"], 1)
+
+    def test_checkpoint_time_is_not_parse_time(self):
+        metrics = MetricsCollector()
+        react = ReAct(llm=self.llm, tool=self.tool, metrics=metrics)
+        store = MemoryStateStore()
+        save = store.save
+        store.save = lambda state: time.sleep(0.05) or save(state)
+        self.llm.call_llm.side_effect = [
+            "I need to look up Python.\nAction 1: Python",
+            "Thought 2: Python is a language. Answer[A programming language]"
+        ]
+        self.tool.wiki_tool.return_value = "Python is a programming language."
+
+        react.react_chain("Context.", "Exemplar.", "What is Python?", max_steps=3, store=store)
+        histograms = metrics.snapshot()["histograms"]
+        self.assertLess(histograms["react_step_parse_seconds"]["sum"], 0.05)
+        self.assertLess(histograms["react_step_tool_seconds"]["sum"], 0.05)
+        self.assertEqual(histograms["react_checkpoint_seconds"]["count"], 3)
+        self.assertGreaterEqual(histograms["react_checkpoint_seconds"]["sum"], 0.15)
+
+    def test_react_chain_saves_state_each_step(self):
+        store = MemoryStateStore()
+        self.llm.call_llm.side_effect = [
+            "I need to look up Python.\nAction 1: Python",
+            "Thought 2: Python is a language. Answer[A programming language]"
+        ]
+        self.tool.wiki_tool.return_value = "Python is a programming language."
+        saved = []
+        store.save = MagicMock(side_effect=lambda state: saved.append(state.to_dict()))
+
+        answer = self.react.react_chain("Context.", "Exemplar.", "What is Python?", max_steps=3,
+                                        store=store, chain_id="chain")
+        self.assertEqual(answer, "A programming language")
+        # Action chosen, lookup done, answer found.
+        self.assertEqual(len(saved), 3)
+        self.assertEqual(saved[0]["pending_action"]["query"], "Python")
+        self.assertIsNone(saved[1]["pending_action"])
+        self.assertEqual(saved[1]["transcript"]["step"], 2)
+        self.assertTrue(saved[2]["done"])
+        self.assertEqual(saved[2]["answer"], "A programming language")
+
+    def test_resume_runs_pending_action_without_llm_call(self):
+        store = MemoryStateStore()
+        state = ReActState(ReActTranscript("Context.", "Exemplar.", "What is Python?"), 3, "chain")
+        state.pending_action = {"thought": " I need to look up Python.", "action": "Action 1: Python<STOP>",
+                                "query": "Python"}
+        store.save(state)
+        self.tool.wiki_tool.return_value = "Python is a programming language."
+        self.llm.call_llm.return_value = "Thought 2: Done. Answer[A programming language]"
+
+        answer = self.react.resume(store.load("chain"), store)
+        self.assertEqual(answer, "A programming language")
+        self.tool.wiki_tool.assert_called_once_with("Python")
+        self.llm.call_llm.assert_called_once()
+        prompt = self.llm.call_llm.call_args[0][0]
+        self.assertTrue(prompt.endswith("Observation 1: Python is a programming language.\nThought 2:"))
+        self.assertTrue(store.load("chain").done)
+
+    def test_resume_finished_chain_returns_answer(self):
+        state = ReActState(ReActTranscript("Context.", "Exemplar.", "Question?"))
+        state.answer, state.done = "42", True
+        self.assertEqual(self.react.resume(state), "42")
+        self.llm.call_llm.assert_not_called()
+        self.tool.wiki_tool.assert_not_called()
+
+    def test_react_chain_passes_focus_to_ranked_tool(self):
+        self.tool.extraction = "ranked"
+        self.llm.call_llm.side_effect = [
+            "I need to find where Ford was born.\nAction 1: Gerald Ford",
+            "Thought 2: Done. Answer[Omaha]"
+        ]
+        self.tool.wiki_tool.return_value = "Ford was born in Omaha."
+
+        self.react.react_chain("Context.", "Exemplar.", "Where was Ford born?", max_steps=3)
+        self.tool.wiki_tool.assert_called_once_with("Gerald Ford", focus="I need to find where Ford was born.")
+
+    def test_react_chain_compacts_prompt_over_budget(self):
+        budget = ContextBudget(max_tokens=100, policies=[KeepLastObservations(keep_last=1)])
+        react = ReAct(llm=self.llm, tool=self.tool, budget=budget)
+        self.llm.call_llm.side_effect = [
+            "Look up A.\nAction 1: A",
+            "Look up B.\nAction 2: B",
+            "Thought 3: Done. Answer[C]"
+        ]
+        self.tool.wiki_tool.side_effect = ["a" * 200, "b" * 200]
+
+        self.assertEqual(react.react_chain("Context.", "Exemplar.", "Question?", max_steps=3), "C")
+        last_prompt = self.llm.call_llm.call_args[0][0]
+        self.assertIn("Observation 1: (omitted)", last_prompt)
+        self.assertIn("Observation 2: " + "b" * 200, last_prompt)
+        self.assertTrue(last_prompt.startswith("Context.\n\nExemplar.\n\nQuestion: Question?\nThought 1:"))
+
+    def test_react_chain_dispatches_through_registry(self):
+        registry = ToolRegistry().register("Wikipedia", lambda query: f"{query} article.")
+        react = ReAct(llm=self.llm, tool=self.tool, tools=registry)
+        self.llm.call_llm.side_effect = [
+            "Look up both.\nAction 1: Wikipedia[Ronald Reagan] Wikipedia[Gerald Ford]",
+            "Thought 2: Done. Answer[Ronald Reagan]"
+        ]
+
+        self.assertEqual(react.react_chain("Context.", "Exemplar.", "Who was born first?", max_steps=3),
+                         "Ronald Reagan")
+        prompt = self.llm.call_llm.call_args[0][0]
+        self.assertIn("Observation 1: Wikipedia[Ronald Reagan]: Ronald Reagan article.\n"
+                      "Wikipedia[Gerald Ford]: Gerald Ford article.\nThought 2:", prompt)
+        self.tool.wiki_tool.assert_not_called()
+        registry.close()
+
+    def test_registry_and_tool_paths_send_the_same_lookup(self):
+        self.tool.extraction = "ranked"
+        self.tool.return_chars = 100
+        self.tool.wiki_tool.return_value = "Ford was born in Omaha."
+        for tools in (None, ToolRegistry.for_wikipedia(self.tool)):
+            self.tool.wiki_tool.reset_mock()
+            self.llm.call_llm.side_effect = [
+                "I need to find where Ford was born.\nAction 1: Gerald Ford",
+                "Thought 2: Done. Answer[Omaha]",
+            ]
+            ReAct(llm=self.llm, tool=self.tool, tools=tools).react_chain("Context.", "Exemplar.", "Where was Ford born?")
+            self.tool.wiki_tool.assert_called_once_with("Gerald Ford", focus="I need to find where Ford was born.")
+            if tools is not None:
+                tools.close()
+
+    def test_react_chain_near_duplicate_cache(self):
+        react = ReAct(llm=self.llm, tool=self.tool, near_cache=NearDuplicateCache(threshold=0.8, related_threshold=0.5))
+        self.llm.call_llm.side_effect = [
+            "Look up Reagan.\nAction 1: Ronald Reagan",
+            "Look up Ford.\nAction 2: Gerald Ford",
+            "Thought 3: Done. Answer[Ronald Reagan]",
+            # The related question looks up Reagan again, then Carter.
+            "Look up Reagan.\nAction 1: Ronald Reagan",
+            "Look up Carter.\nAction 2: Jimmy Carter",
+            "Thought 3: Done. Answer[Jimmy Carter]",
+        ]
+        self.tool.wiki_tool.side_effect = ["Reagan was born in 1911.", "Ford was born in 1913.",
+                                           "Carter was born in 1924."]
+
+        question = "Who was born first, Ronald Reagan or Gerald Ford?"
+        self.assertEqual(react.react_chain("Context.", "Exemplar.", question), "Ronald Reagan")
+        # A rewording is answered from the cache without any LLM call or lookup.
+        self.assertEqual(react.react_chain("Context.", "Exemplar.", "who was born first: Ronald Reagan or Gerald Ford"),
+                         "Ronald Reagan")
+        self.assertEqual(self.llm.call_llm.call_count, 3)
+        # A related question reuses the Reagan observation and only looks up Carter.
+        self.assertEqual(react.react_chain("Context.", "Exemplar.", "Who was born first, Ronald Reagan or Jimmy Carter?"),
+                         "Jimmy Carter")
+        self.assertEqual(self.tool.wiki_tool.call_count, 3)
+        self.tool.wiki_tool.assert_called_with("Jimmy Carter")
+        # Each question is looked up once, whether it hits, is related or misses.
+        self.assertEqual(react.near_cache.stats(), {"hits": 1, "misses": 2, "entries": 2})
+
+    def test_step_complete(self):
+        self.assertFalse(ReAct.step_complete("Thought 1: I need to"))
+        self.assertFalse(ReAct.step_complete("Thought 1: Done. Answer[Ronald"))
+        self.assertTrue(ReAct.step_complete("Thought 1: Done. Answer[Ronald Reagan]"))
+        self.assertFalse(ReAct.step_complete("Thought 1: Look up.\nAction 1: Ronald Rea"))
+        self.assertTrue(ReAct.step_complete("Thought 1: Look up.\nAction 1: Ronald Reagan\nObs"))
+
 if __name__ == '__main__':
     unittest.main()
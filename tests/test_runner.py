@@ -0,0 +1,108 @@
+# Dataset runner, ensuring sharding, incremental output, crash recovery and merging.
+
+# tests/test_runner.py
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from src import runner
+
+class TestRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dataset_path = os.path.join(self.tmpdir.name, "questions.jsonl")
+        self.output_path = os.path.join(self.tmpdir.name, "results.jsonl")
+        with open(self.dataset_path, "w") as f:
+            for i in range(6):
+                f.write(json.dumps({"id": f"q{i}", "question": f"Question {i}?"}) + "\n")
+        self.config = {"dataset_path": self.dataset_path, "output_path": self.output_path, "strategy": "cot"}
+        self.asked = []
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def answer(self, question: str) -> dict:
+        self.asked.append(question)
+        if question == "Question 3?":
+            raise RuntimeError("quota exceeded")
+        return {"answer": question.upper()}
+
+    def read(self, path: str) -> list:
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_iter_shard(self):
+        lines = [line for line, _ in runner.iter_shard(self.dataset_path, 1, 3)]
+        self.assertEqual(lines, [1, 4])
+        self.assertEqual([line for line, _ in runner.iter_shard(self.dataset_path, 1, 3, after=1)], [4])
+
+    def test_run_writes_results_and_isolates_errors(self):
+        with patch.object(runner, "build_strategy", return_value=self.answer):
+            done = runner.run(self.config, log=lambda message: None)
+        self.assertEqual(done, 6)
+        results = self.read(self.output_path)
+        self.assertEqual([r["id"] for r in results], [f"q{i}" for i in range(6)])
+        self.assertEqual(results[0]["answer"], "QUESTION 0?")
+        self.assertEqual(results[3]["error"], "RuntimeError: quota exceeded")
+
+    def test_run_in_processes(self):
+        logs = []
+        with patch.object(runner, "build_strategy", return_value=self.answer):
+            done = runner.run(self.config, processes=2, report_every=0.1, log=logs.append)
+        self.assertEqual(done, 6)
+        self.assertEqual([r["line"] for r in self.read(self.output_path)], list(range(6)))
+        self.assertTrue(logs[-1].startswith("Wrote 6 results"))
+
+    def test_single_process_reports_progress_while_running(self):
+        logs = []
+        with patch.object(runner, "build_strategy", return_value=self.answer):
+            runner.run(self.config, report_every=0, log=logs.append)
+        self.assertEqual(logs[0].split(" questions in ")[0], "1")
+        self.assertEqual(len([message for message in logs if message[0].isdigit()]), 6)
+
+    def test_resume_skips_completed_and_drops_partial_record(self):
+        path = runner.shard_path(self.output_path, 0, 1)
+        with open(path, "w") as f:
+            f.write(json.dumps({"line": 0, "id": "q0", "answer": "done"}) + "\n")
+            f.write(json.dumps({"line": 1, "id": "q1", "answer": "done"}) + "\n")
+            f.write('{"line": 2, "id": "q2", "ans')
+
+        with patch.object(runner, "build_strategy", return_value=self.answer):
+            runner.run(self.config, log=lambda message: None)
+        self.assertEqual(self.asked, ["Question 2?", "Question 3?", "Question 4?", "Question 5?"])
+        self.assertEqual([r["line"] for r in self.read(self.output_path)], list(range(6)))
+
+    def test_run_shard_closes_trace_recorder(self):
+        config = dict(self.config, project_id="p", location="l", model_name="m",
+                      record_trace=os.path.join(self.tmpdir.name, "trace.jsonl"))
+        recorder = MagicMock()
+        with patch("src.traces.TraceRecorder", return_value=recorder), patch("src.llm_interface.LLMInterface"), \
+                patch("src.chain_of_thought.ChainOfThought") as chain:
+            chain.return_value.generate_batch.return_value = ["The answer is 4."]
+            self.assertEqual(runner.run_shard(config, 0, 1), 6)
+        recorder.close.assert_called_once_with()
+
+    def test_resume_point_of_missing_or_empty_shard(self):
+        path = os.path.join(self.tmpdir.name, "shard")
+        self.assertEqual(runner.resume_point(path), -1)
+        with open(path, "w") as f:
+            f.write('{"line": 0')
+        self.assertEqual(runner.resume_point(path), -1)
+        self.assertEqual(os.path.getsize(path), 0)
+
+    def test_merge_shards_restores_dataset_order(self):
+        for shard in range(2):
+            with open(runner.shard_path(self.output_path, shard, 2), "w") as f:
+                for line in range(shard, 6, 2):
+                    f.write(json.dumps({"line": line}) + "\n")
+        self.assertEqual(runner.merge_shards(self.output_path, 2), 6)
+        self.assertEqual([r["line"] for r in self.read(self.output_path)], list(range(6)))
+
+    def test_unknown_strategy(self):
+        with patch("src.llm_interface.LLMInterface"), self.assertRaises(ValueError):
+            runner.build_strategy({"strategy": "tree", "project_id": "p", "location": "l", "model_name": "m"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# Sample queues and workers, ensuring tasks reach workers and responses come back over local and TCP queues.
+
+# tests/test_sample_queue.py
+
+import threading
+import unittest
+from multiprocessing import AuthenticationError
+from unittest.mock import MagicMock
+from src.sample_queue import LocalSampleQueue, RemoteSampleQueue, parse_address, run_sample_worker
+
+class TestRunSampleWorker(unittest.TestCase):
+    def test_answers_tasks_until_stopped(self):
+        sample_queue = LocalSampleQueue()
+        llm = MagicMock()
+        llm.call_llm.side_effect = lambda prompt, show_activity=False: f"Answer to {prompt}"
+        for index in range(3):
+            sample_queue.tasks.put(("job", f"Q{index}", index))
+        sample_queue.stop_workers(1)
+
+        self.assertEqual(run_sample_worker(sample_queue, llm), 3)
+        results = [sample_queue.results.get_nowait() for _ in range(3)]
+        self.assertEqual(results, [("job", index, f"Answer to Q{index}", None) for index in range(3)])
+
+    def test_errors_are_sent_back(self):
+        sample_queue = LocalSampleQueue()
+        llm = MagicMock()
+        llm.call_llm.side_effect = ConnectionError("reset")
+        sample_queue.tasks.put(("job", "Q", 0))
+        sample_queue.stop_workers(1)
+
+        run_sample_worker(sample_queue, llm)
+        self.assertEqual(sample_queue.results.get_nowait(), ("job", 0, None, "ConnectionError: reset"))
+
+    def test_threads_each_stop(self):
+        sample_queue = LocalSampleQueue()
+        llm = MagicMock()
+        llm.call_llm.return_value = "The answer is 1."
+        for index in range(10):
+            sample_queue.tasks.put(("job", "Q", index))
+        sample_queue.stop_workers(4)
+        self.assertEqual(run_sample_worker(sample_queue, llm, threads=4), 10)
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("10.0.0.5:5000"), ("10.0.0.5", 5000))
+        self.assertEqual(parse_address(":5000"), ("127.0.0.1", 5000))
+
+class TestRemoteSampleQueue(unittest.TestCase):
+    def test_worker_connects_over_tcp(self):
+        coordinator = RemoteSampleQueue.serve()
+        try:
+            self.assertEqual(len(coordinator.authkey), 32)
+            worker_side = RemoteSampleQueue.connect(coordinator.address, bytes.fromhex(coordinator.authkey_hex))
+            llm = MagicMock()
+            llm.call_llm.return_value = "The answer is 5."
+            worker = threading.Thread(target=run_sample_worker, args=(worker_side, llm))
+            worker.start()
+            coordinator.tasks.put(("job", "Q", 0))
+            self.assertEqual(coordinator.results.get(timeout=10), ("job", 0, "The answer is 5.", None))
+            coordinator.stop_workers(1)
+            worker.join(timeout=10)
+            self.assertFalse(worker.is_alive())
+            worker_side.close()
+        finally:
+            coordinator.close()
+
+    def test_wrong_authkey_is_rejected(self):
+        coordinator = RemoteSampleQueue.serve()
+        try:
+            with self.assertRaises(AuthenticationError):
+                RemoteSampleQueue.connect(coordinator.address, b"self-consistency")
+        finally:
+            coordinator.close()
+
+if __name__ == '__main__':
+    unittest.main()
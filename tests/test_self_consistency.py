@@ -2,12 +2,16 @@
 
 # tests/test_self_consistency.py
 
+import asyncio
+import threading
 import unittest
 from unittest.mock import MagicMock, patch
 from collections import Counter
-from src.self_consistency import SelfConsistency
+from src.self_consistency import SelfConsistency, beta_leader_confidence
 from src.llm_interface import LLMInterface
 from src.tools import WikipediaTool
+from src.metrics import MetricsCollector
+from src.sample_queue import LocalSampleQueue, run_sample_worker
 
 class TestSelfConsistency(unittest.TestCase):
     def setUp(self):
@@ -41,6 +45,18 @@ class TestSelfConsistency(unittest.TestCase):
             })
             self.assertEqual(answer_counts, expected_counter)
 
+    def test_run_multiple_responses_quiet_with_metrics(self):
+        metrics = MetricsCollector()
+        self_consistency = SelfConsistency(llm=self.llm, tool=self.tool, metrics=metrics)
+        self.llm.call_llm.side_effect = ["The answer is 42.", "No idea.", "The answer is 42."]
+
+        with patch('builtins.print') as mock_print:
+            answer_counts = self_consistency.run_multiple_responses("Q", {}, runs=3, show_activity=False)
+        mock_print.assert_not_called()
+        self.assertEqual(answer_counts, Counter({"42": 2, "NA": 1}))
+        self.assertEqual(metrics.snapshot()["counters"],
+                         {"self_consistency_samples_total": 3, "self_consistency_unparsed_total": 1})
+
     def test_plot_answer_distribution(self):
         # Since plotting is a visual output, we'll ensure no exceptions are raised
         answer_counts = Counter({
@@ -103,6 +119,169 @@ class TestSelfConsistency(unittest.TestCase):
             })
             self.assertEqual(answer_counts, expected_counter)
 
+    def test_run_multiple_responses_concurrent_matches_sequential(self):
+        prompt = "What is 6 * 7?"
+        parameters = {"temperature": 0.7, "max_output_tokens": 100, "top_p": 1, "top_k": 40}
+        responses = [
+            "6 * 7 = 42. The answer is 42.",
+            "The answer is 42.",
+            "The answer is 36.",
+            "I am not sure.",
+            "The answer is 42."
+        ]
+        self.llm.call_llm.side_effect = list(responses)
+        self.llm.call_llm_async.side_effect = list(responses)
+
+        with patch('builtins.print'):
+            sequential = self.self_consistency.run_multiple_responses(prompt, parameters, runs=5)
+            concurrent = self.self_consistency.run_multiple_responses(prompt, parameters, runs=5, max_concurrency=3)
+
+        self.assertEqual(concurrent, sequential)
+        self.assertEqual(concurrent, Counter({"42": 3, "36": 1, "NA": 1}))
+        self.assertEqual(self.llm.call_llm_async.call_count, 5)
+        self.llm.call_llm_async.assert_called_with(prompt, show_activity=False)
+
+    def test_run_multiple_responses_async_bounds_in_flight(self):
+        in_flight = 0
+        peak = 0
+
+        async def slow_call(prompt, show_activity=False):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return "The answer is 7."
+
+        self.llm.call_llm_async.side_effect = slow_call
+
+        with patch('builtins.print'):
+            answer_counts = asyncio.run(
+                self.self_consistency.run_multiple_responses_async("Q", {}, runs=12, max_concurrency=4)
+            )
+
+        self.assertEqual(answer_counts, Counter({"7": 12}))
+        self.assertEqual(peak, 4)
+
+    def test_run_distributed_responses(self):
+        sample_queue = LocalSampleQueue()
+        worker_llm = MagicMock()
+        worker_llm.call_llm.side_effect = lambda prompt, show_activity=False: "The answer is 42."
+        worker = threading.Thread(target=run_sample_worker, args=(sample_queue, worker_llm, 3))
+        worker.start()
+        # A result left over from an earlier run is ignored.
+        sample_queue.results.put(("stale", 0, "The answer is 1.", None))
+
+        answer_counts = self.self_consistency.run_distributed_responses("Q", {}, sample_queue, runs=8,
+                                                                        timeout=10, show_activity=False)
+        sample_queue.stop_workers(3)
+        worker.join(timeout=10)
+        self.assertEqual(answer_counts, Counter({"42": 8}))
+        self.assertEqual(worker_llm.call_llm.call_count, 8)
+        self.llm.call_llm.assert_not_called()
+
+    def test_run_distributed_responses_retries_failures(self):
+        sample_queue = LocalSampleQueue()
+        worker_llm = MagicMock()
+        worker_llm.call_llm.side_effect = [ConnectionError("reset"), "The answer is 7.", "The answer is 7."]
+        worker = threading.Thread(target=run_sample_worker, args=(sample_queue, worker_llm))
+        worker.start()
+
+        answer_counts = self.self_consistency.run_distributed_responses("Q", {}, sample_queue, runs=2,
+                                                                        timeout=10, show_activity=False)
+        sample_queue.stop_workers(1)
+        worker.join(timeout=10)
+        self.assertEqual(answer_counts, Counter({"7": 2}))
+
+    def test_run_distributed_responses_gives_up(self):
+        sample_queue = LocalSampleQueue()
+        worker_llm = MagicMock()
+        worker_llm.call_llm.side_effect = ConnectionError("reset")
+        worker = threading.Thread(target=run_sample_worker, args=(sample_queue, worker_llm))
+        worker.start()
+
+        with self.assertRaises(RuntimeError):
+            self.self_consistency.run_distributed_responses("Q", {}, sample_queue, runs=1, max_retries=2,
+                                                            timeout=10, show_activity=False)
+        sample_queue.stop_workers(1)
+        worker.join(timeout=10)
+        self.assertEqual(worker_llm.call_llm.call_count, 3)
+
+    def test_run_distributed_responses_timeout(self):
+        with self.assertRaises(TimeoutError):
+            self.self_consistency.run_distributed_responses("Q", {}, LocalSampleQueue(), runs=1, timeout=0.01,
+                                                            show_activity=False)
+
+    def _scripted_async_llm(self, answers_by_prompt):
+        draws = {prompt: 0 for prompt in answers_by_prompt}
+
+        async def call(prompt, show_activity=False):
+            answers = answers_by_prompt[prompt]
+            answer = answers[draws[prompt] % len(answers)]
+            draws[prompt] += 1
+            await asyncio.sleep(0)
+            return f"The answer is {answer}."
+
+        self.llm.call_llm_async.side_effect = call
+        return draws
+
+    def test_run_budgeted_responses_favors_uncertain_prompts(self):
+        draws = self._scripted_async_llm({"unanimous": ["4"], "split": ["A", "B"], "leaning": ["X", "X", "Y"]})
+        results = self.self_consistency.run_budgeted_responses(["unanimous", "split", "leaning"], {},
+                                                               total_budget=40, initial_runs=3, max_runs=20,
+                                                               confidence=0.95, max_concurrency=4)
+        self.assertEqual(sum(draws.values()), 40)
+        self.assertEqual([runs for _, runs, _ in results], [draws["unanimous"], draws["split"], draws["leaning"]])
+        # The unanimous prompt settles quickly; the split one gets the most samples.
+        self.assertGreaterEqual(results[0][2], 0.95)
+        self.assertLess(draws["unanimous"], draws["leaning"])
+        self.assertLessEqual(draws["leaning"], draws["split"])
+        self.assertEqual(results[0][0], Counter({"4": draws["unanimous"]}))
+
+    def test_run_budgeted_responses_stops_when_confident(self):
+        draws = self._scripted_async_llm({"a": ["1"], "b": ["2"]})
+        results = self.self_consistency.run_budgeted_responses(["a", "b"], {}, total_budget=100, initial_runs=2,
+                                                               confidence=0.95)
+        self.assertLess(sum(draws.values()), 100)
+        self.assertTrue(all(confidence >= 0.95 for _, _, confidence in results))
+
+    def test_run_budgeted_responses_small_budget_covers_every_prompt(self):
+        draws = self._scripted_async_llm({prompt: ["A", "B"] for prompt in "abcde"})
+        results = self.self_consistency.run_budgeted_responses(list("abcde"), {}, total_budget=7, initial_runs=3,
+                                                               max_runs=3)
+        self.assertEqual(sorted(draws.values()), [1, 1, 1, 2, 2])
+        self.assertEqual(sum(runs for _, runs, _ in results), 7)
+
+    def test_beta_leader_confidence(self):
+        self.assertEqual(beta_leader_confidence(Counter()), 0.0)
+        self.assertAlmostEqual(beta_leader_confidence(Counter({"A": 1, "B": 1})), 0.5)
+        self.assertAlmostEqual(beta_leader_confidence(Counter({"A": 4})), 31 / 32)
+        self.assertGreater(beta_leader_confidence(Counter({"A": 15, "B": 5})),
+                           beta_leader_confidence(Counter({"A": 6, "B": 4})))
+
+    def test_run_adaptive_responses_stops_early(self):
+        self.llm.call_llm.return_value = "The answer is 42."
+
+        with patch('builtins.print'):
+            answer_counts, runs, confidence = self.self_consistency.run_adaptive_responses(
+                "Q", {}, min_runs=3, max_runs=40, confidence=0.95)
+
+        self.assertEqual(runs, 4)
+        self.assertEqual(answer_counts, Counter({"42": 4}))
+        self.assertGreaterEqual(confidence, 0.95)
+        self.assertEqual(self.llm.call_llm.call_count, 4)
+
+    def test_run_adaptive_responses_respects_max_runs(self):
+        self.llm.call_llm.side_effect = ["The answer is 1.", "The answer is 2."] * 5
+
+        with patch('builtins.print'):
+            answer_counts, runs, confidence = self.self_consistency.run_adaptive_responses(
+                "Q", {}, min_runs=2, max_runs=10)
+
+        self.assertEqual(runs, 10)
+        self.assertEqual(answer_counts, Counter({"1": 5, "2": 5}))
+        self.assertAlmostEqual(confidence, 0.5)
+
 if __name__ == '__main__':
     unittest.main()
 
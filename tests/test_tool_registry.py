@@ -0,0 +1,118 @@
+# ToolRegistry, ensuring actions are parsed, run in parallel, bounded in time and size, and merged in order.
+
+# tests/test_tool_registry.py
+
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from src.metrics import MetricsCollector
+from src.tool_registry import ToolRegistry
+
+class TestToolRegistry(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsCollector()
+        self.registry = ToolRegistry(metrics=self.metrics)
+        self.registry.register("Wikipedia", lambda query: f"Article about {query}.")
+        self.registry.register("Calculator", lambda expression: str(eval(expression, {}, {})))
+
+    def tearDown(self):
+        self.registry.close()
+
+    def test_parse_actions(self):
+        self.assertEqual(self.registry.parse_actions("Action 1: Ronald Reagan<STOP>"),
+                         [("Wikipedia", "Ronald Reagan")])
+        self.assertEqual(self.registry.parse_actions("Action 2: Wikipedia[Ronald Reagan] calculator[2 + 2]<STOP>"),
+                         [("Wikipedia", "Ronald Reagan"), ("calculator", "2 + 2")])
+        # Brackets that do not name a registered tool are part of a bare argument.
+        self.assertEqual(self.registry.parse_actions("Action 3: Python [language]"),
+                         [("Wikipedia", "Python [language]")])
+
+    def test_run_action_single_and_merged(self):
+        self.assertEqual(self.registry.run_action("Action 1: Ronald Reagan<STOP>"), "Article about Ronald Reagan.")
+        self.assertEqual(self.registry.run_action("Action 2: Calculator[6 * 7] Wikipedia[Gerald Ford]<STOP>"),
+                         "Calculator[6 * 7]: 42\nWikipedia[Gerald Ford]: Article about Gerald Ford.")
+
+    def test_calls_run_in_parallel(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def lookup(query):
+            barrier.wait()
+            return query
+
+        self.registry.register("Slow", lookup, max_concurrency=3)
+        start = time.perf_counter()
+        self.assertEqual(self.registry.dispatch([("Slow", "a"), ("Slow", "b"), ("Slow", "c")]), ["a", "b", "c"])
+        self.assertLess(time.perf_counter() - start, 5)
+
+    def test_timeout_does_not_stall(self):
+        release = threading.Event()
+        self.registry.register("Stuck", lambda query: release.wait(5) and "late", timeout=0.05)
+        start = time.perf_counter()
+        observations = self.registry.dispatch([("Stuck", "x"), ("Wikipedia", "y")])
+        release.set()
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(observations, ["Stuck timed out after 0.05 seconds.", "Article about y."])
+        self.assertEqual(self.metrics.snapshot()["counters"]["tool_timeouts_total"], 1)
+
+    def test_saturated_sync_tool_rejects_calls(self):
+        release = threading.Event()
+        self.registry.register("Stuck", lambda query: release.wait(5) and "late", timeout=0.05, max_concurrency=1)
+        self.assertEqual(self.registry.dispatch([("Stuck", "x")]), ["Stuck timed out after 0.05 seconds."])
+        # The timed-out call still holds the only thread, so the next call is not queued behind it.
+        start = time.perf_counter()
+        self.assertEqual(self.registry.dispatch([("Stuck", "y")]),
+                         ["Stuck is unavailable: 1 calls are still running past the 0.05 second timeout."])
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertEqual(self.metrics.snapshot()["counters"]["tool_rejections_total"], 1)
+        release.set()
+        for _ in range(100):
+            if self.registry.tools["stuck"].abandoned == 0:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.registry.dispatch([("Stuck", "z")]), ["late"])
+
+    def test_focus_reaches_tools_that_take_it(self):
+        self.registry.register("Ranked", lambda query, focus=None: f"{query} for {focus}", takes_focus=True)
+        self.assertEqual(self.registry.dispatch([("Ranked", "Ford"), ("Wikipedia", "Ford")], focus="birthplace"),
+                         ["Ford for birthplace", "Article about Ford."])
+
+    def test_errors_and_unknown_tools(self):
+        observations = self.registry.dispatch([("Calculator", "1 / 0"), ("Maps", "Omaha")])
+        self.assertEqual(observations[0], "Calculator failed: ZeroDivisionError: division by zero")
+        self.assertEqual(observations[1], "Unknown tool Maps. Available tools: Wikipedia, Calculator.")
+
+    def test_async_tool_and_size_cap(self):
+        async def search(query):
+            await asyncio.sleep(0.01)
+            return query * 10
+
+        self.registry.register("Search", search, max_chars=5)
+        self.assertEqual(self.registry.dispatch([("Search", "ab")]), ["ababa"])
+
+    def test_async_tool_works_after_close(self):
+        async def search(query):
+            await asyncio.sleep(0.01)
+            return query
+
+        # One slot, so the second call waits on the semaphore and ties it to the loop.
+        self.registry.register("Search", search, max_concurrency=1)
+        calls = [("Search", "a"), ("Search", "b")]
+        self.assertEqual(self.registry.dispatch(calls), ["a", "b"])
+        self.registry.close()
+        self.assertEqual(self.registry.dispatch(calls), ["a", "b"])
+
+    def test_for_wikipedia(self):
+        tool = MagicMock()
+        tool.return_chars = 4
+        tool.wiki_tool.return_value = "Python is a language."
+        registry = ToolRegistry.for_wikipedia(tool)
+        self.assertEqual(registry.run_action("Action 1: Python<STOP>"), "Pyth")
+        tool.wiki_tool.assert_called_once_with("Python")
+        registry.run_action("Action 2: Gerald Ford<STOP>", focus="Where was Ford born?")
+        tool.wiki_tool.assert_called_with("Gerald Ford", focus="Where was Ford born?")
+        registry.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@
 import unittest
 from unittest.mock import patch, MagicMock
 from src.tools import WikipediaTool
+from src.llm_cache import ResponseCache
 from wikipedia.exceptions import PageError
 
 class TestWikipediaTool(unittest.TestCase):
@@ -78,6 +79,66 @@ class TestWikipediaTool(unittest.TestCase):
         self.assertEqual(mock_wikipedia_page.call_count, 2)
         self.assertEqual(result, "Redirected page content.")
 
+    @patch('wikipedia.page')
+    def test_wiki_tool_cache_reuses_snippet(self, mock_wikipedia_page):
+        mock_page = MagicMock()
+        mock_page.title = "Python (programming language)"
+        mock_page.content = "b" * 2000
+        mock_wikipedia_page.return_value = mock_page
+        cache = ResponseCache()
+        tool = WikipediaTool(return_chars=1000, cache=cache)
+
+        first = tool.wiki_tool("Python (programming language)")
+        second = tool.wiki_tool("  python (Programming Language) ")
+        self.assertEqual(first, "b" * 1000)
+        self.assertEqual(second, first)
+        self.assertEqual(mock_wikipedia_page.call_count, 1)
+        # The title probe made while filling the miss is not counted.
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+    @patch('wikipedia.page')
+    def test_wiki_tool_cache_resolved_title(self, mock_wikipedia_page):
+        # A query resolved through auto-suggest also serves later lookups of the resolved title
+        mock_wikipedia_page.side_effect = [
+            PageError("Page not found"),
+            MagicMock(title="Gerald Ford", content="Gerald Rudolph Ford Jr."),
+        ]
+        cache = ResponseCache()
+        tool = WikipediaTool(return_chars=1000, cache=cache)
+
+        self.assertEqual(tool.wiki_tool("Gerald R Ford"), "Gerald Rudolph Ford Jr.")
+        self.assertEqual(tool.wiki_tool("Gerald Ford"), "Gerald Rudolph Ford Jr.")
+        self.assertEqual(mock_wikipedia_page.call_count, 2)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    @patch('wikipedia.page')
+    def test_wiki_tool_ranked_returns_relevant_passage(self, mock_wikipedia_page):
+        mock_wikipedia_page.return_value = MagicMock(
+            title="Gerald Ford",
+            content="Gerald Ford was the 38th president.\n" + "Filler text about politics.\n" * 20
+                    + "Ford was born in Omaha, Nebraska.",
+        )
+        tool = WikipediaTool(return_chars=60, extraction="ranked")
+
+        self.assertEqual(tool.wiki_tool("Gerald Ford", focus="Where was Ford born?"),
+                         "Ford was born in Omaha, Nebraska.")
+        # Without a focus the passages are ranked against the query.
+        self.assertEqual(tool.wiki_tool("gerald ford"), "Gerald Ford was the 38th president.")
+        # The index is built once and shared by both spellings of the query.
+        self.assertEqual(mock_wikipedia_page.call_count, 1)
+
+    @patch('wikipedia.page')
+    def test_wiki_tool_ranked_caches_article(self, mock_wikipedia_page):
+        mock_wikipedia_page.return_value = MagicMock(title="Python", content="Python is a language.")
+        cache = ResponseCache()
+        WikipediaTool(extraction="ranked", cache=cache).wiki_tool("Python")
+        self.assertEqual(WikipediaTool(extraction="ranked", cache=cache).wiki_tool("Python"), "Python is a language.")
+        self.assertEqual(mock_wikipedia_page.call_count, 1)
+
+    def test_unknown_extraction(self):
+        with self.assertRaises(ValueError):
+            WikipediaTool(extraction="suffix")
+
 if __name__ == '__main__':
     unittest.main()
 
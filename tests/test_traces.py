@@ -0,0 +1,98 @@
+# Trace recording and replay, ensuring recorded LLM calls and lookups are served back in order.
+
+# tests/test_traces.py
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from src.llm_interface import LLMInterface
+from src.tools import WikipediaTool
+from src.traces import (ReplayLLM, ReplayWikipediaTool, TraceMiss, TraceRecorder, TraceReplay,
+                        load_trace)
+
+class TestTraces(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "trace.jsonl")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def record(self, *records):
+        recorder = TraceRecorder(self.path)
+        for record in records:
+            recorder.record(*record)
+        recorder.close()
+
+    def test_recorder_appends_compact_lines(self):
+        self.record(("llm", "Prompt", "Paris", 0.5, ["<STOP>"]))
+        self.record(("wikipedia", "France", "France is a country.", 0.25))
+        records = load_trace(self.path)
+        self.assertEqual([record["request"] for record in records], ["Prompt", "France"])
+        self.assertEqual(records[0]["context"], ["<STOP>"])
+        self.assertEqual(records[1]["seconds"], 0.25)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertNotIn(": ", f.readline())
+
+    def test_load_trace_skips_truncated_line(self):
+        self.record(("llm", "Prompt", "Paris", 0.5))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"kind":"llm","requ')
+        self.assertEqual(len(load_trace(self.path)), 1)
+
+    def test_replay_serves_repeated_requests_in_order(self):
+        self.record(("llm", "Sample", "A", 0.1), ("llm", "Sample", "B", 0.1), ("llm", "Other", "C", 0.1))
+        replay = TraceReplay(self.path)
+        self.assertEqual([replay.lookup("llm", "Sample") for _ in range(3)], ["A", "B", "A"])
+        self.assertEqual(asyncio.run(replay.lookup_async("llm", "Other")), "C")
+        with self.assertRaises(TraceMiss):
+            replay.lookup("llm", "Sample", ["<STOP>"])
+
+    def test_replay_simulates_latency(self):
+        self.record(("wikipedia", "France", "France is a country.", 0.5))
+        sleep = MagicMock()
+        replay = TraceReplay(self.path, simulate_latency=True, speed=2.0, sleep=sleep)
+        replay.lookup("wikipedia", "France")
+        sleep.assert_called_once_with(0.25)
+
+    @patch('vertexai.language_models.TextGenerationModel.from_pretrained')
+    def test_record_then_replay_llm_calls(self, mock_from_pretrained):
+        mock_model = MagicMock()
+        mock_model.predict.return_value.text = "Thought 1: Search France."
+        mock_from_pretrained.return_value = mock_model
+        recorder = TraceRecorder(self.path)
+        llm = LLMInterface("project", "us-central1", "model", recorder=recorder)
+        llm.call_llm("Question: France?", show_activity=False, stop_sequences=["<STOP>"])
+        recorder.close()
+
+        replay_llm = ReplayLLM(TraceReplay(self.path))
+        self.assertEqual(replay_llm.call_llm("Question: France?", show_activity=False, stop_sequences=["<STOP>"]),
+                         "Thought 1: Search France.")
+        self.assertEqual(replay_llm.stream_llm("Question: France?", show_activity=False, stop_sequences=["<STOP>"]),
+                         "Thought 1: Search France.")
+        with self.assertRaises(TraceMiss):
+            replay_llm.call_llm("Question: Spain?", show_activity=False)
+
+    @patch('vertexai.init')
+    def test_replay_llm_does_not_load_vertex_ai(self, mock_init):
+        self.record(("llm", "Prompt", "Paris", 0.1))
+        replay_llm = ReplayLLM(TraceReplay(self.path))
+        mock_init.assert_not_called()
+        self.assertIsNone(replay_llm.rate_limiter)
+        self.assertEqual(replay_llm.parameters["temperature"], 0)
+        self.assertEqual(replay_llm.call_llm("Prompt", show_activity=False), "Paris")
+
+    def test_record_then_replay_wikipedia_lookups(self):
+        recorder = TraceRecorder(self.path)
+        tool = WikipediaTool(return_chars=20, recorder=recorder)
+        with patch.object(WikipediaTool, "_fetch_snippet", return_value=("France", "France is a country.")):
+            tool.wiki_tool("France")
+        recorder.close()
+
+        replay_tool = ReplayWikipediaTool(TraceReplay(self.path), return_chars=20)
+        self.assertEqual(replay_tool.wiki_tool("France"), "France is a country.")
+
+if __name__ == "__main__":
+    unittest.main()
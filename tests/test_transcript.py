@@ -0,0 +1,58 @@
+# ReActTranscript and split_response_lines, ensuring prompts match the original string concatenation.
+
+# tests/test_transcript.py
+
+import unittest
+from src.transcript import ReActTranscript, split_response_lines
+
+class TestReActTranscript(unittest.TestCase):
+    def test_render_matches_concatenation(self):
+        context, exemplar, question = "Context.", "Exemplar.", "Who was born first?"
+        expected = f"{context}\n\n{exemplar}\n\nQuestion: {question}\nThought 1:"
+        transcript = ReActTranscript(context, exemplar, question)
+        self.assertEqual(transcript.render(), expected)
+
+        for step in range(1, 6):
+            thought = f" I need to look up item {step}."
+            action = f"Action {step}: Item {step}<STOP>"
+            observation = f"Item {step} is described here."
+            transcript.add_step(thought, action, observation)
+            expected = f"{expected} {thought}\n{action}\nObservation {step}: {observation}\nThought {step + 1}:"
+            self.assertEqual(transcript.render(), expected)
+            self.assertEqual(len(transcript), len(expected))
+
+        self.assertEqual(transcript.step, 6)
+
+    def test_boundaries_are_stable_prefixes(self):
+        transcript = ReActTranscript("Context.", "Exemplar.", "Question?")
+        first_prompt = transcript.render()
+        transcript.add_step("Thought.", "Action 1: A<STOP>", "A.")
+        second_prompt = transcript.render()
+        self.assertEqual(transcript.boundaries[0], len(first_prompt))
+        self.assertEqual(second_prompt[:transcript.boundaries[0]], first_prompt)
+        self.assertEqual(transcript.boundaries[-1], len(second_prompt))
+
+    def test_dict_round_trip(self):
+        transcript = ReActTranscript("Context.", "Exemplar.", "Question?")
+        transcript.add_step("Thought.", "Action 1: A<STOP>", "A.")
+        restored = ReActTranscript.from_dict(transcript.to_dict())
+        self.assertEqual(restored.render(), transcript.render())
+        self.assertEqual(restored.boundaries, transcript.boundaries)
+        self.assertEqual(restored.step, 2)
+        self.assertEqual(restored.steps, transcript.steps)
+
+    def test_render_steps_matches_render(self):
+        transcript = ReActTranscript("Context.", "Exemplar.", "Question?")
+        transcript.add_step("Thought.", "Action 1: A<STOP>", "A.")
+        transcript.add_step("Thought.", "Action 2: B<STOP>", "B.")
+        self.assertEqual(transcript.render_steps(transcript.steps), transcript.render())
+        self.assertEqual(transcript.render_steps([]), transcript.segments[0])
+
+    def test_split_response_lines_matches_splitlines(self):
+        for response in ["one", "one\n", "one\ntwo", "one\r\ntwo\nthree", "one\n\n", "one two", "\ntwo"]:
+            lines = response.splitlines()
+            expected = (lines[0], lines[1] if len(lines) > 1 else None)
+            self.assertEqual(split_response_lines(response), expected)
+
+if __name__ == '__main__':
+    unittest.main()
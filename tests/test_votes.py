@@ -0,0 +1,52 @@
+# Vectorized vote aggregation, checked against a per-question Counter.
+
+# tests/test_votes.py
+
+import math
+import random
+import unittest
+from collections import Counter
+import numpy as np
+from src.answers import AnswerVocabulary
+from src.votes import aggregate_votes, answer_ids, answer_matrix
+
+class TestVotes(unittest.TestCase):
+    def test_answer_matrix(self):
+        vocabulary = AnswerVocabulary()
+        ids = answer_matrix([["The answer is 1,400.", "The answer is 1400 units.", "Hmm."],
+                             ["The answer is Paris."]], vocabulary)
+        np.testing.assert_array_equal(ids, [[0, 0, -1], [1, -1, -1]])
+
+    def test_aggregate_votes(self):
+        ids = np.array([[0, 1, 1, -1], [2, 2, 2, 2], [-1, -1, -1, -1], [3, 4, 4, 3]])
+        summary = aggregate_votes(ids)
+        np.testing.assert_array_equal(summary["winner"], [1, 2, -1, 3])
+        np.testing.assert_array_equal(summary["votes"], [2, 4, 0, 2])
+        np.testing.assert_array_equal(summary["valid"], [3, 4, 0, 4])
+        np.testing.assert_allclose(summary["agreement"], [2 / 3, 1.0, 0.0, 0.5])
+        np.testing.assert_allclose(summary["entropy"], [-(1 / 3) * math.log(1 / 3) - (2 / 3) * math.log(2 / 3),
+                                                        0.0, 0.0, math.log(2)])
+
+    def test_aggregate_votes_matches_counter(self):
+        rng = random.Random(0)
+        choices = ["36", "12", "24", "NA", "thirty-six"]
+        answers = [[rng.choice(choices) for _ in range(rng.randint(1, 12))] for _ in range(300)]
+        vocabulary = AnswerVocabulary()
+        summary = aggregate_votes(answer_ids(answers, vocabulary, samples=12))
+
+        for i, row in enumerate(answers):
+            counts = Counter(answer for answer in row if answer != "NA")
+            top = max(counts.values(), default=0)
+            self.assertEqual(summary["votes"][i], top)
+            if counts:
+                self.assertEqual(counts[vocabulary.lookup(summary["winner"][i])], top)
+            total = sum(counts.values())
+            expected = -sum(c / total * math.log(c / total) for c in counts.values()) if total else 0.0
+            self.assertAlmostEqual(summary["entropy"][i], expected)
+
+    def test_aggregate_votes_empty(self):
+        summary = aggregate_votes(np.zeros((0, 5), dtype=np.int64))
+        self.assertEqual(summary["winner"].shape, (0,))
+
+if __name__ == '__main__':
+    unittest.main()
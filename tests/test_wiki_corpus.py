@@ -0,0 +1,84 @@
+# WikipediaCorpus and CorpusWikipediaTool, ensuring offline lookups match the WikipediaTool contract.
+
+# tests/test_wiki_corpus.py
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from src.wiki_corpus import CorpusWikipediaTool, PageError, WikipediaCorpus, build_corpus
+
+class TestWikipediaCorpus(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        source = os.path.join(self.tmpdir.name, "articles.jsonl")
+        records = [
+            {"title": "Gerald Ford", "text": "Gerald Rudolph Ford Jr. was the 38th president. " * 50,
+             "redirects": ["Gerald R. Ford"]},
+            {"title": "Ronald Reagan", "text": "Ronald Wilson Reagan – the 40th president."},
+            {"title": "Reagan", "redirect": "Ronald Reagan"},
+        ]
+        with open(source, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        self.prefix = os.path.join(self.tmpdir.name, "corpus")
+        self.count = build_corpus(source, self.prefix, return_chars=100)
+        self.corpus = WikipediaCorpus(self.prefix)
+        self.tool = CorpusWikipediaTool(self.corpus, return_chars=100)
+
+    def tearDown(self):
+        self.corpus.close()
+        self.tmpdir.cleanup()
+
+    def test_build_corpus_counts_articles(self):
+        self.assertEqual(self.count, 2)
+        self.assertEqual(set(self.corpus.titles), {"gerald ford", "ronald reagan"})
+
+    def test_wiki_tool_exact_match(self):
+        result = self.tool.wiki_tool("Gerald Ford")
+        self.assertEqual(result, ("Gerald Rudolph Ford Jr. was the 38th president. " * 50)[:100])
+
+    def test_wiki_tool_redirect(self):
+        self.assertEqual(self.tool.wiki_tool("Reagan"), "Ronald Wilson Reagan – the 40th president.")
+        self.assertEqual(self.tool.wiki_tool("gerald_r._ford"), self.tool.wiki_tool("Gerald Ford"))
+
+    def test_wiki_tool_fuzzy_fallback(self):
+        self.assertEqual(self.tool.wiki_tool("Ronald Regan"), "Ronald Wilson Reagan – the 40th president.")
+
+    def test_suggest_compares_a_trigram_shortlist(self):
+        corpus = WikipediaCorpus(self.prefix, max_candidates=1)
+        self.assertEqual(corpus._shortlist("ronald regan"), ["ronald reagan"])
+        self.assertEqual(corpus.suggest("Ronald Regan"), "ronald reagan")
+        self.assertIsNone(corpus.suggest("Quantum chromodynamics"))
+        corpus.close()
+
+    def test_wiki_tool_no_match(self):
+        with self.assertRaises(PageError) as raised:
+            self.tool.wiki_tool("Quantum chromodynamics")
+        self.assertEqual(raised.exception.title, "Quantum chromodynamics")
+
+    def test_recorder_receives_lookups(self):
+        recorder = MagicMock()
+        tool = CorpusWikipediaTool(self.corpus, return_chars=100, recorder=recorder)
+        snippet = tool.wiki_tool("Ronald Reagan")
+        recorder.record.assert_called_once()
+        self.assertEqual(recorder.record.call_args.args[:3], ("wikipedia", "Ronald Reagan", snippet))
+
+    def test_return_chars_longer_than_precomputed(self):
+        tool = CorpusWikipediaTool(self.corpus, return_chars=150)
+        self.assertEqual(tool.wiki_tool("Gerald Ford"), ("Gerald Rudolph Ford Jr. was the 38th president. " * 50)[:150])
+
+    def test_ranked_extraction_reads_whole_article(self):
+        tool = CorpusWikipediaTool(self.corpus, return_chars=100, extraction="ranked")
+        self.assertEqual(tool.wiki_tool("Reagan", focus="Which president was Reagan?"),
+                         "Ronald Wilson Reagan – the 40th president.")
+
+    def test_article_is_zero_copy(self):
+        article = self.corpus.article("ronald reagan")
+        self.assertIsInstance(article, memoryview)
+        self.assertEqual(str(article, "utf-8"), "Ronald Wilson Reagan – the 40th president.")
+        article.release()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@ from src.chain_of_thought import ChainOfThought
 from src.react import ReAct
 from src.langchain_agent import LangchainReActAgent
 from src.self_consistency import SelfConsistency
+from src.exemplars import ExemplarBank
 
 def main():
     # Configuration
@@ -65,8 +66,13 @@ Observation 2: Gerald Rudolph Ford Jr. ( JERR-əld; born Leslie Lynch King Jr.;
 Ford was born in Omaha, Nebraska and raised in Grand Rapids, Michigan. He attended the University of Michigan, where he played for the school's football team before eventually attending Yale Law School. Afterward, he served in the U.S. Naval Reserve from 1942 to 1946. Ford began his political career in 1949 as the U.S. representative from Michigan's 5
 Thought 3: Gerald Ford was born in 1913. 1911 is before 1913. Answer[Ronald Reagan]"""
 
+    # A bank picks the exemplars closest to each question within a token budget; add more
+    # (question, exemplar) pairs, or load them with ExemplarBank.from_jsonl, to choose between them.
+    react_bank = ExemplarBank([("Who was born first, Ronald Reagan or Gerald Ford?", exemplar_react)],
+                              k=1, max_tokens=1000)
+
     react_question = "When was the opening year of the theater that debuted Ibsen's 'A Doll's House'?"
-    react_answer = react.react_chain(context=context, exemplar=exemplar_react, question=react_question, show_activity=True)
+    react_answer = react.react_chain(context=context, exemplar=react_bank, question=react_question, show_activity=True)
     print("ReAct Answer:")
     print(react_answer)
 